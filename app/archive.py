@@ -0,0 +1,86 @@
+"""
+Фоновый перенос старых выполненных задач в архив.
+
+:class:`Archiver` раз в ``TASK_MANAGER_ARCHIVE_INTERVAL`` секунд (по умолчанию
+час) вызывает :meth:`app.storage.Storage.archive_completed`. Срок хранения
+задаёт ``TASK_MANAGER_RETENTION_DAYS`` (по умолчанию 365 дней, 0 - не
+архивировать) или :meth:`app.storage.Storage.set_retention` для отдельного
+пользователя. Для сервера без открытых клиентов то же делает команда
+``python -m app.cli archive --all-users`` из cron.
+"""
+import os
+import threading
+
+from .storage import ARCHIVE_BATCH
+
+
+#пауза между запусками архивации, в секундах
+ARCHIVE_INTERVAL = float(os.environ.get("TASK_MANAGER_ARCHIVE_INTERVAL", 3600))
+
+
+class Archiver:
+    """
+    Фоновый поток, переносящий выполненные задачи старше срока хранения в архив.
+
+    Ошибки базы не прерывают поток: задачи будут перенесены при следующем запуске.
+
+    :ivar storage: Хранилище.
+    :type storage: StorageBackend
+    :ivar username: Логин пользователя; None - все пользователи.
+    :type username: str | None
+    :ivar interval: Пауза между запусками, в секундах.
+    :type interval: float
+    :ivar batch_size: Сколько задач переносится одной транзакцией.
+    :type batch_size: int
+    :ivar archived: Сколько задач перенесено с момента запуска.
+    :type archived: int
+    :ivar last_error: Ошибка последнего неудачного запуска.
+    :type last_error: Exception | None
+    """
+    def __init__(self, storage, username=None, interval=ARCHIVE_INTERVAL, batch_size=ARCHIVE_BATCH):
+        self.storage = storage
+        self.username = username
+        self.interval = interval
+        self.batch_size = batch_size
+        self.archived = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """
+        Переносит в архив задачи, срок хранения которых истёк.
+
+        :return: Количество перенесённых задач.
+        :rtype: int
+        """
+        moved = self.storage.archive_completed(self.username, self.batch_size)
+        self.archived += moved
+        return moved
+
+    def start(self):
+        """
+        Запускает поток архивации.
+        """
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Останавливает поток архивации.
+
+        :param timeout: Сколько секунд ждать завершения потока.
+        :type timeout: float | None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as err:
+                self.last_error = err
+            self._stop.wait(self.interval)
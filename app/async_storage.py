@@ -0,0 +1,347 @@
+"""
+Асинхронное хранилище задач для сервисов с большим числом одновременных клиентов.
+
+:class:`AsyncStorage` выполняет те же операции, что и
+:class:`app.storage.Storage` (регистрация, вход, добавление, списки,
+выполнение, история, поиск, статистика), но методы - корутины на
+``sqlalchemy.ext.asyncio``. Пока один запрос ждёт базу, цикл событий
+выполняет другие, поэтому сотни клиентов обслуживаются одним потоком, а
+одновременные запросы идут по разным соединениям пула::
+
+    storage = AsyncStorage("sqlite:///tasks.db")
+    user = await storage.check_login("никита", "123")
+    rows, stats = await asyncio.gather(storage.get_task_rows(user), storage.get_stats(user))
+    await storage.close()
+
+Адрес базы задаётся так же, как для :class:`app.storage.Storage`; драйвер
+меняется на асинхронный (:data:`ASYNC_DRIVERS`): aiosqlite для SQLite и
+psycopg 3 для PostgreSQL. Схема проверяется и мигрируется обычным
+движком при создании хранилища. Запросы - те же готовые запросы
+:mod:`app.storage`, поэтому кэш скомпилированного SQL общий.
+
+Для пула соединений нужен пакет ``greenlet``, через который SQLAlchemy
+вызывает асинхронный драйвер.
+"""
+import asyncio
+from datetime import date, datetime
+
+from sqlalchemy import event, make_url, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .engine import MAX_OVERFLOW, POOL_PRE_PING, POOL_RECYCLE, POOL_SIZE, _tune_sqlite, ensure_schema, get_engine
+from .passwords import default_hasher
+from .stats import summarize, window_start
+from .storage import (
+    DATABASE_URL, SEARCH_LIMIT, Base, Task, TaskRow, User, UserSession,
+    UserAlreadyExistsError, UserNotFoundError, WrongPasswordError,
+    _COMPLETION_HISTOGRAM, _COUNT_OVERDUE, _STATS_BY_CATEGORY, _USER_BY_NAME,
+    _complete_statement, _completed_statement, _new_user, _open_statement, _row_columns, _search_statement,
+)
+
+
+#асинхронный драйвер SQLAlchemy для каждой СУБД
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "psycopg"}
+
+
+def async_url(url):
+    """
+    Возвращает адрес базы с асинхронным драйвером.
+
+    :param url: Адрес базы с любым драйвером.
+    :type url: str
+    :rtype: sqlalchemy.engine.URL
+
+    :raises ValueError: если для СУБД нет асинхронного драйвера.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для базы '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def sync_url(url):
+    """
+    Возвращает адрес базы для обычного движка, которым применяются миграции.
+
+    :param url: Адрес базы с любым драйвером.
+    :type url: str
+    :rtype: sqlalchemy.engine.URL
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite")
+    return parsed
+
+
+class AsyncStorage:
+    """
+    Асинхронное хранилище задач на ``sqlalchemy.ext.asyncio``.
+
+    Как и :class:`app.storage.Storage`, методы принимают логин или
+    :class:`app.storage.UserSession`; для контекста пользователь по логину
+    не ищется. Каждый вызов берёт своё соединение из пула, поэтому вызовы,
+    собранные в ``asyncio.gather``, выполняются одновременно. Хранилище
+    привязано к циклу событий, в котором выполнялись его запросы; в конце
+    работы вызовите :meth:`close`.
+
+    :ivar hasher: Хэширование паролей.
+    :type hasher: app.passwords.PasswordHasher
+    """
+    def __init__(self, url=None, hasher=None, pool_size=None, max_overflow=None):
+        """
+        :param url: Адрес базы данных. По умолчанию берётся из DATABASE_URL.
+        :type url: str | None
+        :param hasher: Хэширование паролей. По умолчанию - :func:`app.passwords.default_hasher`.
+        :type hasher: app.passwords.PasswordHasher | None
+        :param pool_size: Число постоянных соединений в пуле.
+        :type pool_size: int | None
+        :param max_overflow: Сколько соединений можно открыть сверх пула.
+        :type max_overflow: int | None
+
+        :raises ValueError: если для СУБД нет асинхронного драйвера.
+        """
+        url = url or DATABASE_URL
+        self.hasher = hasher or default_hasher()
+        ensure_schema(get_engine(sync_url(url)), Base.metadata)
+
+        parsed = async_url(url)
+        options = {"pool_recycle": POOL_RECYCLE, "pool_pre_ping": POOL_PRE_PING}
+        sqlite_file = parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+        if sqlite_file or parsed.get_backend_name() != "sqlite":
+            options["pool_size"] = POOL_SIZE if pool_size is None else pool_size
+            options["max_overflow"] = MAX_OVERFLOW if max_overflow is None else max_overflow
+
+        self.engine = create_async_engine(parsed, **options)
+        if sqlite_file:
+            event.listen(self.engine.sync_engine, "connect", _tune_sqlite)
+        self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @property
+    def nulls_first(self):
+        """
+        SQLite ставит задачи без дедлайна в начало сортировки, PostgreSQL - в конец.
+
+        :rtype: bool
+        """
+        return self.engine.dialect.name != "postgresql"
+
+    async def close(self):
+        """
+        Закрывает соединения пула.
+        """
+        await self.engine.dispose()
+
+    async def _hash(self, method, *args):
+        """
+        Вызывает метод хэширования в потоке, чтобы bcrypt не останавливал цикл событий.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def _user_id(self, session, user):
+        """
+        Возвращает id пользователя для операций с задачами.
+
+        :param user: Логин пользователя или его контекст.
+        :type user: str | UserSession
+        :rtype: int
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        if isinstance(user, UserSession):
+            return user.user_id
+
+        found = (await session.scalars(_USER_BY_NAME, {"username": user})).one_or_none()
+        if not found:
+            raise UserNotFoundError(f"Пользователь '{user}' не существует")
+        return found.id
+
+    # -------------------- АВТОРИЗАЦИЯ ------------------------
+
+    async def register_user(self, username, password):
+        """
+        Регистрирует нового пользователя.
+
+        :return: True при успешной регистрации.
+        :rtype: bool
+
+        :raises EmptyUsernameError: если логин пустой.
+        :raises EmptyPasswordError: если пароль пустой.
+        :raises UserAlreadyExistsError: если пользователь уже существует.
+        """
+        username = _new_user(username, password)
+
+        async with self.SessionLocal() as session:
+            exists = (await session.scalars(_USER_BY_NAME, {"username": username})).first()
+            if exists:
+                raise UserAlreadyExistsError(f"Пользователь '{username}' уже существует")
+
+        #хэш считается без открытой сессии, чтобы не держать соединение
+        password_hash = await self._hash(self.hasher.hash, password)
+
+        async with self.SessionLocal() as session:
+            session.add(User(username=username, password_hash=password_hash))
+            await session.commit()
+        return True
+
+    async def check_login(self, username, password):
+        """
+        Проверяет логин и пароль пользователя.
+
+        :return: Контекст авторизованного пользователя.
+        :rtype: UserSession
+
+        :raises UserNotFoundError: если пользователь не найден.
+        :raises WrongPasswordError: если пароль неверный.
+        """
+        async with self.SessionLocal() as session:
+            user = (await session.scalars(_USER_BY_NAME, {"username": username})).first()
+        if not user:
+            raise UserNotFoundError(f"Пользователь '{username}' не найден")
+
+        if not await self._hash(self.hasher.check, password, user.password_hash):
+            raise WrongPasswordError("Неверный пароль")
+
+        #стоимость bcrypt изменили: хэш пересчитывается, пока пароль известен
+        if self.hasher.needs_rehash(user.password_hash):
+            password_hash = await self._hash(self.hasher.hash, password)
+            async with self.SessionLocal() as session:
+                (await session.get(User, user.id)).password_hash = password_hash
+                await session.commit()
+
+        return UserSession(user.id, username)
+
+    # -------------------- РАБОТА С ЗАДАЧАМИ ------------------------
+
+    async def add_task(self, username, task, deadline=None, category="Учебная"):
+        """
+        Добавляет новую задачу пользователю.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :return: Строка добавленной задачи.
+        :rtype: TaskRow
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        async with self.SessionLocal() as session:
+            new_task = Task(
+                user_id=await self._user_id(session, username),
+                description=task,
+                deadline=deadline,
+                category=category
+            )
+            session.add(new_task)
+            await session.commit()
+            return TaskRow.from_task(new_task)
+
+    async def complete_tasks(self, username, ids, completed_at=None):
+        """
+        Помечает задачи с указанными id как выполненные одним запросом.
+
+        :return: Идентификаторы задач, которые были отмечены выполненными.
+        :rtype: list[int]
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        completed_at = completed_at or datetime.now()
+
+        async with self.SessionLocal() as session:
+            user_id = await self._user_id(session, username)
+            statement = _complete_statement(self.engine.dialect.name == "postgresql")
+
+            result = await session.execute(statement, {"ids": ids, "owner_id": user_id, "done_at": completed_at})
+            completed = result.scalars().all()
+            await session.commit()
+            return completed
+
+    async def get_task_rows(self, username, after=None, limit=None):
+        """
+        Возвращает текущие задачи пользователя, отсортированные по дедлайну.
+
+        :param after: Ключ (deadline, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime | None, int] | None
+        :param limit: Размер страницы; None - все задачи.
+        :type limit: int | None
+        :rtype: list[TaskRow]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        async with self.SessionLocal() as session:
+            user_id = await self._user_id(session, username)
+
+            params = {"user_id": user_id, "limit": limit, "now": datetime.now()}
+            kind = None
+            if after is not None:
+                deadline, params["after_id"] = after
+                if deadline is None:
+                    kind = "null"
+                else:
+                    kind = "deadline"
+                    params["after_deadline"] = deadline
+
+            query = _open_statement(True, self.nulls_first, kind, limit is not None)
+            return list(map(TaskRow._make, await session.execute(query, params)))
+
+    async def get_completed_task_rows(self, username, after=None, limit=None):
+        """
+        Возвращает выполненные задачи пользователя, включая архив, по дате выполнения.
+
+        :param after: Ключ (completed_at, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime, int] | None
+        :param limit: Размер страницы; None - все задачи.
+        :type limit: int | None
+        :rtype: list[TaskRow]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        async with self.SessionLocal() as session:
+            user_id = await self._user_id(session, username)
+
+            params = {"user_id": user_id, "limit": limit}
+            if after is not None:
+                params["after_completed_at"], params["after_id"] = after
+            query = _completed_statement(True, after is not None, limit is not None)
+            return list(map(TaskRow._make, await session.execute(query, params)))
+
+    async def find_task_rows(self, username, text, date_from, date_to, limit=SEARCH_LIMIT):
+        """
+        Находит текущие задачи по тексту и диапазону дат дедлайна, как :meth:`app.storage.Storage.find_task_rows`.
+
+        :return: Найденные задачи по убыванию релевантности.
+        :rtype: list[TaskRow]
+        """
+        async with self.SessionLocal() as session:
+            user_id = await self._user_id(session, username)
+            query = _search_statement(
+                self.engine.dialect.name, user_id, select(*_row_columns(datetime.now())),
+                text, date_from, date_to, limit
+            )
+            return list(map(TaskRow._make, await session.execute(query)))
+
+    async def get_stats(self, username, period=None):
+        """
+        Возвращает статистику задач пользователя из сводных таблиц.
+
+        :param period: Окно для времени выполнения задач; None - всё время.
+        :type period: timedelta | None
+        :return: Статистика, см. :func:`app.stats.summarize`.
+        :rtype: dict
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        async with self.SessionLocal() as session:
+            user_id = await self._user_id(session, username)
+
+            categories = {
+                row.category: (row.open_count, row.completed_count)
+                for row in await session.execute(_STATS_BY_CATEGORY, {"user_id": user_id})
+            }
+            overdue = (await session.execute(_COUNT_OVERDUE, {"user_id": user_id, "now": datetime.now()})).scalar()
+            since = window_start(period) or date.min
+            histogram = dict((await session.execute(
+                _COMPLETION_HISTOGRAM, {"user_id": user_id, "since": since}
+            )).all())
+
+            return summarize(categories, overdue, histogram, period)
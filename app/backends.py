@@ -0,0 +1,47 @@
+"""
+Выбор реализации хранилища по адресу базы.
+
+- ``memory://`` - :class:`app.memory.MemoryStorage`, задачи в памяти процесса;
+- ``sqlite:///путь`` - :class:`app.storage.SQLiteStorage`, встроенная база
+  для однопользовательской установки без сервера;
+- остальные адреса (PostgreSQL, ``sqlite://`` в памяти) - :class:`app.storage.Storage`.
+
+Если задана локальная реплика (``TASK_MANAGER_REPLICA``), открывается
+:class:`app.replica.ReplicaStorage`, а адрес считается адресом основной базы.
+"""
+from sqlalchemy.engine import make_url
+
+from . import replica as replica_module
+from . import storage as storage_module
+
+
+#адрес хранилища в памяти
+MEMORY_URL = "memory://"
+
+
+def open_storage(url=None, replica=None):
+    """
+    Создаёт хранилище для адреса базы.
+
+    :param url: Адрес базы данных. По умолчанию берётся из DATABASE_URL.
+    :type url: str | None
+    :param replica: Путь к файлу локальной реплики. По умолчанию - TASK_MANAGER_REPLICA.
+    :type replica: str | None
+    :return: Хранилище задач.
+    :rtype: app.storage.StorageBackend
+    """
+    replica = replica or replica_module.REPLICA_PATH
+    if replica:
+        return replica_module.ReplicaStorage(replica, url)
+
+    url = url or storage_module.DATABASE_URL
+    if url == MEMORY_URL:
+        from .memory import MemoryStorage
+
+        return MemoryStorage()
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:"):
+        return storage_module.SQLiteStorage(parsed.database)
+
+    return storage_module.Storage(url)
@@ -0,0 +1,212 @@
+from PyQt6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _StorageJob(QRunnable):
+    """
+    Один вызов метода хранилища в пуле потоков.
+
+    :ivar key: Канал задания или None для заданий, которые нельзя отменять.
+    :type key: str | None
+    :ivar generation: Номер задания в канале.
+    :type generation: int
+    """
+    def __init__(self, worker, key, generation, fn, args, on_result, on_error):
+        QRunnable.__init__(self)
+        self.worker = worker
+        self.key = key
+        self.generation = generation
+        self.fn = fn
+        self.args = args
+        self.on_result = on_result
+        self.on_error = on_error
+
+    def run(self):
+        """
+        Выполняет вызов в фоновом потоке и передаёт результат в поток интерфейса сигналом.
+        """
+        try:
+            result = self.fn(*self.args)
+        except Exception as err:
+            self.worker._failed.emit(self, err)
+        else:
+            self.worker._done.emit(self, result)
+
+
+class StorageWorker(QObject):
+    """
+    Асинхронный фасад над хранилищем: выполняет вызовы Storage в QThreadPool.
+
+    Задания объединяются в каналы по ключу. Новое задание в канале отменяет
+    предыдущее: если оно ещё не запущено, оно снимается с очереди, а если уже
+    выполняется, его результат будет отброшен. Так повторные перезагрузки
+    списка схлопываются в одну, а результат старого поиска не перерисует
+    список поверх нового. Задания с ключом None (изменения данных) никогда не
+    отменяются.
+
+    :ivar storage: Хранилище, методы которого вызываются в фоне.
+    :type storage: Storage
+    :ivar pool: Пул потоков, в котором выполняются задания.
+    :type pool: QThreadPool
+    """
+    #результат актуального задания: ключ канала и результат
+    finished = pyqtSignal(object, object)
+    #ошибка актуального задания: ключ канала и исключение
+    failed = pyqtSignal(object, object)
+
+    _done = pyqtSignal(object, object)
+    _failed = pyqtSignal(object, object)
+
+    def __init__(self, storage, max_threads=4, parent=None):
+        """
+        :param storage: Хранилище данных приложения.
+        :type storage: Storage
+        :param max_threads: Максимальное число одновременных запросов к базе.
+        :type max_threads: int
+        :param parent: Родительский объект Qt.
+        :type parent: QObject | None
+        """
+        QObject.__init__(self, parent)
+        self.storage = storage
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._generations = {}
+        self._queued = {}
+        #задания держатся здесь, пока не завершатся, чтобы их не собрал сборщик мусора
+        self._jobs = set()
+
+        self._done.connect(self._on_done)
+        self._failed.connect(self._on_failed)
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None):
+        """
+        Ставит вызов ``fn(*args)`` в очередь пула потоков.
+
+        :param key: Канал задания. None - задание нельзя отменить или объединить с другим.
+        :type key: str | None
+        :param fn: Вызываемая функция, обычно метод Storage.
+        :type fn: callable
+        :param on_result: Вызывается в потоке интерфейса с результатом.
+        :type on_result: callable | None
+        :param on_error: Вызывается в потоке интерфейса с исключением.
+        :type on_error: callable | None
+        """
+        generation = 0
+        if key is not None:
+            self.cancel(key)
+            generation = self._generations[key]
+
+        job = _StorageJob(self, key, generation, fn, args, on_result, on_error)
+        job.setAutoDelete(False)
+        self._jobs.add(job)
+        if key is not None:
+            self._queued[key] = job
+        self.pool.start(job)
+
+    def cancel(self, key):
+        """
+        Отменяет задание канала: снимает его с очереди или помечает его результат устаревшим.
+
+        :param key: Канал задания.
+        :type key: str
+        """
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+        queued = self._queued.pop(key, None)
+        if queued is not None and self.pool.tryTake(queued):
+            self._jobs.discard(queued)
+
+    def is_current(self, job):
+        """
+        Проверяет, что после задания в его канал не ставились новые задания.
+        """
+        return job.key is None or self._generations.get(job.key) == job.generation
+
+    def wait(self, msecs=-1):
+        """
+        Дожидается завершения всех заданий и доставляет их результаты.
+
+        :param msecs: Максимальное время ожидания в миллисекундах, -1 - без ограничения.
+        :type msecs: int
+        :return: True, если все задания завершились.
+        :rtype: bool
+        """
+        done = self.pool.waitForDone(msecs)
+        QCoreApplication.sendPostedEvents()
+        return done
+
+    def _finish(self, job):
+        self._jobs.discard(job)
+        if self._queued.get(job.key) is job:
+            del self._queued[job.key]
+        return self.is_current(job)
+
+    def _on_done(self, job, result):
+        if not self._finish(job):
+            return
+        if job.on_result is not None:
+            job.on_result(result)
+        self.finished.emit(job.key, result)
+
+    def _on_failed(self, job, err):
+        if not self._finish(job):
+            return
+        if job.on_error is not None:
+            job.on_error(err)
+        self.failed.emit(job.key, err)
+
+
+
+class ChangeRelay(QObject):
+    """
+    Передаёт изменения задач из потока слушателя в поток интерфейса.
+
+    :ivar listener: Запущенный слушатель изменений или None.
+    :type listener: app.changes.ChangeListener | None
+    """
+    #список app.changes.TaskChange
+    changed = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        self.listener = None
+
+    def start(self, storage, username, interval=None):
+        """
+        Запускает слушатель изменений задач пользователя.
+
+        Сигнал, отправленный из потока слушателя, доставляется в поток
+        интерфейса через очередь событий.
+
+        :param storage: Хранилище данных приложения.
+        :type storage: Storage
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param interval: Пауза между опросами журнала на SQLite, по умолчанию - POLL_INTERVAL.
+        :type interval: float | None
+        """
+        self.stop()
+        options = {} if interval is None else {"interval": interval}
+        listener = storage.listen_changes(username, self._emit, **options)
+        #окно могут удалить, не закрыв: тогда слушатель останавливается вместе с объектом Qt
+        self.destroyed.connect(lambda _=None: listener.stop(timeout=0))
+        self.listener = listener
+
+    def _emit(self, changes):
+        try:
+            self.changed.emit(changes)
+        except (RuntimeError, AttributeError):
+            #объект Qt уже удалён
+            pass
+
+    def stop(self, timeout=None):
+        """
+        Останавливает слушатель.
+
+        :param timeout: Сколько секунд ждать завершения потока слушателя, None - без ограничения.
+        :type timeout: float | None
+        """
+        if self.listener is not None:
+            self.listener.callback = None
+            self.listener.stop(timeout)
+            self.listener = None
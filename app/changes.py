@@ -0,0 +1,298 @@
+"""
+Получение изменений задач, сделанных другими клиентами.
+
+Изменения публикуют триггеры базы (миграция 5). На PostgreSQL клиент
+подписывается командой ``LISTEN`` на канал своего пользователя и получает
+уведомления сразу, не нагружая базу запросами. На SQLite уведомлений нет,
+поэтому клиент раз в ``interval`` секунд читает из журнала ``task_changes``
+только записи после последней полученной.
+
+Модуль не зависит от Qt: слушатель работает в своём потоке и вызывает
+``callback`` со списком изменений. Передачей изменений в поток интерфейса
+занимается :class:`app.background.ChangeRelay`.
+"""
+import json
+import select
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import DateTime, bindparam, column, func, select as sql_select, table
+from sqlalchemy.exc import DBAPIError
+
+
+#как часто опрашивается журнал изменений на SQLite, в секундах
+POLL_INTERVAL = 1.0
+#сколько хранятся записи журнала изменений на SQLite
+CHANGE_LOG_RETENTION = timedelta(days=1)
+#пауза перед повторным подключением слушателя после ошибки, в секундах
+RECONNECT_DELAY = 5.0
+
+#журнал изменений, который создаёт миграция для SQLite
+TASK_CHANGES = table(
+    "task_changes",
+    column("id"), column("user_id"), column("task_id"), column("op"),
+    column("updated_at", DateTime), column("changed_at", DateTime)
+)
+
+
+def channel_name(user_id):
+    """
+    Возвращает имя канала LISTEN/NOTIFY с изменениями задач пользователя.
+    """
+    return f"task_changes_{user_id}"
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class TaskChange:
+    """
+    Изменение одной задачи.
+
+    :ivar user_id: Идентификатор владельца задачи.
+    :type user_id: int
+    :ivar task_id: Идентификатор задачи; None для RELOAD.
+    :type task_id: int | None
+    :ivar op: Операция: INSERT, UPDATE, DELETE или RELOAD (изменений слишком много, нужно перечитать всё).
+    :type op: str
+    :ivar updated_at: Время изменения задачи.
+    :type updated_at: datetime | None
+    """
+    def __init__(self, user_id, task_id, op, updated_at=None):
+        self.user_id = user_id
+        self.task_id = task_id
+        self.op = op
+        self.updated_at = _parse_datetime(updated_at)
+
+    @classmethod
+    def from_json(cls, payload):
+        """
+        Создаёт изменение из текста уведомления PostgreSQL.
+        """
+        data = json.loads(payload)
+        return cls(data["user_id"], data["task_id"], data["op"], data.get("updated_at"))
+
+    def __repr__(self):
+        return f"TaskChange(user_id={self.user_id!r}, task_id={self.task_id!r}, op={self.op!r})"
+
+
+class ChangeListener(ABC):
+    """
+    Фоновый поток, получающий изменения задач одного пользователя.
+
+    :ivar engine: Движок базы данных.
+    :type engine: sqlalchemy.engine.Engine
+    :ivar user_id: Идентификатор пользователя.
+    :type user_id: int
+    :ivar callback: Вызывается из потока слушателя со списком :class:`TaskChange`.
+    :type callback: callable
+    """
+    def __init__(self, engine, user_id, callback=None):
+        self.engine = engine
+        self.user_id = user_id
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Запускает поток слушателя.
+        """
+        self._thread = threading.Thread(target=self._run, name=f"changes-{self.user_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Останавливает поток слушателя.
+
+        :param timeout: Сколько секунд ждать завершения потока.
+        :type timeout: float | None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _deliver(self, changes):
+        if changes and self.callback is not None:
+            self.callback(changes)
+
+    @abstractmethod
+    def _run(self):
+        """
+        Получает изменения в потоке слушателя, пока не вызван :meth:`stop`.
+        """
+
+
+class NotifyListener(ChangeListener):
+    """
+    Слушатель уведомлений PostgreSQL (``LISTEN task_changes_<user_id>``).
+
+    Держит отдельное соединение вне пула. Если соединение обрывается,
+    слушатель переподключается и отправляет RELOAD, потому что уведомления,
+    пришедшие без подписки, потеряны.
+
+    :ivar timeout: Как часто проверяется запрос на остановку, в секундах.
+    :type timeout: float
+    """
+    def __init__(self, engine, user_id, callback=None, timeout=POLL_INTERVAL):
+        ChangeListener.__init__(self, engine, user_id, callback)
+        self.timeout = timeout
+
+    def _run(self):
+        reconnect = False
+        while not self._stop.is_set():
+            try:
+                connection = self.engine.raw_connection()
+            except DBAPIError:
+                self._stop.wait(RECONNECT_DELAY)
+                continue
+
+            #соединение с подпиской нельзя возвращать в пул
+            connection.detach()
+            #ошибки драйвера здесь не оборачиваются SQLAlchemy: соединение используется напрямую
+            driver_errors = (DBAPIError, OSError, self.engine.dialect.loaded_dbapi.Error)
+            try:
+                dbapi = connection.driver_connection
+                dbapi.autocommit = True
+                cursor = dbapi.cursor()
+                cursor.execute(f'LISTEN "{channel_name(self.user_id)}"')
+                cursor.close()
+
+                if reconnect:
+                    self._deliver([TaskChange(self.user_id, None, "RELOAD")])
+                reconnect = True
+
+                self._listen(dbapi)
+            except driver_errors:
+                #обрыв связи: переподключиться; остальные ошибки - ошибки программы и завершают поток
+                self._stop.wait(RECONNECT_DELAY)
+            finally:
+                connection.close()
+
+    def _listen(self, dbapi):
+        if hasattr(dbapi, "poll"):
+            #psycopg2: ждём данных на сокете и разбираем накопившиеся уведомления
+            while not self._stop.is_set():
+                if select.select([dbapi], [], [], self.timeout) == ([], [], []):
+                    continue
+                dbapi.poll()
+                changes = [TaskChange.from_json(n.payload) for n in dbapi.notifies]
+                dbapi.notifies.clear()
+                self._deliver(changes)
+        else:
+            #psycopg 3.2+: notifies(timeout=...) возвращает управление, даже если уведомлений нет
+            while not self._stop.is_set():
+                changes = [TaskChange.from_json(n.payload) for n in dbapi.notifies(timeout=self.timeout)]
+                self._deliver(changes)
+
+
+class PollingListener(ChangeListener):
+    """
+    Слушатель журнала изменений ``task_changes`` для SQLite.
+
+    Каждый опрос - один запрос по индексу ``(user_id, id)``, который
+    возвращает только новые записи, поэтому нагрузка зависит от числа
+    изменений, а не от размера таблицы задач.
+
+    :ivar interval: Пауза между опросами, в секундах.
+    :type interval: float
+    """
+    def __init__(self, engine, user_id, callback=None, interval=POLL_INTERVAL):
+        ChangeListener.__init__(self, engine, user_id, callback)
+        self.interval = interval
+        self.last_id = None
+        self.started = None
+
+    def start(self):
+        """
+        Запоминает время запуска и запускает опрос.
+
+        Запросов к базе в вызывающем потоке нет: журнал читается и чистится
+        в потоке слушателя (:meth:`catch_up`).
+        """
+        #CURRENT_TIMESTAMP в SQLite - время UTC
+        self.started = datetime.now(timezone.utc).replace(tzinfo=None)
+        ChangeListener.start(self)
+
+    def catch_up(self):
+        """
+        Удаляет устаревшие записи журнала и запоминает последнюю запись.
+
+        SQLite пишет время изменения с точностью до секунды, поэтому
+        возвращаются изменения пользователя начиная с секунды запуска: так не
+        теряются изменения между :meth:`start` и первым опросом, а часть
+        изменений может прийти повторно.
+
+        :return: Изменения пользователя после запуска слушателя.
+        :rtype: list[TaskChange]
+        """
+        since = self.started.replace(microsecond=0) - timedelta(seconds=1)
+        with self.engine.begin() as conn:
+            conn.execute(TASK_CHANGES.delete().where(
+                TASK_CHANGES.c.changed_at < datetime.now(timezone.utc).replace(tzinfo=None) - CHANGE_LOG_RETENTION
+            ))
+            last_id = conn.execute(sql_select(func.max(TASK_CHANGES.c.id))).scalar() or 0
+            rows = conn.execute(
+                sql_select(TASK_CHANGES.c.task_id, TASK_CHANGES.c.op, TASK_CHANGES.c.updated_at)
+                .where(TASK_CHANGES.c.user_id == self.user_id, TASK_CHANGES.c.changed_at > since)
+                .order_by(TASK_CHANGES.c.id)
+            ).all()
+
+        self.last_id = last_id
+        return [TaskChange(self.user_id, row.task_id, row.op, row.updated_at) for row in rows]
+
+    def poll(self):
+        """
+        Читает новые записи журнала пользователя.
+
+        :return: Изменения после последней прочитанной записи.
+        :rtype: list[TaskChange]
+        """
+        query = (
+            sql_select(TASK_CHANGES.c.id, TASK_CHANGES.c.task_id, TASK_CHANGES.c.op, TASK_CHANGES.c.updated_at)
+            .where(TASK_CHANGES.c.user_id == self.user_id, TASK_CHANGES.c.id > bindparam("last_id"))
+            .order_by(TASK_CHANGES.c.id)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query, {"last_id": self.last_id}).all()
+
+        if rows:
+            self.last_id = rows[-1].id
+        return [TaskChange(self.user_id, row.task_id, row.op, row.updated_at) for row in rows]
+
+    def _run(self):
+        while self.last_id is None:
+            try:
+                self._deliver(self.catch_up())
+            except DBAPIError:
+                if self._stop.wait(self.interval):
+                    return
+        while not self._stop.wait(self.interval):
+            try:
+                self._deliver(self.poll())
+            except DBAPIError:
+                continue
+
+
+def create_listener(engine, user_id, callback=None, interval=POLL_INTERVAL):
+    """
+    Создаёт слушатель изменений для СУБД движка.
+
+    :param engine: Движок базы данных.
+    :type engine: sqlalchemy.engine.Engine
+    :param user_id: Идентификатор пользователя.
+    :type user_id: int
+    :param callback: Вызывается из потока слушателя со списком изменений.
+    :type callback: callable | None
+    :param interval: Пауза между опросами журнала на SQLite, в секундах.
+    :type interval: float
+    :return: Незапущенный слушатель.
+    :rtype: ChangeListener
+    """
+    if engine.dialect.name == "postgresql":
+        return NotifyListener(engine, user_id, callback, timeout=interval)
+    return PollingListener(engine, user_id, callback, interval)
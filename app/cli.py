@@ -0,0 +1,295 @@
+"""
+Консольный интерфейс менеджера задач без графического окна.
+
+Не импортирует PyQt6, а слой хранения загружает только при выполнении
+команды, поэтому подходит для скриптов и заданий cron::
+
+    python -m app.cli --user nikita add "Сдать отчёт" --category Рабочая --deadline 2030-05-01T10:00
+    python -m app.cli --user nikita list --json
+    python -m app.cli --user nikita complete 12 15
+    python -m app.cli --user nikita search отчёт --from 2030-05-01
+    python -m app.cli --user nikita import tasks.csv
+    python -m app.cli --user nikita export history.jsonl --completed
+    python -m app.cli --user nikita stats
+    python -m app.cli --user nikita stats --full --days 7
+    python -m app.cli --user nikita retention 90
+    python -m app.cli archive --all-users
+
+Пользователь берётся из ``--user`` или переменной окружения ``TASK_MANAGER_USER``,
+адрес базы - из ``--url`` или ``DATABASE_URL``.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"неверная дата '{value}', ожидается ГГГГ-ММ-ДД[TЧЧ:ММ]") from None
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"неверная дата '{value}', ожидается ГГГГ-ММ-ДД") from None
+
+
+def _task_dict(task):
+    return {
+        "id": task.id,
+        "description": task.description,
+        "category": task.category,
+        "deadline": task.deadline.isoformat() if task.deadline else None,
+        "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+    }
+
+
+def _task_line(task):
+    text = f"{task.id:>6}  [{task.category}] {task.description}"
+    if task.completed_at:
+        return text + f" (выполнено {task.completed_at:%d.%m.%Y %H:%M})"
+    if task.deadline:
+        text += f" (до {task.deadline:%d.%m.%Y %H:%M})"
+        if task.overdue:
+            text += "   ПРОСРОЧЕНО!"
+    return text
+
+
+def _print_tasks(tasks, args, out):
+    if args.json:
+        json.dump([_task_dict(t) for t in tasks], out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    else:
+        for task in tasks:
+            print(_task_line(task), file=out)
+
+
+def cmd_add(storage, args, out):
+    storage.add_task(args.user, args.description, args.deadline, args.category)
+    if args.json:
+        json.dump({"added": 1}, out)
+        out.write("\n")
+
+
+def cmd_list(storage, args, out):
+    from .storage import PAGE_SIZE
+
+    if args.completed:
+        fetch_page, key = storage.get_completed_task_rows, lambda t: (t.completed_at, t.id)
+    else:
+        fetch_page, key = storage.get_task_rows, lambda t: (t.deadline, t.id)
+
+    tasks = []
+    after = None
+    while args.limit is None or len(tasks) < args.limit:
+        page = fetch_page(args.user, after, PAGE_SIZE)
+        tasks.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+        after = key(page[-1])
+
+    _print_tasks(tasks[:args.limit], args, out)
+
+
+def cmd_complete(storage, args, out):
+    completed = storage.complete_tasks(args.user, args.ids)
+    if args.json:
+        json.dump({"completed": completed}, out)
+        out.write("\n")
+    else:
+        print(f"выполнено задач: {len(completed)}", file=out)
+
+
+def cmd_search(storage, args, out):
+    tasks = storage.find_task_rows(args.user, args.text, args.date_from, args.date_to, args.limit)
+    _print_tasks(tasks, args, out)
+
+
+def cmd_import(storage, args, out):
+    from .transfer import format_from_path, import_tasks
+
+    fmt = args.format or format_from_path(args.file)
+    with open(args.file, encoding="utf-8", newline="") as fileobj:
+        count, errors = import_tasks(storage, args.user, fileobj, fmt, args.skip_invalid)
+
+    for error in errors:
+        print(f"пропущена {error}", file=sys.stderr)
+
+    if args.json:
+        json.dump({"imported": count, "skipped": len(errors)}, out)
+        out.write("\n")
+    else:
+        print(f"импортировано задач: {count}", file=out)
+
+
+def cmd_export(storage, args, out):
+    from .transfer import export_tasks, format_from_path
+
+    completed = True if args.completed else False if args.open else None
+
+    if args.file == "-":
+        export_tasks(storage, args.user, out, args.format or "csv", completed)
+        return
+
+    fmt = args.format or format_from_path(args.file)
+    with open(args.file, "w", encoding="utf-8", newline="") as fileobj:
+        count = export_tasks(storage, args.user, fileobj, fmt, completed)
+    print(f"выгружено задач: {count}", file=sys.stderr)
+
+
+def cmd_stats(storage, args, out):
+    if args.full:
+        from .stats import format_stats
+
+        stats = storage.get_stats(args.user, timedelta(days=args.days) if args.days else None)
+        if args.json:
+            json.dump(stats, out)
+            out.write("\n")
+        else:
+            print("\n".join(format_stats(stats)), file=out)
+        return
+
+    stats = storage.count_tasks(args.user)
+    if args.json:
+        json.dump(stats, out)
+        out.write("\n")
+    else:
+        print(f"текущих: {stats['open']}", file=out)
+        print(f"просрочено: {stats['overdue']}", file=out)
+        print(f"выполнено: {stats['completed']}", file=out)
+
+
+def cmd_archive(storage, args, out):
+    moved = storage.archive_completed(None if args.all_users else args.user)
+    if args.json:
+        json.dump({"archived": moved}, out)
+        out.write("\n")
+    else:
+        print(f"перенесено в архив: {moved}", file=out)
+
+
+def cmd_retention(storage, args, out):
+    days = None if args.days == "default" else int(args.days)
+    storage.set_retention(args.user, days)
+    if args.json:
+        json.dump({"retention_days": days}, out)
+        out.write("\n")
+    else:
+        print(f"срок хранения: {'общий' if days is None else f'{days} дн.'}", file=out)
+
+
+def _retention_days(value):
+    if value == "default" or value.isdigit():
+        return value
+    raise argparse.ArgumentTypeError(f"неверный срок '{value}', ожидается число дней или default")
+
+
+def build_parser():
+    """
+    Создаёт разбор аргументов командной строки.
+
+    :return: Парсер с подкомандами add, list, complete, search, import, export, stats, archive и retention.
+    :rtype: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Менеджер задач из командной строки")
+    parser.add_argument("--user", default=os.environ.get("TASK_MANAGER_USER"),
+                        help="логин пользователя (по умолчанию TASK_MANAGER_USER)")
+    parser.add_argument("--url", default=None, help="адрес базы данных (по умолчанию DATABASE_URL)")
+    parser.add_argument("--json", action="store_true", help="вывод в формате JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="добавить задачу")
+    add.add_argument("description", help="описание задачи")
+    add.add_argument("--category", default="Учебная", help="категория задачи")
+    add.add_argument("--deadline", type=_parse_datetime, default=None, help="дедлайн в формате ISO")
+    add.set_defaults(handler=cmd_add)
+
+    listing = sub.add_parser("list", help="показать задачи")
+    listing.add_argument("--completed", action="store_true", help="показать историю выполненных задач")
+    listing.add_argument("--limit", type=int, default=None, help="максимальное количество задач")
+    listing.set_defaults(handler=cmd_list)
+
+    complete = sub.add_parser("complete", help="отметить задачи выполненными")
+    complete.add_argument("ids", type=int, nargs="+", help="id задач")
+    complete.set_defaults(handler=cmd_complete)
+
+    search = sub.add_parser("search", help="найти текущие задачи")
+    search.add_argument("text", nargs="?", default=None, help="текст для поиска")
+    search.add_argument("--from", dest="date_from", type=_parse_date, default=None, help="дедлайн не раньше")
+    search.add_argument("--to", dest="date_to", type=_parse_date, default=None, help="дедлайн не позже")
+    search.add_argument("--limit", type=int, default=100, help="максимальное количество задач")
+    search.set_defaults(handler=cmd_search)
+
+    importing = sub.add_parser("import", help="импортировать задачи из CSV/JSONL")
+    importing.add_argument("file", help="путь к файлу")
+    importing.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    importing.add_argument("--skip-invalid", action="store_true", help="пропускать ошибочные строки")
+    importing.set_defaults(handler=cmd_import)
+
+    export = sub.add_parser("export", help="выгрузить задачи в CSV/JSONL")
+    export.add_argument("file", help="путь к файлу или '-' для стандартного вывода")
+    export.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    which = export.add_mutually_exclusive_group()
+    which.add_argument("--completed", action="store_true", help="только выполненные задачи")
+    which.add_argument("--open", action="store_true", help="только текущие задачи")
+    export.set_defaults(handler=cmd_export)
+
+    stats = sub.add_parser("stats", help="статистика задач")
+    stats.add_argument("--full", action="store_true",
+                       help="по категориям и со временем выполнения задач")
+    stats.add_argument("--days", type=int, default=30,
+                       help="окно для времени выполнения в днях, 0 - всё время (по умолчанию 30)")
+    stats.set_defaults(handler=cmd_stats)
+
+    archive = sub.add_parser("archive", help="перенести старые выполненные задачи в архив")
+    archive.add_argument("--all-users", action="store_true", help="архивировать задачи всех пользователей")
+    archive.set_defaults(handler=cmd_archive)
+
+    retention = sub.add_parser("retention", help="срок хранения выполненных задач до архива")
+    retention.add_argument("days", type=_retention_days,
+                           help="число дней, 0 - не архивировать, default - общий срок")
+    retention.set_defaults(handler=cmd_retention)
+
+    return parser
+
+
+def main(argv=None, out=None):
+    """
+    Точка входа консольного интерфейса.
+
+    :param argv: Аргументы командной строки без имени программы.
+    :type argv: list[str] | None
+    :param out: Поток для вывода результата.
+    :type out: TextIO | None
+    :return: Код завершения.
+    :rtype: int
+    """
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.user and not getattr(args, "all_users", False):
+        parser.error("укажите пользователя через --user или TASK_MANAGER_USER")
+
+    #слой хранения импортируется только здесь, чтобы --help и ошибки аргументов работали мгновенно
+    from .backends import open_storage
+    from .storage import UserNotFoundError
+    from .transfer import TaskImportError
+
+    try:
+        storage = open_storage(args.url)
+        args.handler(storage, args, out)
+    except (UserNotFoundError, TaskImportError, OSError) as err:
+        print(f"ошибка: {err}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QDateTime
 from PyQt6.QtWidgets import QDateTimeEdit
+from app.storage import CATEGORIES
 
 
 class DeadlineDialog(QDialog):
@@ -34,12 +35,7 @@ class DeadlineDialog(QDialog):
 
 
         self.category_box = QComboBox()
-        self.category_box.addItems([
-            "Учебная",
-            "Рабочая",
-            "Домашняя",
-            "Хобби"
-        ])
+        self.category_box.addItems(CATEGORIES)
 
         self.ok_button = QPushButton("ОК")
         self.cancel_button = QPushButton("Отмена")
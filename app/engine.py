@@ -0,0 +1,166 @@
+"""
+Общий на процесс реестр движков SQLAlchemy.
+
+Каждое окно и каждый экземпляр :class:`app.storage.Storage` с одним и тем же
+адресом базы получают один и тот же движок, а значит и один пул соединений.
+Схема базы проверяется один раз за время жизни процесса: если версия схемы
+совпадает с ожидаемой, миграции не запускаются.
+
+Параметры пула задаются переменными окружения:
+
+- ``DATABASE_POOL_SIZE`` - число постоянных соединений (по умолчанию 5);
+- ``DATABASE_MAX_OVERFLOW`` - сколько соединений можно открыть сверх пула (по умолчанию 10);
+- ``DATABASE_POOL_RECYCLE`` - через сколько секунд пересоздавать соединение (по умолчанию 1800);
+- ``DATABASE_POOL_PRE_PING`` - проверять соединение перед выдачей из пула (по умолчанию 1).
+
+С драйвером psycopg 3 (``postgresql+psycopg://``) частые запросы
+выполняются как подготовленные на сервере: после
+``DATABASE_PREPARE_THRESHOLD`` выполнений (по умолчанию 5) PostgreSQL
+перестаёт заново разбирать и планировать запрос. При работе через PgBouncer
+в режиме ``pool_mode = transaction`` соединения сервера переходят между
+клиентами, и подготовленные запросы там не работают - задайте
+``DATABASE_PREPARE_THRESHOLD=off``. psycopg2 подготовленные запросы не поддерживает.
+
+Файлы SQLite открываются в режиме WAL с ``synchronous=NORMAL``: чтение не
+ждёт записи, а диск синхронизируется на контрольных точках журнала, а не
+при каждой транзакции. ``DATABASE_SQLITE_MMAP`` задаёт размер отображения
+файла в память в байтах (по умолчанию 256 МБ, 0 - не отображать).
+"""
+import os
+import threading
+
+from sqlalchemy import create_engine, event, make_url
+
+from .migrations import migrate, schema_is_current
+
+
+POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.environ.get("DATABASE_POOL_PRE_PING", "1") not in ("0", "false", "no")
+PREPARE_THRESHOLD = os.environ.get("DATABASE_PREPARE_THRESHOLD", "5")
+
+SQLITE_MMAP_SIZE = int(os.environ.get("DATABASE_SQLITE_MMAP", 256 * 1024 * 1024))
+#сколько миллисекунд ждать снятия блокировки записи другим соединением
+SQLITE_BUSY_TIMEOUT = 5000
+
+#драйверы, которые сами готовят частые запросы на сервере
+_PREPARING_DRIVERS = ("psycopg", "psycopg_async")
+
+_lock = threading.Lock()
+_engines = {}
+_verified = set()
+
+
+def prepare_threshold(value):
+    """
+    Разбирает порог подготовки запросов.
+
+    :param value: Число выполнений запроса до его подготовки на сервере или "off".
+    :type value: int | str | None
+    :return: Значение параметра ``prepare_threshold`` psycopg; None - не готовить запросы.
+    :rtype: int | None
+
+    :raises ValueError: если значение не число и не "off".
+    """
+    if value is None or str(value).strip().lower() in ("", "off", "none", "no", "false"):
+        return None
+    return int(value)
+
+
+def _tune_sqlite(dbapi_connection, connection_record):
+    """
+    Настраивает новое соединение с файлом SQLite.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+def get_engine(url, pool_size=None, max_overflow=None, pool_recycle=None, pool_pre_ping=None,
+               prepare=None):
+    """
+    Возвращает общий движок для адреса базы, создавая его при первом обращении.
+
+    Параметры пула учитываются только при создании движка.
+
+    :param url: Адрес базы данных.
+    :type url: str
+    :param pool_size: Число постоянных соединений в пуле.
+    :type pool_size: int | None
+    :param max_overflow: Сколько соединений можно открыть сверх пула.
+    :type max_overflow: int | None
+    :param pool_recycle: Через сколько секунд пересоздавать соединение.
+    :type pool_recycle: int | None
+    :param pool_pre_ping: Проверять соединение перед выдачей из пула.
+    :type pool_pre_ping: bool | None
+    :param prepare: Порог подготовки запросов на сервере для psycopg 3 (число или "off").
+    :type prepare: int | str | None
+    :return: Движок SQLAlchemy.
+    :rtype: sqlalchemy.engine.Engine
+    """
+    key = str(url)
+
+    with _lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+
+        options = {
+            "future": True,
+            "pool_recycle": POOL_RECYCLE if pool_recycle is None else pool_recycle,
+            "pool_pre_ping": POOL_PRE_PING if pool_pre_ping is None else pool_pre_ping,
+        }
+        parsed = make_url(url)
+        sqlite_file = parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+        #у SQLite в памяти свой пул без ограничения размера
+        if sqlite_file or parsed.get_backend_name() != "sqlite":
+            options["pool_size"] = POOL_SIZE if pool_size is None else pool_size
+            options["max_overflow"] = MAX_OVERFLOW if max_overflow is None else max_overflow
+        if parsed.get_driver_name() in _PREPARING_DRIVERS:
+            options["connect_args"] = {
+                "prepare_threshold": prepare_threshold(PREPARE_THRESHOLD if prepare is None else prepare)
+            }
+
+        engine = create_engine(url, **options)
+        if sqlite_file:
+            event.listen(engine, "connect", _tune_sqlite)
+        _engines[key] = engine
+        return engine
+
+
+def ensure_schema(engine, metadata):
+    """
+    Проверяет схему базы один раз за время жизни процесса.
+
+    Если версия схемы уже актуальна, выполняется один запрос к
+    ``schema_version``; иначе применяются миграции.
+
+    :param engine: Движок SQLAlchemy.
+    :type engine: sqlalchemy.engine.Engine
+    :param metadata: Метаданные моделей приложения.
+    :type metadata: sqlalchemy.MetaData
+    """
+    if engine in _verified:
+        return
+
+    with _lock:
+        if engine in _verified:
+            return
+        if not schema_is_current(engine):
+            migrate(engine, metadata)
+        _verified.add(engine)
+
+
+def dispose_engines():
+    """
+    Закрывает все пулы соединений и очищает реестр.
+    """
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _verified.clear()
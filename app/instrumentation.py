@@ -0,0 +1,309 @@
+"""
+Измерение запросов и времени работы методов :class:`app.storage.Storage`.
+
+Для каждого вызова публичного метода хранилища записываются количество
+SQL-запросов, число строк, время в базе и время в Python. По последним
+вызовам каждого метода строятся перцентили и гистограмма времени, а
+повторяющиеся внутри одного вызова запросы отмечаются как возможный N+1.
+
+Измерение выключено по умолчанию. Включить его можно переменной окружения
+``TASK_MANAGER_PROFILE=1`` или вызовом ``profiler.enable()``. Если задана
+``TASK_MANAGER_PROFILE_FILE``, при выходе из программы снимок сохраняется
+в этот файл. В выключенном состоянии обёртка метода проверяет один флаг,
+а обработчики событий SQLAlchemy не подключены вовсе.
+"""
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+#сколько последних вызовов каждого метода учитывается в перцентилях и гистограмме
+WINDOW = 1000
+#сколько одинаковых запросов в одном вызове считается признаком N+1
+N_PLUS_ONE_THRESHOLD = 5
+#верхние границы корзин гистограммы в миллисекундах
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+_current = ContextVar("instrumented_call", default=None)
+
+
+class _Call:
+    """
+    Данные одного выполняющегося вызова метода.
+    """
+    __slots__ = ("method", "statements", "db_time", "rowcount", "texts")
+
+    def __init__(self, method):
+        self.method = method
+        self.statements = 0
+        self.db_time = 0.0
+        self.rowcount = 0
+        self.texts = Counter()
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class MethodStats:
+    """
+    Скользящая статистика одного метода хранилища.
+
+    :ivar calls: Общее количество вызовов.
+    :type calls: int
+    :ivar window: Последние вызовы: (общее время, время в базе, запросы, строки), время в секундах.
+    :type window: collections.deque
+    """
+    def __init__(self, size=WINDOW):
+        self.calls = 0
+        self.window = deque(maxlen=size)
+
+    def add(self, total, db_time, statements, rows):
+        self.calls += 1
+        self.window.append((total, db_time, statements, rows))
+
+    def snapshot(self):
+        """
+        Возвращает перцентили, средние значения и гистограмму по окну последних вызовов.
+
+        :rtype: dict
+        """
+        totals = sorted(item[0] * 1000 for item in self.window)
+        count = len(self.window) or 1
+        db = sum(item[1] for item in self.window) * 1000 / count
+
+        histogram = {}
+        for bound in BUCKETS_MS:
+            histogram[f"<{bound}ms"] = 0
+        histogram[f">={BUCKETS_MS[-1]}ms"] = 0
+        for value in totals:
+            for bound in BUCKETS_MS:
+                if value < bound:
+                    histogram[f"<{bound}ms"] += 1
+                    break
+            else:
+                histogram[f">={BUCKETS_MS[-1]}ms"] += 1
+
+        return {
+            "calls": self.calls,
+            "window": len(self.window),
+            "p50_ms": round(_percentile(totals, 50), 3),
+            "p95_ms": round(_percentile(totals, 95), 3),
+            "p99_ms": round(_percentile(totals, 99), 3),
+            "db_ms_mean": round(db, 3),
+            "python_ms_mean": round(sum(totals) / count - db, 3),
+            "statements_mean": round(sum(item[2] for item in self.window) / count, 2),
+            "rows_mean": round(sum(item[3] for item in self.window) / count, 2),
+            "histogram": histogram,
+        }
+
+
+class Instrumentation:
+    """
+    Сборщик статистики по вызовам методов хранилища.
+
+    :ivar enabled: Включено ли измерение.
+    :type enabled: bool
+    :ivar methods: Статистика по именам методов.
+    :type methods: dict[str, MethodStats]
+    :ivar suspects: Подозрения на N+1: (метод, запрос) -> наибольшее число повторов в одном вызове.
+    :type suspects: dict[tuple[str, str], int]
+    """
+    def __init__(self, window=WINDOW, n_plus_one=N_PLUS_ONE_THRESHOLD):
+        self.enabled = False
+        self.window = window
+        self.n_plus_one = n_plus_one
+        self.methods = {}
+        self.suspects = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """
+        Включает измерение и подключает обработчики событий SQLAlchemy ко всем движкам.
+        """
+        with self._lock:
+            if self.enabled:
+                return
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            event.listen(Engine, "handle_error", self._handle_error)
+            self.enabled = True
+
+    def disable(self):
+        """
+        Выключает измерение и отключает обработчики событий. Собранная статистика сохраняется.
+        """
+        with self._lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+            event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+            event.remove(Engine, "handle_error", self._handle_error)
+
+    def reset(self):
+        """
+        Очищает собранную статистику.
+        """
+        with self._lock:
+            self.methods = {}
+            self.suspects = {}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        call = _current.get()
+        started = conn.info.get("instrumentation_started")
+        if call is None or not started:
+            return
+
+        call.db_time += time.perf_counter() - started.pop()
+        call.statements += 1
+        call.texts[statement] += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            call.rowcount += cursor.rowcount
+
+    def _handle_error(self, context):
+        #после ошибки after_cursor_execute не вызывается: время запуска снимается здесь,
+        #иначе оно осталось бы в соединении пула до его закрытия
+        started = context.connection.info.get("instrumentation_started") if context.connection else None
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        call = _current.get()
+        if call is not None:
+            call.db_time += elapsed
+
+    def wrap(self, fn):
+        """
+        Оборачивает метод хранилища для измерения.
+
+        Вложенные вызовы (например, search_tasks -> find_tasks) учитываются
+        во внешнем методе.
+
+        :param fn: Метод хранилища.
+        :type fn: callable
+        :return: Обёрнутый метод.
+        :rtype: callable
+        """
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or _current.get() is not None:
+                return fn(*args, **kwargs)
+
+            call = _Call(name)
+            token = _current.set(call)
+            started = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                total = time.perf_counter() - started
+                _current.reset(token)
+                rows = len(result) if isinstance(result, (list, tuple)) else call.rowcount
+                self._record(call, total, rows)
+
+        return wrapper
+
+    def _record(self, call, total, rows):
+        with self._lock:
+            stats = self.methods.get(call.method)
+            if stats is None:
+                stats = self.methods[call.method] = MethodStats(self.window)
+            stats.add(total, call.db_time, call.statements, rows)
+
+            for statement, count in call.texts.items():
+                if count >= self.n_plus_one:
+                    key = (call.method, " ".join(statement.split()))
+                    self.suspects[key] = max(count, self.suspects.get(key, 0))
+
+    def snapshot(self):
+        """
+        Возвращает снимок статистики.
+
+        :return: Словарь с ключами enabled, methods и n_plus_one.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "methods": {name: stats.snapshot() for name, stats in sorted(self.methods.items())},
+                "n_plus_one": [
+                    {"method": method, "statement": statement, "count": count}
+                    for (method, statement), count in sorted(self.suspects.items())
+                ],
+            }
+
+    def dump(self, path):
+        """
+        Сохраняет снимок статистики в JSON-файл.
+
+        :param path: Путь к файлу.
+        :type path: str
+        """
+        with open(path, "w", encoding="utf-8") as fileobj:
+            json.dump(self.snapshot(), fileobj, ensure_ascii=False, indent=2)
+
+
+def format_snapshot(snapshot):
+    """
+    Формирует текстовый отчёт по снимку статистики.
+
+    :param snapshot: Снимок из :meth:`Instrumentation.snapshot`.
+    :type snapshot: dict
+    :return: Таблица по методам и список подозрений на N+1.
+    :rtype: str
+    """
+    lines = [
+        f"{'метод':<26} {'вызовов':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} "
+        f"{'БД, мс':>8} {'Python, мс':>10} {'запросов':>9} {'строк':>8}"
+    ]
+    for name, stats in snapshot["methods"].items():
+        lines.append(
+            f"{name:<26} {stats['calls']:>8} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+            f"{stats['p99_ms']:>9.2f} {stats['db_ms_mean']:>8.2f} {stats['python_ms_mean']:>10.2f} "
+            f"{stats['statements_mean']:>9} {stats['rows_mean']:>8}"
+        )
+
+    if snapshot["n_plus_one"]:
+        lines.append("")
+        lines.append("Возможный N+1:")
+        for suspect in snapshot["n_plus_one"]:
+            lines.append(f"  {suspect['method']}: {suspect['count']} раз {suspect['statement']}")
+
+    return "\n".join(lines)
+
+
+#общий на процесс сборщик статистики
+profiler = Instrumentation()
+
+
+def instrumented(fn):
+    """
+    Декоратор для измерения метода хранилища общим сборщиком :data:`profiler`.
+    """
+    return profiler.wrap(fn)
+
+
+if os.environ.get("TASK_MANAGER_PROFILE") == "1":
+    profiler.enable()
+
+if os.environ.get("TASK_MANAGER_PROFILE_FILE"):
+    atexit.register(profiler.dump, os.environ["TASK_MANAGER_PROFILE_FILE"])
@@ -0,0 +1,820 @@
+"""
+Хранилище задач в памяти процесса, без базы данных.
+
+Подходит для тестов и демонстрации интерфейса: все данные теряются при
+выходе из программы. Задачи каждого пользователя хранятся в словаре по id,
+а порядок списков поддерживают отсортированные списки ключей - (deadline, id)
+для текущих задач и (completed_at, id) для выполненных. Страница списка
+находится двоичным поиском по ключу последней загруженной задачи, как
+keyset-пагинация в базе, и не требует перебора всех задач.
+
+Задачи без дедлайна идут в начале списка, как в SQLite.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+
+from . import storage as storage_module
+from .changes import POLL_INTERVAL, TaskChange
+from .instrumentation import instrumented
+from .passwords import default_hasher
+from .stats import completion_key, summarize, window_start
+from .storage import (
+    ARCHIVE_BATCH, EXPORT_BATCH, IMPORT_BATCH, PAGE_SIZE, SEARCH_LIMIT, StorageBackend, Task,
+    TaskRow, UserAlreadyExistsError, UserNotFoundError, UserSession, WrongPasswordError,
+    _new_user, _new_users, new_task_uid,
+)
+
+
+#колонки задачи, которые копируются в объекты, возвращаемые наружу
+_TASK_FIELDS = (
+    "id", "user_id", "description", "completed", "created_at", "completed_at",
+    "deadline", "category", "updated_at", "uid", "version",
+)
+
+
+class _ExportRow(tuple):
+    """
+    Строка экспорта с доступом к полям по имени, как у строк SQLAlchemy.
+    """
+    __slots__ = ()
+    _fields = ("id", "description", "category", "deadline", "completed", "created_at", "completed_at")
+
+    def __getattr__(self, name):
+        try:
+            return self[self._fields.index(name)]
+        except ValueError:
+            raise AttributeError(name) from None
+
+
+def _open_key(deadline, task_id):
+    """
+    Ключ сортировки текущей задачи: задачи без дедлайна идут первыми.
+    """
+    return (deadline is not None, deadline or datetime.min, task_id)
+
+
+def _completed_key(completed_at, task_id):
+    """
+    Ключ сортировки выполненной задачи.
+    """
+    return (completed_at is not None, completed_at or datetime.min, task_id)
+
+
+def _as_datetime(value):
+    """
+    Приводит дату фильтра поиска к началу суток.
+    """
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+class _UserTasks:
+    """
+    Задачи одного пользователя и отсортированные ключи списков.
+
+    :ivar tasks: Задачи по id.
+    :type tasks: dict[int, Task]
+    :ivar open_keys: Ключи (deadline, id) текущих задач по возрастанию.
+    :type open_keys: list[tuple]
+    :ivar completed_keys: Ключи (completed_at, id) выполненных задач по возрастанию.
+    :type completed_keys: list[tuple]
+    :ivar categories: Количество текущих и выполненных задач по категориям.
+    :type categories: dict[str, list[int]]
+    :ivar completion: Гистограмма времени выполнения: количество задач по (дню выполнения, корзине).
+    :type completion: dict[tuple[date, int], int]
+    :ivar archived: Время переноса в архив по id выполненных задач.
+    :type archived: dict[int, datetime]
+    """
+    def __init__(self):
+        self.tasks = {}
+        self.open_keys = []
+        self.completed_keys = []
+        self.categories = {}
+        self.completion = {}
+        self.archived = {}
+
+    def add(self, task):
+        self.tasks[task.id] = task
+        counts = self.categories.setdefault(task.category, [0, 0])
+        if task.completed:
+            insort(self.completed_keys, _completed_key(task.completed_at, task.id))
+            counts[1] += 1
+            self._count_completion(task)
+        else:
+            insort(self.open_keys, _open_key(task.deadline, task.id))
+            counts[0] += 1
+
+    def complete(self, task, completed_at):
+        self.open_keys.remove(_open_key(task.deadline, task.id))
+        task.completed = True
+        task.completed_at = completed_at
+        task.updated_at = completed_at
+        task.version += 1
+        insort(self.completed_keys, _completed_key(completed_at, task.id))
+        counts = self.categories[task.category]
+        counts[0] -= 1
+        counts[1] += 1
+        self._count_completion(task)
+
+    def _count_completion(self, task):
+        key = completion_key(task.created_at, task.completed_at)
+        if key is not None:
+            self.completion[key] = self.completion.get(key, 0) + 1
+
+
+class _MemoryListener:
+    """
+    Слушатель изменений :class:`MemoryStorage`.
+
+    Изменения передаются в ``callback`` сразу, в потоке, который изменил задачи.
+    """
+    def __init__(self, storage, user_id, callback):
+        self.storage = storage
+        self.user_id = user_id
+        self.callback = callback
+
+    def stop(self, timeout=None):
+        """
+        Отписывает слушателя от изменений.
+
+        :param timeout: Не используется; оставлен для совместимости с :class:`app.changes.ChangeListener`.
+        :type timeout: float | None
+        """
+        self.storage._unsubscribe(self)
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Хранилище задач в памяти с тем же интерфейсом, что у :class:`app.storage.Storage`.
+
+    Методы потокобезопасны: все операции выполняются под одной блокировкой.
+    Возвращаемые объекты :class:`Task` - копии, их изменение не влияет на хранилище.
+
+    :ivar user_session: Контекст последнего пользователя, прошедшего авторизацию.
+    :type user_session: UserSession | None
+    :ivar hasher: Хэширование паролей.
+    :type hasher: app.passwords.PasswordHasher
+    """
+    nulls_first = True
+
+    def __init__(self, hasher=None):
+        """
+        :param hasher: Хэширование паролей. По умолчанию - :func:`app.passwords.default_hasher`.
+        :type hasher: app.passwords.PasswordHasher | None
+        """
+        self.hasher = hasher or default_hasher()
+        self._lock = threading.RLock()
+        #логин -> (id, хэш пароля)
+        self._users = {}
+        #id пользователя -> его задачи
+        self._tasks = {}
+        #id пользователя -> срок хранения выполненных задач
+        self._retention = {}
+        self._listeners = []
+        self._next_user_id = 1
+        self._next_task_id = 1
+        self.user_session = None
+        self.current_user = None
+
+    # -------------------- АВТОРИЗАЦИЯ ------------------------
+
+    @instrumented
+    def register_user(self, username, password):
+        """
+        Регистрирует нового пользователя и хеширует его пароль.
+
+        :param username: Логин пользователя.
+        :type username: str
+        :param password: Пароль пользователя.
+        :type password: str
+        :return: True при успешной регистрации.
+        :rtype: bool
+
+        :raises EmptyUsernameError: если логин пустой.
+        :raises EmptyPasswordError: если пароль пустой.
+        :raises UserAlreadyExistsError: если пользователь уже существует.
+        """
+        username = _new_user(username, password)
+
+        with self._lock:
+            if username in self._users:
+                raise UserAlreadyExistsError(f"Пользователь '{username}' уже существует")
+
+        #хэш считается без блокировки: bcrypt намеренно медленный
+        password_hash = self.hasher.hash(password)
+
+        with self._lock:
+            if username in self._users:
+                raise UserAlreadyExistsError(f"Пользователь '{username}' уже существует")
+            self._add_user(username, password_hash)
+            return True
+
+    @instrumented
+    def register_users(self, users):
+        """
+        Регистрирует много пользователей, хэшируя пароли параллельно.
+
+        :param users: Пары (логин, пароль).
+        :type users: Iterable[tuple[str, str]]
+        :return: Количество зарегистрированных пользователей.
+        :rtype: int
+
+        :raises EmptyUsernameError: если логин пустой.
+        :raises EmptyPasswordError: если пароль пустой.
+        :raises UserAlreadyExistsError: если пользователь уже существует или указан дважды.
+        """
+        users = _new_users(users)
+        self._check_free(username for username, _ in users)
+
+        hashes = self.hasher.hash_many(password for _, password in users)
+
+        with self._lock:
+            self._check_free(username for username, _ in users)
+            for (username, _), password_hash in zip(users, hashes):
+                self._add_user(username, password_hash)
+        return len(users)
+
+    def _check_free(self, usernames):
+        with self._lock:
+            for username in usernames:
+                if username in self._users:
+                    raise UserAlreadyExistsError(f"Пользователь '{username}' уже существует")
+
+    def _add_user(self, username, password_hash):
+        user_id = self._next_user_id
+        self._next_user_id += 1
+        self._users[username] = (user_id, password_hash)
+        self._tasks[user_id] = _UserTasks()
+
+    @instrumented
+    def check_login(self, username, password):
+        """
+        Проверяет логин и пароль пользователя.
+
+        :param username: Логин пользователя.
+        :type username: str
+        :param password: Пароль пользователя.
+        :type password: str
+        :return: Контекст авторизованного пользователя.
+        :rtype: UserSession
+
+        :raises UserNotFoundError: если пользователь не найден.
+        :raises WrongPasswordError: если пароль неверный.
+        """
+        with self._lock:
+            user = self._users.get(username)
+        if user is None:
+            raise UserNotFoundError(f"Пользователь '{username}' не найден")
+
+        user_id, password_hash = user
+        if not self.hasher.check(password, password_hash):
+            raise WrongPasswordError("Неверный пароль")
+
+        #стоимость bcrypt изменили: хэш пересчитывается, пока пароль известен
+        if self.hasher.needs_rehash(password_hash):
+            password_hash = self.hasher.hash(password)
+            with self._lock:
+                self._users[username] = (user_id, password_hash)
+
+        self.user_session = UserSession(user_id, username)
+        return self.user_session
+
+    def _user_id(self, user):
+        """
+        Возвращает id пользователя по логину или контексту.
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        if isinstance(user, UserSession):
+            return user.user_id
+
+        found = self._users.get(user)
+        if found is None:
+            raise UserNotFoundError(f"Пользователь '{user}' не существует")
+        return found[0]
+
+    def _user_tasks(self, user):
+        return self._tasks[self._user_id(user)]
+
+    # -------------------- РАБОТА С ЗАДАЧАМИ ------------------------
+
+    def _new_task(self, user_id, description, category, deadline=None, completed=False, completed_at=None):
+        now = datetime.now()
+        task = Task(
+            id=self._next_task_id, user_id=user_id, description=description, category=category,
+            deadline=deadline, completed=completed, completed_at=completed_at,
+            created_at=now, updated_at=now, uid=new_task_uid(), version=1
+        )
+        self._next_task_id += 1
+        return task
+
+    @instrumented
+    def add_task(self, username, task, deadline=None, category="Учебная"):
+        """
+        Добавляет новую задачу пользователю.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param task: Описание задачи.
+        :type task: str
+        :param deadline: Дедлайн задачи.
+        :type deadline: datetime | None
+        :param category: Категория задачи.
+        :type category: str
+        :return: Добавленная задача с заполненными id и updated_at.
+        :rtype: Task
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        with self._lock:
+            user_id = self._user_id(username)
+            new_task = self._new_task(user_id, task, category, deadline)
+            self._tasks[user_id].add(new_task)
+            result = _copy(new_task)
+
+        self._notify(user_id, [TaskChange(user_id, new_task.id, "INSERT", new_task.updated_at)])
+        return result
+
+    @instrumented
+    def add_tasks(self, username, tasks, batch_size=IMPORT_BATCH):
+        """
+        Добавляет пользователю много задач.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param tasks: Словари с ключами description, category, deadline, completed, completed_at.
+        :type tasks: Iterable[dict]
+        :param batch_size: Не используется; оставлен для совместимости с :class:`app.storage.Storage`.
+        :type batch_size: int
+        :return: Количество добавленных задач.
+        :rtype: int
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        #задачи собираются заранее: если итератор выбросит исключение, ничего не добавится
+        with self._lock:
+            user_id = self._user_id(username)
+        pending = list(tasks)
+
+        with self._lock:
+            user_tasks = self._tasks[user_id]
+            changes = []
+            for task in pending:
+                new_task = self._new_task(
+                    user_id, task["description"], task["category"], task.get("deadline"),
+                    bool(task.get("completed")), task.get("completed_at")
+                )
+                user_tasks.add(new_task)
+                changes.append(TaskChange(user_id, new_task.id, "INSERT", new_task.updated_at))
+
+        self._notify(user_id, changes)
+        return len(pending)
+
+    @instrumented
+    def delete_task(self, username, task):
+        """
+        Помечает выполненными все текущие задачи с таким описанием.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param task: Текст задачи.
+        :type task: str
+        """
+        with self._lock:
+            user_id = self._user_id(username)
+            user_tasks = self._tasks[user_id]
+            ids = [
+                found.id for found in user_tasks.tasks.values()
+                if not found.completed and found.description == task
+            ]
+        self.complete_tasks(username, ids)
+
+    @instrumented
+    def complete_tasks(self, username, ids, completed_at=None):
+        """
+        Помечает задачи с указанными id как выполненные.
+
+        Чужие и уже выполненные задачи не изменяются.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param ids: Идентификаторы задач.
+        :type ids: list[int]
+        :param completed_at: Время выполнения. По умолчанию - текущее.
+        :type completed_at: datetime | None
+        :return: Идентификаторы задач, которые были отмечены выполненными.
+        :rtype: list[int]
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        completed_at = completed_at or datetime.now()
+
+        with self._lock:
+            user_id = self._user_id(username)
+            user_tasks = self._tasks[user_id]
+            completed = []
+            for task_id in ids:
+                task = user_tasks.tasks.get(task_id)
+                if task is None or task.completed:
+                    continue
+                user_tasks.complete(task, completed_at)
+                completed.append(task_id)
+
+        self._notify(user_id, [TaskChange(user_id, task_id, "UPDATE", completed_at) for task_id in completed])
+        return completed
+
+    def _page(self, keys, after, limit):
+        """
+        Возвращает id задач страницы по отсортированным ключам.
+
+        :param keys: Ключи задач по возрастанию.
+        :type keys: list[tuple]
+        :param after: Ключ последней загруженной задачи или None для первой страницы.
+        :type after: tuple | None
+        :param limit: Размер страницы; None - все задачи.
+        :type limit: int | None
+        :rtype: list[int]
+        """
+        start = 0 if after is None else bisect_right(keys, after)
+        end = None if limit is None else start + limit
+        return [key[2] for key in keys[start:end]]
+
+    def _open_page(self, username, after, limit):
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            after = None if after is None else _open_key(*after)
+            ids = self._page(user_tasks.open_keys, after, limit)
+            return [user_tasks.tasks[task_id] for task_id in ids]
+
+    def _completed_page(self, username, after, limit):
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            after = None if after is None else _completed_key(*after)
+            ids = self._page(user_tasks.completed_keys, after, limit)
+            return [user_tasks.tasks[task_id] for task_id in ids]
+
+    @instrumented
+    def get_tasks_page(self, username, after=None, limit=PAGE_SIZE):
+        """
+        Возвращает страницу текущих задач пользователя, отсортированных по дедлайну.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param after: Ключ (deadline, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime | None, int] | None
+        :param limit: Размер страницы.
+        :type limit: int
+        :return: Задачи страницы.
+        :rtype: list[Task]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        return [_copy(task) for task in self._open_page(username, after, limit)]
+
+    @instrumented
+    def get_task_rows(self, username, after=None, limit=None):
+        """
+        Возвращает текущие задачи пользователя строками :class:`TaskRow`, отсортированными по дедлайну.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param after: Ключ (deadline, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime | None, int] | None
+        :param limit: Размер страницы; None - все задачи.
+        :type limit: int | None
+        :return: Строки задач.
+        :rtype: list[TaskRow]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        now = datetime.now()
+        return [TaskRow.from_task(task, now) for task in self._open_page(username, after, limit)]
+
+    @instrumented
+    def get_completed_tasks_page(self, username, after=None, limit=PAGE_SIZE):
+        """
+        Возвращает страницу выполненных задач пользователя, отсортированных по дате выполнения.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param after: Ключ (completed_at, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime, int] | None
+        :param limit: Размер страницы.
+        :type limit: int
+        :return: Задачи страницы.
+        :rtype: list[Task]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        return [_copy(task) for task in self._completed_page(username, after, limit)]
+
+    @instrumented
+    def get_completed_task_rows(self, username, after=None, limit=None):
+        """
+        Возвращает выполненные задачи пользователя строками :class:`TaskRow`, отсортированными по дате выполнения.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param after: Ключ (completed_at, id) последней загруженной задачи или None для первой страницы.
+        :type after: tuple[datetime, int] | None
+        :param limit: Размер страницы; None - все задачи.
+        :type limit: int | None
+        :return: Строки задач.
+        :rtype: list[TaskRow]
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        now = datetime.now()
+        return [TaskRow.from_task(task, now) for task in self._completed_page(username, after, limit)]
+
+    @instrumented
+    def count_tasks(self, username):
+        """
+        Подсчитывает задачи пользователя.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :return: Словарь с ключами open, completed и overdue.
+        :rtype: dict[str, int]
+        """
+        now = datetime.now()
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            keys = user_tasks.open_keys
+            #задачи без дедлайна идут первыми, за ними - задачи с дедлайном по возрастанию
+            overdue = bisect_left(keys, (True, now)) - bisect_left(keys, (True,))
+            return {
+                "open": len(user_tasks.open_keys),
+                "completed": len(user_tasks.completed_keys),
+                "overdue": overdue,
+            }
+
+    @instrumented
+    def get_stats(self, username, period=None):
+        """
+        Возвращает статистику задач пользователя из счётчиков, которые обновляются при записи задач.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param period: Окно для времени выполнения задач, с точностью до дня; None - всё время.
+        :type period: timedelta | None
+        :return: Статистика, см. :func:`app.stats.summarize`.
+        :rtype: dict
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        now = datetime.now()
+        since = window_start(period) or date.min
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            keys = user_tasks.open_keys
+            overdue = bisect_left(keys, (True, now)) - bisect_left(keys, (True,))
+            categories = {name: tuple(counts) for name, counts in user_tasks.categories.items()}
+            histogram = {}
+            for (day, bucket), count in user_tasks.completion.items():
+                if day >= since:
+                    histogram[bucket] = histogram.get(bucket, 0) + count
+        return summarize(categories, overdue, histogram, period)
+
+    @instrumented
+    def get_tasks_by_ids(self, username, ids):
+        """
+        Возвращает задачи пользователя с указанными id.
+
+        Чужие и удалённые задачи пропускаются.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param ids: Идентификаторы задач.
+        :type ids: list[int]
+        :return: Найденные задачи.
+        :rtype: list[TaskRow]
+        """
+        now = datetime.now()
+        with self._lock:
+            tasks = self._user_tasks(username).tasks
+            return [TaskRow.from_task(tasks[task_id], now) for task_id in ids if task_id in tasks]
+
+    @instrumented
+    def tasks_version(self, username):
+        """
+        Возвращает версию задач пользователя для проверки клиентского кэша.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :return: Количество задач, количество выполненных задач и время последнего изменения.
+        :rtype: tuple[int, int, datetime | None]
+        """
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            updated = max((task.updated_at for task in user_tasks.tasks.values()), default=None)
+            return len(user_tasks.tasks), len(user_tasks.completed_keys), updated
+
+    def _search(self, username, text, date_from, date_to, limit):
+        """
+        Находит текущие задачи по подстроке в описании или категории.
+
+        Релевантность - число вхождений строки поиска без учёта регистра;
+        при равной релевантности задачи идут в порядке дедлайна.
+        """
+        date_from = _as_datetime(date_from)
+        date_to = _as_datetime(date_to)
+        needle = text.casefold() if text else None
+
+        with self._lock:
+            user_tasks = self._user_tasks(username)
+            found = []
+            for key in user_tasks.open_keys:
+                task = user_tasks.tasks[key[2]]
+                if date_from and (task.deadline is None or task.deadline < date_from):
+                    continue
+                if date_to and (task.deadline is None or task.deadline > date_to):
+                    continue
+                if needle is None:
+                    found.append((0, task))
+                    continue
+                hits = f"{task.description} {task.category}".casefold().count(needle)
+                if hits:
+                    found.append((-hits, task))
+
+        #сортировка устойчивая: внутри одной релевантности сохраняется порядок дедлайна
+        found.sort(key=lambda item: item[0])
+        return [task for _, task in found[:limit]]
+
+    @instrumented
+    def find_tasks(self, username, text, date_from, date_to, limit=SEARCH_LIMIT):
+        """
+        Находит текущие задачи по тексту и диапазону дат дедлайна.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param text: Текст для поиска.
+        :type text: str | None
+        :param date_from: Начальная дата дедлайна.
+        :type date_from: date | None
+        :param date_to: Конечная дата дедлайна.
+        :type date_to: date | None
+        :param limit: Максимальное количество найденных задач.
+        :type limit: int
+        :return: Найденные задачи по убыванию релевантности.
+        :rtype: list[Task]
+        """
+        return [_copy(task) for task in self._search(username, text, date_from, date_to, limit)]
+
+    @instrumented
+    def find_task_rows(self, username, text, date_from, date_to, limit=SEARCH_LIMIT):
+        """
+        Находит текущие задачи, как :meth:`find_tasks`, и возвращает их строками :class:`TaskRow`.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param text: Текст для поиска.
+        :type text: str | None
+        :param date_from: Начальная дата дедлайна.
+        :type date_from: date | None
+        :param date_to: Конечная дата дедлайна.
+        :type date_to: date | None
+        :param limit: Максимальное количество найденных задач.
+        :type limit: int
+        :return: Найденные задачи по убыванию релевантности.
+        :rtype: list[TaskRow]
+        """
+        now = datetime.now()
+        return [TaskRow.from_task(task, now) for task in self._search(username, text, date_from, date_to, limit)]
+
+    def iter_tasks(self, username, completed=None, batch_size=EXPORT_BATCH):
+        """
+        Отдаёт задачи пользователя по возрастанию id для экспорта.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param completed: True - только выполненные, False - только текущие, None - все задачи.
+        :type completed: bool | None
+        :param batch_size: Не используется; оставлен для совместимости с :class:`app.storage.Storage`.
+        :type batch_size: int
+        :return: Строки с полями id, description, category, deadline, completed, created_at, completed_at.
+        :rtype: Iterator[tuple]
+        """
+        with self._lock:
+            tasks = sorted(self._user_tasks(username).tasks.values(), key=lambda task: task.id)
+            rows = [
+                _ExportRow((task.id, task.description, task.category, task.deadline,
+                            task.completed, task.created_at, task.completed_at))
+                for task in tasks
+                if completed is None or task.completed == completed
+            ]
+        yield from rows
+
+    # -------------------- АРХИВ ------------------------
+
+    @instrumented
+    def set_retention(self, username, days):
+        """
+        Запоминает срок хранения выполненных задач пользователя.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param days: Срок в днях; 0 - не архивировать, None - общий срок.
+        :type days: int | None
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        with self._lock:
+            user_id = self._user_id(username)
+            if days is None:
+                self._retention.pop(user_id, None)
+            else:
+                self._retention[user_id] = days
+
+    @instrumented
+    def archive_completed(self, username=None, batch_size=ARCHIVE_BATCH, now=None):
+        """
+        Отмечает перенесёнными в архив выполненные задачи старше срока хранения.
+
+        Срок считается, как в :meth:`app.storage.Storage.archive_completed`:
+        свой срок пользователя (:meth:`set_retention`) или общий
+        :data:`app.storage.RETENTION_DAYS`, 0 - не архивировать. Отдельной
+        таблицы архива в памяти нет: история уже хранится отсортированным
+        списком ключей и не замедляет работу с текущими задачами, поэтому
+        задача остаётся в истории и статистике, а повторно не переносится.
+
+        :param username: Логин пользователя или его контекст; None - все пользователи.
+        :type username: str | UserSession | None
+        :param batch_size: Не используется: задачи в памяти отмечаются под одной блокировкой.
+        :type batch_size: int
+        :param now: Текущее время для расчёта срока. По умолчанию - datetime.now().
+        :type now: datetime | None
+        :return: Количество перенесённых задач.
+        :rtype: int
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        now = now or datetime.now()
+        moved = 0
+        with self._lock:
+            user_ids = list(self._tasks) if username is None else [self._user_id(username)]
+            for user_id in user_ids:
+                days = self._retention.get(user_id, storage_module.RETENTION_DAYS)
+                if not days:
+                    continue
+                user_tasks = self._tasks[user_id]
+                #ключи истории отсортированы по времени выполнения: старые задачи идут подряд
+                keys = user_tasks.completed_keys
+                first = bisect_left(keys, (True,))
+                last = bisect_left(keys, (True, now - timedelta(days=days)))
+                for _, _, task_id in keys[first:last]:
+                    if task_id not in user_tasks.archived:
+                        user_tasks.archived[task_id] = now
+                        moved += 1
+        return moved
+
+    # -------------------- ИЗМЕНЕНИЯ ------------------------
+
+    def listen_changes(self, username, callback=None, interval=POLL_INTERVAL):
+        """
+        Подписывает ``callback`` на изменения задач пользователя.
+
+        В отличие от :meth:`app.storage.Storage.listen_changes`, фонового
+        потока нет: изменения передаются сразу из метода, который их сделал.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :param callback: Вызывается со списком :class:`app.changes.TaskChange`.
+        :type callback: callable | None
+        :param interval: Не используется.
+        :type interval: float
+        :return: Слушатель; отписать его можно методом ``stop``.
+
+        :raises UserNotFoundError: если пользователь не найден.
+        """
+        with self._lock:
+            listener = _MemoryListener(self, self._user_id(username), callback)
+            self._listeners.append(listener)
+        return listener
+
+    def _unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, user_id, changes):
+        """
+        Передаёт изменения слушателям пользователя вне блокировки хранилища.
+        """
+        if not changes:
+            return
+        with self._lock:
+            listeners = [listener for listener in self._listeners if listener.user_id == user_id]
+        for listener in listeners:
+            if listener.callback is not None:
+                listener.callback(changes)
+
+
+def _copy(task):
+    """
+    Возвращает отдельную копию задачи, чтобы вызывающий не менял хранилище.
+    """
+    return Task(**{name: getattr(task, name) for name in _TASK_FIELDS})
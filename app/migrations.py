@@ -0,0 +1,722 @@
+"""
+Версионированные миграции схемы базы данных.
+
+Номер текущей версии схемы хранится в таблице ``schema_version``.
+При запуске :func:`migrate` применяет по порядку все миграции, номер которых
+больше сохранённого. Индексы на PostgreSQL строятся через
+``CREATE INDEX CONCURRENTLY``, поэтому миграцию можно запускать на рабочей
+базе, не блокируя запись в таблицу задач.
+
+Запуск из консоли::
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+    python -m app.migrations explain --user <логин>
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+from .stats import COMPLETION_BOUNDS
+
+
+# произвольная константа для pg_advisory_lock, чтобы два клиента не мигрировали базу одновременно
+MIGRATION_LOCK_ID = 7_245_001
+#сколько строк один оператор может изменить, прежде чем клиентам придёт одно RELOAD вместо отдельных уведомлений
+CHANGE_BATCH_LIMIT = 100
+
+
+class Migration:
+    """
+    Одна миграция схемы.
+
+    :ivar version: Номер версии схемы после применения миграции.
+    :type version: int
+    :ivar description: Краткое описание изменений.
+    :type description: str
+    :ivar upgrade: Функция ``upgrade(conn, metadata)``, применяющая изменения.
+    :type upgrade: callable
+    """
+    def __init__(self, version, description, upgrade):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+
+def _create_index(conn, name, table, columns, where=None, using=None, unique=False):
+    """
+    Создаёт индекс, если его ещё нет.
+
+    На PostgreSQL индекс строится онлайн (``CONCURRENTLY``). Если прошлая
+    попытка построения прервалась, PostgreSQL оставляет невалидный индекс -
+    такой индекс удаляется и строится заново.
+
+    :param conn: Соединение в режиме AUTOCOMMIT.
+    :type conn: sqlalchemy.engine.Connection
+    :param name: Имя индекса.
+    :type name: str
+    :param table: Имя таблицы.
+    :type table: str
+    :param columns: Список колонок индекса через запятую.
+    :type columns: str
+    :param where: Условие частичного индекса.
+    :type where: str | None
+    :param using: Метод доступа индекса (например, ``gin``), только для PostgreSQL.
+    :type using: str | None
+    :param unique: Создать уникальный индекс.
+    :type unique: bool
+    """
+    predicate = f" WHERE {where}" if where else ""
+    method = f" USING {using}" if using else ""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+
+    if conn.dialect.name == "postgresql":
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+        conn.execute(text(
+            f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table}{method} ({columns}){predicate}"
+        ))
+    else:
+        conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns}){predicate}"))
+
+
+def _literal(conn, value):
+    """
+    Возвращает булеву константу в том виде, в котором её выводит SQLAlchemy для текущего диалекта.
+
+    Условие частичного индекса должно совпадать с условием запроса, иначе
+    планировщик SQLite не выберет индекс.
+    """
+    if conn.dialect.name == "postgresql":
+        return "true" if value else "false"
+    return "1" if value else "0"
+
+
+def _baseline(conn, metadata):
+    """
+    Создаёт исходные таблицы ``users`` и ``tasks`` в том виде, в каком их
+    создавала первая версия приложения.
+
+    Схема записана явно, а не берётся из моделей: колонки и таблицы, которые
+    появились позже, добавляют следующие миграции, и новая база проходит тот
+    же путь, что и база, созданная до миграций.
+    """
+    if conn.dialect.name == "postgresql":
+        serial, timestamp, naive, now = "SERIAL", "TIMESTAMP WITH TIME ZONE", "TIMESTAMP WITHOUT TIME ZONE", "now()"
+    else:
+        serial, timestamp, naive, now = "INTEGER", "DATETIME", "DATETIME", "CURRENT_TIMESTAMP"
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS users ("
+        f"id {serial} NOT NULL, "
+        "username VARCHAR(150) NOT NULL, "
+        "password_hash VARCHAR NOT NULL, "
+        "PRIMARY KEY (id), "
+        "UNIQUE (username))"
+    ))
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        f"id {serial} NOT NULL, "
+        "user_id INTEGER, "
+        "description VARCHAR NOT NULL, "
+        "completed BOOLEAN, "
+        f"created_at {timestamp} DEFAULT {now}, "
+        f"completed_at {timestamp}, "
+        f"deadline {naive}, "
+        "category VARCHAR(50) NOT NULL, "
+        "PRIMARY KEY (id), "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE)"
+    ))
+
+
+def _task_indexes(conn, metadata):
+    """
+    Добавляет индексы под горячие запросы :class:`app.storage.Storage`.
+
+    - текущие задачи пользователя, отсортированные по дедлайну;
+    - выполненные задачи пользователя, отсортированные по дате выполнения.
+    """
+    _create_index(
+        conn, "ix_tasks_open_user_deadline", "tasks", "user_id, deadline",
+        where=f"completed = {_literal(conn, False)}"
+    )
+    _create_index(
+        conn, "ix_tasks_done_user_completed_at", "tasks", "user_id, completed_at",
+        where=f"completed = {_literal(conn, True)}"
+    )
+
+
+def _search_index(conn, metadata):
+    """
+    Добавляет полнотекстовый индекс для поиска задач.
+
+    На PostgreSQL - триграммный GIN-индекс pg_trgm по описанию и категории
+    текущих задач. На SQLite - таблица FTS5 с триграммным токенизатором,
+    которую триггеры синхронизируют с таблицей ``tasks``.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        _create_index(
+            conn, "ix_tasks_search_trgm", "tasks",
+            "(description || ' ' || category) gin_trgm_ops",
+            where=f"completed = {_literal(conn, False)}", using="gin"
+        )
+        return
+
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+        "description, category, content='tasks', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts (rowid, description, category) "
+        "VALUES (new.id, new.description, new.category); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, description, category) "
+        "VALUES ('delete', old.id, old.description, old.category); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF description, category ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, description, category) "
+        "VALUES ('delete', old.id, old.description, old.category); "
+        "INSERT INTO tasks_fts (rowid, description, category) "
+        "VALUES (new.id, new.description, new.category); END"
+    ))
+    conn.execute(text("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')"))
+
+
+def _task_updated_at(conn, metadata):
+    """
+    Добавляет задачам время последнего изменения ``updated_at``.
+
+    По нему и количеству задач клиент дешёвым запросом проверяет, не
+    изменились ли задачи пользователя с последней загрузки. Для старых
+    задач время изменения берётся из даты выполнения или создания.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+    if "updated_at" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN updated_at TIMESTAMP"))
+
+    conn.execute(text(
+        "UPDATE tasks SET updated_at = coalesce(completed_at, created_at) WHERE updated_at IS NULL"
+    ))
+    _create_index(conn, "ix_tasks_user_version", "tasks", "user_id, completed, updated_at")
+
+
+def _change_notifications(conn, metadata):
+    """
+    Публикует изменения задач другим клиентам.
+
+    На PostgreSQL триггеры уровня оператора отправляют ``pg_notify`` в канал
+    ``task_changes_<user_id>`` с id пользователя, id задачи, операцией и
+    временем изменения. Если один оператор изменил больше
+    ``CHANGE_BATCH_LIMIT`` строк (например, импорт), вместо отдельных
+    уведомлений отправляется одно ``RELOAD`` на пользователя.
+
+    На SQLite, где LISTEN/NOTIFY нет, триггеры пишут изменения в журнал
+    ``task_changes``, который клиенты опрашивают по последнему id.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION tasks_notify() RETURNS trigger AS $$ "
+            "BEGIN "
+            f"IF (SELECT count(*) FROM changed) > {CHANGE_BATCH_LIMIT} THEN "
+            "PERFORM pg_notify('task_changes_' || user_id, json_build_object("
+            "'user_id', user_id, 'task_id', NULL, 'op', 'RELOAD', 'updated_at', NULL)::text) "
+            "FROM (SELECT DISTINCT user_id FROM changed) AS users; "
+            "ELSE "
+            "PERFORM pg_notify('task_changes_' || user_id, json_build_object("
+            "'user_id', user_id, 'task_id', id, 'op', TG_OP, 'updated_at', updated_at)::text) "
+            "FROM changed; "
+            "END IF; "
+            "RETURN NULL; "
+            "END $$ LANGUAGE plpgsql"
+        ))
+        #у триггера с переходной таблицей может быть только одно событие
+        for op, transition in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            name = f"tasks_notify_{op.lower()}"
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name} ON tasks"))
+            conn.execute(text(
+                f"CREATE TRIGGER {name} AFTER {op} ON tasks "
+                f"REFERENCING {transition} TABLE AS changed "
+                "FOR EACH STATEMENT EXECUTE FUNCTION tasks_notify()"
+            ))
+        return
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS task_changes ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "user_id INTEGER NOT NULL, "
+        "task_id INTEGER NOT NULL, "
+        "op VARCHAR(6) NOT NULL, "
+        "updated_at TIMESTAMP, "
+        "changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    _create_index(conn, "ix_task_changes_user", "task_changes", "user_id, id")
+    for op, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS task_changes_{op.lower()} AFTER {op} ON tasks BEGIN "
+            "INSERT INTO task_changes (user_id, task_id, op, updated_at) "
+            f"VALUES ({row}.user_id, {row}.id, '{op}', {row}.updated_at); END"
+        ))
+
+
+def _task_sync_columns(conn, metadata):
+    """
+    Добавляет задачам глобальный идентификатор ``uid`` и номер версии ``version``.
+
+    По ``uid`` локальная реплика (:mod:`app.replica`) сопоставляет свои
+    задачи с задачами основной базы, а по ``version`` находит изменившиеся
+    задачи и конфликты. Старым задачам выдаются случайные ``uid``.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+    if "uid" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN uid VARCHAR(32)"))
+    if "version" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+    if conn.dialect.name == "postgresql":
+        new_uid = "replace(gen_random_uuid()::text, '-', '')"
+    else:
+        new_uid = "lower(hex(randomblob(16)))"
+    conn.execute(text(f"UPDATE tasks SET uid = {new_uid} WHERE uid IS NULL"))
+    _create_index(conn, "ux_tasks_uid", "tasks", "uid", unique=True)
+
+
+#колонки задачи, от которых зависит статистика
+_STATS_COLUMNS = ("user_id", "category", "completed", "created_at", "completed_at")
+
+
+def _count_stats(rows, sign):
+    """
+    Возвращает оператор, который прибавляет задачи ``rows`` к счётчикам ``task_stats`` со знаком ``sign``.
+    """
+    return (
+        "INSERT INTO task_stats (user_id, category, open_count, completed_count) "
+        "SELECT user_id, category, "
+        f"{sign} * sum(CASE WHEN completed THEN 0 ELSE 1 END), "
+        f"{sign} * sum(CASE WHEN completed THEN 1 ELSE 0 END) "
+        f"FROM {rows} AS r WHERE user_id IS NOT NULL GROUP BY user_id, category "
+        "ON CONFLICT (user_id, category) DO UPDATE SET "
+        "open_count = task_stats.open_count + excluded.open_count, "
+        "completed_count = task_stats.completed_count + excluded.completed_count"
+    )
+
+
+def _completion_stats(conn, rows, sign):
+    """
+    Возвращает оператор, который прибавляет выполненные задачи ``rows`` к гистограмме ``task_completion_stats``.
+
+    Номер корзины считается так же, как :func:`app.stats.completion_bucket`.
+    """
+    if conn.dialect.name == "postgresql":
+        day = "CAST(r.completed_at AS date)"
+        seconds = "extract(epoch FROM r.completed_at - r.created_at)"
+    else:
+        day = "date(r.completed_at)"
+        #created_at заполняет CURRENT_TIMESTAMP в UTC, а completed_at записывается по местному времени
+        seconds = "(julianday(r.completed_at, 'utc') - julianday(r.created_at)) * 86400"
+
+    bucket = " ".join(f"WHEN d < {bound} THEN {number}" for number, bound in enumerate(COMPLETION_BOUNDS))
+    return (
+        "INSERT INTO task_completion_stats (user_id, day, bucket, completed_count) "
+        f"SELECT user_id, day, CASE {bucket} ELSE {len(COMPLETION_BOUNDS)} END AS bucket, {sign} * count(*) "
+        f"FROM (SELECT r.user_id AS user_id, {day} AS day, {seconds} AS d FROM {rows} AS r "
+        "WHERE r.completed AND r.completed_at IS NOT NULL AND r.created_at IS NOT NULL "
+        "AND r.user_id IS NOT NULL) AS done "
+        "WHERE true GROUP BY user_id, day, bucket "
+        "ON CONFLICT (user_id, day, bucket) DO UPDATE SET "
+        "completed_count = task_completion_stats.completed_count + excluded.completed_count"
+    )
+
+
+def _stats_triggers(conn, table, ops):
+    """
+    Создаёт триггеры, которые учитывают в статистике изменения строк таблицы ``table``.
+
+    :param table: Таблица задач: ``tasks`` или архив ``tasks_archive``.
+    :type table: str
+    :param ops: Операции, для которых нужны триггеры: insert, delete, update.
+    :type ops: tuple[str, ...]
+    """
+    def apply(rows, sign):
+        return f"{_count_stats(rows, sign)}; {_completion_stats(conn, rows, sign)};"
+
+    if conn.dialect.name == "postgresql":
+        old = ", ".join(f"o.{name}" for name in _STATS_COLUMNS)
+        new = ", ".join(f"n.{name}" for name in _STATS_COLUMNS)
+        #обновление учитывается, только если изменились колонки статистики
+        changed = f"FROM old_rows o JOIN new_rows n ON n.id = o.id WHERE ({old}) IS DISTINCT FROM ({new})"
+        bodies = {
+            "insert": apply("new_rows", 1),
+            "delete": apply("old_rows", -1),
+            "update": apply(f"(SELECT o.* {changed})", -1) + " " + apply(f"(SELECT n.* {changed})", 1),
+        }
+        transitions = {
+            "insert": "NEW TABLE AS new_rows",
+            "delete": "OLD TABLE AS old_rows",
+            "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        }
+        for op in ops:
+            name = f"{table}_stats_{op}"
+            conn.execute(text(
+                f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$ "
+                f"BEGIN {bodies[op]} RETURN NULL; END $$ LANGUAGE plpgsql"
+            ))
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name} ON {table}"))
+            conn.execute(text(
+                f"CREATE TRIGGER {name} AFTER {op.upper()} ON {table} "
+                f"REFERENCING {transitions[op]} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION {name}()"
+            ))
+        return
+
+    def row(prefix):
+        columns = ", ".join(f"{prefix}.{name} AS {name}" for name in _STATS_COLUMNS)
+        return f"(SELECT {columns})"
+
+    bodies = {
+        "insert": ("INSERT", apply(row("new"), 1)),
+        "delete": ("DELETE", apply(row("old"), -1)),
+        "update": (f"UPDATE OF {', '.join(_STATS_COLUMNS)}", f"{apply(row('old'), -1)} {apply(row('new'), 1)}"),
+    }
+    for op in ops:
+        event, body = bodies[op]
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_stats_{op} AFTER {event} ON {table} BEGIN {body} END"
+        ))
+
+
+def _task_archive(conn, metadata):
+    """
+    Добавляет архив выполненных задач и сроки хранения.
+
+    Таблица ``tasks_archive`` повторяет колонки ``tasks`` и хранит задачи с
+    прежними id, а индекс (user_id, completed_at, id) отдаёт страницы
+    истории в том же порядке, что и основная таблица. Перенос задачи в архив
+    - удаление из ``tasks`` и вставка в архив; триггеры архива возвращают
+    задачу в статистику, поэтому счётчики не меняются. Колонка
+    ``users.retention_days`` задаёт пользователю свой срок хранения.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "retention_days" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN retention_days INTEGER"))
+
+    metadata.tables["tasks_archive"].create(conn, checkfirst=True)
+    _stats_triggers(conn, "tasks_archive", ("insert", "delete"))
+
+
+def _task_stats(conn, metadata):
+    """
+    Добавляет сводные таблицы статистики задач (:mod:`app.stats`).
+
+    ``task_stats`` хранит количество текущих и выполненных задач
+    пользователя по категориям, ``task_completion_stats`` - число задач,
+    выполненных за день, по корзинам времени выполнения. Таблицы обновляют
+    триггеры на ``tasks``: на PostgreSQL - уровня оператора с переходными
+    таблицами, поэтому импорт обновляет каждый счётчик один раз, на SQLite -
+    уровня строки. Существующие задачи учитываются при миграции.
+    """
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS task_stats ("
+        "user_id INTEGER NOT NULL, "
+        "category VARCHAR(50) NOT NULL, "
+        "open_count INTEGER NOT NULL DEFAULT 0, "
+        "completed_count INTEGER NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (user_id, category))"
+    ))
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS task_completion_stats ("
+        "user_id INTEGER NOT NULL, "
+        "day DATE NOT NULL, "
+        "bucket INTEGER NOT NULL, "
+        "completed_count INTEGER NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (user_id, day, bucket))"
+    ))
+
+    _stats_triggers(conn, "tasks", ("insert", "delete", "update"))
+
+    #пересчёт с нуля: прерванную миграцию можно повторить
+    conn.execute(text("DELETE FROM task_stats"))
+    conn.execute(text("DELETE FROM task_completion_stats"))
+    conn.execute(text(_count_stats("tasks", 1)))
+    conn.execute(text(_completion_stats(conn, "tasks", 1)))
+
+
+MIGRATIONS = [
+    Migration(1, "исходная схема", _baseline),
+    Migration(2, "индексы задач пользователя", _task_indexes),
+    Migration(3, "полнотекстовый поиск задач", _search_index),
+    Migration(4, "время изменения задач", _task_updated_at),
+    Migration(5, "уведомления об изменениях задач", _change_notifications),
+    Migration(6, "идентификаторы и версии задач для синхронизации", _task_sync_columns),
+    Migration(7, "статистика задач", _task_stats),
+    Migration(8, "архив выполненных задач", _task_archive),
+]
+
+#: Версия схемы, которую ожидает текущий код.
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+@contextmanager
+def _migration_lock(conn):
+    """
+    Не даёт нескольким клиентам мигрировать одну базу одновременно.
+
+    На PostgreSQL берётся сессионная advisory-блокировка, на SQLite
+    сериализацию обеспечивает сама база.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    else:
+        yield
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+
+
+def current_version(conn):
+    """
+    Возвращает сохранённую версию схемы.
+
+    :param conn: Соединение с базой данных.
+    :type conn: sqlalchemy.engine.Connection
+    :return: Номер версии или 0, если миграции ещё не применялись.
+    :rtype: int
+    """
+    _ensure_version_table(conn)
+    version = conn.execute(text("SELECT max(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def schema_is_current(engine):
+    """
+    Проверяет, что схема базы уже имеет ожидаемую версию.
+
+    Выполняет один запрос на чтение и не создаёт таблиц, поэтому подходит
+    для быстрой проверки при каждом запуске приложения.
+
+    :param engine: Движок SQLAlchemy.
+    :type engine: sqlalchemy.engine.Engine
+    :return: True, если миграции не нужны.
+    :rtype: bool
+    """
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(text("SELECT max(version) FROM schema_version")).scalar()
+        except DBAPIError:
+            #таблицы версий ещё нет - база не мигрировалась
+            return False
+    return version == SCHEMA_VERSION
+
+
+def _set_version(conn, version):
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def migrate(engine, metadata, target=None):
+    """
+    Применяет к базе все недостающие миграции.
+
+    Каждая миграция идемпотентна, поэтому прерванный запуск можно просто
+    повторить.
+
+    :param engine: Движок SQLAlchemy.
+    :type engine: sqlalchemy.engine.Engine
+    :param metadata: Метаданные моделей приложения.
+    :type metadata: sqlalchemy.MetaData
+    :param target: Версия, до которой нужно мигрировать. По умолчанию - последняя.
+    :type target: int | None
+    :return: Версия схемы после миграции.
+    :rtype: int
+    """
+    target = SCHEMA_VERSION if target is None else target
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        with _migration_lock(conn):
+            version = current_version(conn)
+            for migration in MIGRATIONS:
+                if version < migration.version <= target:
+                    migration.upgrade(conn, metadata)
+                    _set_version(conn, migration.version)
+                    version = migration.version
+            return version
+
+
+# -------------------- ПЛАНЫ ЗАПРОСОВ ------------------------
+
+def _sample_calls(username):
+    """
+    Возвращает вызовы методов Storage с типичными аргументами.
+    """
+    today = date.today()
+    return [
+        ("add_task", (username, "explain", datetime.now() + timedelta(days=1), "Учебная")),
+        ("get_tasks", (username,)),
+        ("get_task_rows", (username, None, 100)),
+        ("get_completed_task_rows", (username, None, 100)),
+        ("complete_tasks", (username, [0])),
+        ("delete_task", (username, "explain")),
+        ("get_completed_tasks", (username,)),
+        ("tasks_version", (username,)),
+        ("search_tasks", (username, "explain", today - timedelta(days=30), today + timedelta(days=30))),
+        ("get_stats", (username, timedelta(days=30))),
+    ]
+
+
+def _is_full_scan(dialect, line):
+    if dialect == "postgresql":
+        return "Seq Scan on tasks" in line
+    return line.split()[:2] == ["SCAN", "tasks"]
+
+
+def _explain_engine(engine):
+    """
+    Возвращает движок, транзакцию которого можно откатить вместе со всеми вложенными commit.
+
+    Драйвер sqlite3 сам управляет транзакциями и не поддерживает SAVEPOINT
+    внутри внешней транзакции SQLAlchemy, поэтому для SQLite создаётся
+    отдельный движок с явным BEGIN (рецепт из документации SQLAlchemy).
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    engine = create_engine(engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def explain_plans(storage, username):
+    """
+    Выполняет методы Storage и возвращает планы всех выполненных ими запросов.
+
+    Методы работают внутри транзакции, которая в конце откатывается, поэтому
+    данные в базе не меняются.
+
+    :param storage: Хранилище, методы которого нужно проверить.
+    :type storage: Storage
+    :param username: Существующий пользователь, от имени которого выполняются запросы.
+    :type username: str
+    :return: Список кортежей (метод, SQL, строки плана).
+    :rtype: list[tuple[str, str, list[str]]]
+    """
+    dialect = storage.engine.dialect.name
+    prefix = "EXPLAIN " if dialect == "postgresql" else "EXPLAIN QUERY PLAN "
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("EXPLAIN", "BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK")):
+            captured.append((statement, parameters))
+
+    session_factory = storage.SessionLocal
+    results = []
+
+    engine = _explain_engine(storage.engine)
+
+    with engine.connect() as conn:
+        outer = conn.begin()
+        storage.SessionLocal = sessionmaker(
+            bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+        )
+        event.listen(conn, "before_cursor_execute", capture)
+        try:
+            for name, args in _sample_calls(username):
+                captured.clear()
+                getattr(storage, name)(*args)
+                statements = list(captured)
+                for statement, parameters in statements:
+                    rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+                    # у PostgreSQL план в единственной колонке, у SQLite - в последней
+                    plan = [str(row[-1]) for row in rows]
+                    results.append((name, statement, plan))
+        finally:
+            event.remove(conn, "before_cursor_execute", capture)
+            storage.SessionLocal = session_factory
+            outer.rollback()
+
+    return results
+
+
+def check_plans(storage, username, out=sys.stdout):
+    """
+    Печатает планы запросов всех методов Storage и отмечает полные сканирования таблицы задач.
+
+    :return: Количество запросов, читающих всю таблицу ``tasks``.
+    :rtype: int
+    """
+    dialect = storage.engine.dialect.name
+    scans = 0
+    for name, statement, plan in explain_plans(storage, username):
+        print(f"== {name}", file=out)
+        print(" ".join(statement.split()), file=out)
+        for line in plan:
+            mark = ""
+            if _is_full_scan(dialect, line):
+                mark = "   <-- полное сканирование"
+                scans += 1
+            print(f"    {line}{mark}", file=out)
+        print(file=out)
+    return scans
+
+
+def main(argv=None):
+    """
+    Консольная точка входа для управления миграциями.
+    """
+    from .storage import Base, Storage, DATABASE_URL
+
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("--url", default=DATABASE_URL, help="адрес базы данных")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("upgrade", help="применить недостающие миграции")
+    sub.add_parser("status", help="показать версию схемы")
+    explain = sub.add_parser("explain", help="показать планы запросов Storage")
+    explain.add_argument("--user", required=True, help="логин существующего пользователя")
+    explain.add_argument("--strict", action="store_true",
+                         help="завершиться с ошибкой, если есть полные сканирования tasks")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        engine = create_engine(args.url)
+        with engine.connect() as conn:
+            print(f"версия схемы: {current_version(conn)} (ожидается {SCHEMA_VERSION})")
+        return 0
+
+    if args.command == "upgrade":
+        print(f"версия схемы: {migrate(create_engine(args.url), Base.metadata)}")
+        return 0
+
+    storage = Storage(args.url)
+    scans = check_plans(storage, args.user)
+    return 1 if scans and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
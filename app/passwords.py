@@ -0,0 +1,167 @@
+"""
+Хэширование паролей bcrypt.
+
+bcrypt намеренно медленный: один хэш при стоимости 12 занимает сотни
+миллисекунд процессора. Поэтому окна входа и регистрации вызывают хранилище
+через :class:`app.background.StorageWorker`, и хэш считается в его пуле
+потоков, а не в потоке интерфейса. Массовая регистрация
+(:meth:`PasswordHasher.hash_many`) распределяется по ядрам пулом потоков.
+
+По умолчанию :class:`PasswordHasher` хэширует в вызывающем потоке, без пула
+процессов: bcrypt отпускает GIL на время хэширования, так что потоки уже
+нагружают все ядра, а процессы пула запускаются методом spawn (форкать
+процесс с потоками Qt и пулом соединений небезопасно) и при старте заново
+импортируют главный модуль программы - для ``app.main`` вместе с PyQt6.
+Вход одного пользователя от такого пула только замедлился бы.
+
+Стоимость хэша задаёт ``TASK_MANAGER_BCRYPT_ROUNDS`` (по умолчанию 12).
+``TASK_MANAGER_HASH_WORKERS`` больше 0 включает пул из стольких процессов;
+он создаётся при первом хэше и нужен сервису, у которого хэширование в
+потоках упирается в процессор из-за других потоков, держащих GIL. Хэши с
+другой стоимостью продолжают работать, а при входе пересчитываются с текущей
+(:meth:`PasswordHasher.needs_rehash`).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+
+#стоимость (log2 числа раундов) новых хэшей
+BCRYPT_ROUNDS = int(os.environ.get("TASK_MANAGER_BCRYPT_ROUNDS", 12))
+#число процессов хэширования; 0 - хэшировать в потоках без пула процессов
+HASH_WORKERS = int(os.environ.get("TASK_MANAGER_HASH_WORKERS", 0))
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def hash_rounds(password_hash):
+    """
+    Возвращает стоимость bcrypt-хэша вида ``$2b$12$...``.
+
+    :param password_hash: Хэш пароля.
+    :type password_hash: str
+    :return: Стоимость или None, если строка не похожа на хэш bcrypt.
+    :rtype: int | None
+    """
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей в вызывающем потоке или в пуле процессов.
+
+    Пул процессов создаётся при первом обращении и общий для всех потоков.
+
+    :ivar rounds: Стоимость новых хэшей.
+    :type rounds: int
+    :ivar max_workers: Число процессов; 0 - считать в потоках без пула процессов.
+    :type max_workers: int
+    """
+    def __init__(self, rounds=None, max_workers=None):
+        self.rounds = BCRYPT_ROUNDS if rounds is None else rounds
+        self.max_workers = HASH_WORKERS if max_workers is None else max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                #spawn: процесс с потоками Qt и пулом соединений нельзя безопасно форкать
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _call(self, fn, *args):
+        if not self.max_workers:
+            return fn(*args)
+        return self._pool().submit(fn, *args).result()
+
+    def hash(self, password):
+        """
+        Хэширует пароль с текущей стоимостью.
+
+        :param password: Пароль.
+        :type password: str
+        :return: Хэш bcrypt.
+        :rtype: str
+        """
+        return self._call(_hash, password, self.rounds)
+
+    def check(self, password, password_hash):
+        """
+        Проверяет пароль по хэшу любой стоимости.
+
+        :param password: Пароль.
+        :type password: str
+        :param password_hash: Сохранённый хэш.
+        :type password_hash: str
+        :rtype: bool
+        """
+        return self._call(_check, password, password_hash)
+
+    def hash_many(self, passwords):
+        """
+        Хэширует пароли параллельно: в процессах пула или, без него, в потоках по числу ядер.
+
+        :param passwords: Пароли.
+        :type passwords: Iterable[str]
+        :return: Хэши в том же порядке.
+        :rtype: list[str]
+        """
+        passwords = list(passwords)
+        if not self.max_workers:
+            if len(passwords) < 2:
+                return [_hash(password, self.rounds) for password in passwords]
+            with ThreadPoolExecutor(min(len(passwords), os.cpu_count() or 1)) as threads:
+                return list(threads.map(_hash, passwords, [self.rounds] * len(passwords)))
+        return list(self._pool().map(_hash, passwords, [self.rounds] * len(passwords)))
+
+    def needs_rehash(self, password_hash):
+        """
+        Проверяет, что хэш посчитан с другой стоимостью и его нужно пересчитать при входе.
+
+        :param password_hash: Сохранённый хэш.
+        :type password_hash: str
+        :rtype: bool
+        """
+        rounds = hash_rounds(password_hash)
+        return rounds is not None and rounds != self.rounds
+
+    def shutdown(self, wait=True):
+        """
+        Останавливает процессы пула.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait)
+                self._executor = None
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_hasher():
+    """
+    Возвращает общий для процесса :class:`PasswordHasher` с настройками из окружения.
+
+    :rtype: PasswordHasher
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PasswordHasher()
+        return _default
@@ -0,0 +1,738 @@
+"""
+Локальная реплика задач для работы без сети.
+
+:class:`ReplicaStorage` хранит задачи пользователя в локальном файле SQLite
+и выполняет все чтения из него, поэтому приложение запускается и работает,
+даже если основная база недоступна или отвечает медленно. Добавление и
+выполнение задач сразу записываются в реплику, а вместе с ними - в
+очередь ``outbox`` в той же транзакции. Фоновый поток :class:`SyncWorker`
+отправляет очередь в основную базу пачками и загружает оттуда изменения,
+сделанные другими клиентами.
+
+Задачи реплики и основной базы сопоставляются по ``uid``. Каждое изменение
+увеличивает ``version`` задачи; операция выполнения задачи применяется в
+основной базе, только если версия там не изменилась с момента выполнения
+в реплике. Иначе это конфликт:
+
+- если в основной базе задача уже выполнена, остаётся её время выполнения;
+- если задача изменилась, но ещё не выполнена, выполнение применяется
+  поверх новой версии;
+- если задачи в основной базе больше нет, операция отбрасывается.
+
+После конфликта реплика перечитывает задачу из основной базы.
+
+Загрузка изменений инкрементальная: реплика запоминает наибольшее время
+изменения (``updated_at``) задач, загруженных из основной базы, и следующая
+синхронизация запрашивает только задачи, изменившиеся после него. Время
+пишут разные клиенты, а транзакция может зафиксироваться позже, чем
+записано её время, поэтому запрос захватывает ещё :data:`PULL_OVERLAP` до
+отметки; задачи, чья версия в реплике уже не меньше, повторно не читаются.
+Архив основной базы читается при первой синхронизации и после изменения
+срока хранения.
+
+Реплика включается переменной окружения ``TASK_MANAGER_REPLICA`` - путём к
+файлу SQLite. ``TASK_MANAGER_SYNC_INTERVAL`` задаёт паузу между
+синхронизациями в секундах (по умолчанию 30); после каждой записи
+синхронизация запускается сразу.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, Text, delete, func, insert, make_url, select, union_all,
+    update
+)
+from sqlalchemy.exc import DBAPIError
+
+from . import storage as storage_module
+from .instrumentation import instrumented
+from .storage import (
+    ARCHIVE_BATCH, IMPORT_BATCH, TASKS_ARCHIVE, Storage, Task, User, UserNotFoundError, UserSession,
+    _complete_statement, new_task_uid
+)
+
+
+#путь к файлу локальной реплики; без него приложение работает с основной базой напрямую
+REPLICA_PATH = os.environ.get("TASK_MANAGER_REPLICA")
+#пауза между синхронизациями с основной базой, в секундах
+SYNC_INTERVAL = float(os.environ.get("TASK_MANAGER_SYNC_INTERVAL", 30))
+#сколько операций очереди отправляется в основную базу одной транзакцией
+OUTBOX_BATCH = 100
+#сколько задач читается из основной базы одним запросом
+PULL_BATCH = 500
+#насколько раньше отметки последней синхронизации запрашиваются изменения
+PULL_OVERLAP = timedelta(minutes=5)
+#сколько секунд ждать подключения к основной базе PostgreSQL
+CONNECT_TIMEOUT = 5
+
+#операции очереди
+ADD = "add"
+COMPLETE = "complete"
+
+_metadata = MetaData()
+
+#очередь изменений, ещё не отправленных в основную базу; есть только в реплике
+OUTBOX = Table(
+    "outbox", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(150), nullable=False),
+    Column("uid", String(32), nullable=False),
+    Column("op", String(8), nullable=False),
+    Column("base_version", Integer, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.now),
+    sqlite_autoincrement=True,
+)
+
+#отметка загрузки изменений пользователя из основной базы; есть только в реплике
+SYNC_STATE = Table(
+    "sync_state", _metadata,
+    Column("username", String(150), primary_key=True),
+    Column("pulled_until", DateTime, nullable=False),
+)
+
+#колонки задачи, которые переносятся между базами
+_SYNCED = (
+    Task.uid, Task.description, Task.category, Task.deadline, Task.completed,
+    Task.completed_at, Task.created_at, Task.updated_at, Task.version
+)
+#те же колонки в архиве основной базы
+_ARCHIVED = tuple(TASKS_ARCHIVE.c[column.key] for column in _SYNCED)
+
+#выполнение задач в реплике: кроме id возвращает uid и новую версию для очереди
+_COMPLETE_LOCAL = _complete_statement(False).returning(Task.uid, Task.version)
+
+
+class OfflineError(Exception):
+    pass
+
+
+def _dump(payload):
+    return json.dumps(
+        {key: value.isoformat() if isinstance(value, datetime) else value for key, value in payload.items()}
+    )
+
+
+def _load(payload, dates=("deadline", "completed_at", "created_at", "updated_at")):
+    data = json.loads(payload)
+    for key in dates:
+        if data.get(key) is not None:
+            data[key] = datetime.fromisoformat(data[key])
+    return data
+
+
+def _username(user):
+    return user.username if isinstance(user, UserSession) else user
+
+
+def remote_url(url, timeout=CONNECT_TIMEOUT):
+    """
+    Добавляет к адресу PostgreSQL ограничение времени подключения.
+
+    Без него недоступный сервер задерживает вход на время таймаута TCP.
+
+    :param url: Адрес основной базы.
+    :type url: str
+    :param timeout: Время ожидания подключения в секундах.
+    :type timeout: int
+    :rtype: str
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql" and "connect_timeout" not in parsed.query:
+        parsed = parsed.update_query_dict({"connect_timeout": str(timeout)})
+    return parsed.render_as_string(hide_password=False)
+
+
+class SyncResult:
+    """
+    Итог одной синхронизации.
+
+    :ivar pushed: Сколько операций очереди отправлено в основную базу.
+    :type pushed: int
+    :ivar pulled: Сколько задач загружено или обновлено из основной базы.
+    :type pulled: int
+    :ivar removed: Сколько задач удалено из реплики, потому что их нет в основной базе.
+    :type removed: int
+    :ivar conflicts: Сколько операций встретили изменённую версию задачи.
+    :type conflicts: int
+    """
+    def __init__(self):
+        self.pushed = 0
+        self.pulled = 0
+        self.removed = 0
+        self.conflicts = 0
+
+    def __repr__(self):
+        return (
+            f"SyncResult(pushed={self.pushed}, pulled={self.pulled}, "
+            f"removed={self.removed}, conflicts={self.conflicts})"
+        )
+
+
+class ReplicaStorage(Storage):
+    """
+    Хранилище, которое читает и пишет в локальную реплику и синхронизирует её с основной базой.
+
+    Методы чтения унаследованы от :class:`app.storage.Storage` и работают с
+    репликой. К основной базе обращаются только вход, регистрация и
+    синхронизация.
+
+    :ivar remote_url: Адрес основной базы.
+    :type remote_url: str
+    :ivar interval: Пауза между фоновыми синхронизациями, в секундах; None - синхронизировать
+        только вызовом :meth:`sync`.
+    :type interval: float | None
+    :ivar sync_worker: Фоновая синхронизация вошедшего пользователя.
+    :type sync_worker: SyncWorker | None
+    """
+    def __init__(self, path=None, url=None, interval=SYNC_INTERVAL):
+        """
+        Открывает реплику. К основной базе при этом не подключается.
+
+        :param path: Путь к файлу реплики. По умолчанию - TASK_MANAGER_REPLICA.
+        :type path: str | None
+        :param url: Адрес основной базы. По умолчанию - DATABASE_URL.
+        :type url: str | None
+        :param interval: Пауза между фоновыми синхронизациями, в секундах; None - без фоновой синхронизации.
+        :type interval: float | None
+        """
+        #реплики основной базы (DATABASE_REPLICA_URLS) читает только remote(), а не локальный файл
+        Storage.__init__(self, f"sqlite:///{path or REPLICA_PATH}", replicas=())
+        _metadata.create_all(self.engine)
+
+        self.remote_url = remote_url(url or storage_module.DATABASE_URL)
+        self.interval = interval
+        self.sync_worker = None
+        self._remote = None
+        self._remote_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        #пользователи, у которых основная база могла перенести задачи в архив
+        self._archive_changed = set()
+
+    def remote(self):
+        """
+        Возвращает хранилище основной базы, подключаясь к ней при первом обращении.
+
+        :rtype: Storage
+
+        :raises sqlalchemy.exc.DBAPIError: если основная база недоступна.
+        """
+        with self._remote_lock:
+            if self._remote is None:
+                self._remote = Storage(self.remote_url)
+            return self._remote
+
+    # -------------------- АВТОРИЗАЦИЯ ------------------------
+
+    def register_user(self, username, password):
+        """
+        Регистрирует пользователя в основной базе.
+
+        :raises OfflineError: если основная база недоступна.
+        """
+        try:
+            return self.remote().register_user(username, password)
+        except DBAPIError as err:
+            raise OfflineError("Нет связи с сервером, регистрация недоступна") from err
+
+    def register_users(self, users):
+        """
+        Регистрирует много пользователей в основной базе.
+
+        :raises OfflineError: если основная база недоступна.
+        """
+        try:
+            return self.remote().register_users(users)
+        except DBAPIError as err:
+            raise OfflineError("Нет связи с сервером, регистрация недоступна") from err
+
+    @instrumented
+    def check_login(self, username, password):
+        """
+        Проверяет логин и пароль и запускает фоновую синхронизацию пользователя.
+
+        Если основная база доступна, пароль проверяется в ней, а хэш пароля
+        сохраняется в реплике. Без связи вход проверяется по сохранённому
+        хэшу, поэтому войти без сети может только пользователь, который уже
+        входил на этом компьютере.
+
+        :raises UserNotFoundError: если пользователь не найден.
+        :raises WrongPasswordError: если пароль неверный.
+        """
+        try:
+            remote = self.remote()
+            remote.check_login(username, password)
+            with remote.SessionLocal() as session:
+                password_hash = remote.get_user(session, username).password_hash
+        except DBAPIError:
+            user_session = Storage.check_login(self, username, password)
+        else:
+            user_session = self._remember_user(username, password_hash)
+
+        if self.interval is not None:
+            self.start_sync(username)
+        return user_session
+
+    def _remember_user(self, username, password_hash):
+        """
+        Сохраняет пользователя основной базы в реплике.
+        """
+        with self.SessionLocal() as session:
+            user = self.get_user(session, username)
+            if user is None:
+                user = User(username=username, password_hash=password_hash)
+                session.add(user)
+            else:
+                user.password_hash = password_hash
+            session.commit()
+
+            self.user_session = UserSession(user.id, username)
+            return self.user_session
+
+    # -------------------- ЗАПИСЬ ------------------------
+
+    def _enqueue(self, session, username, rows):
+        """
+        Добавляет операции в очередь в транзакции сессии.
+
+        :param rows: Кортежи (uid, операция, версия до изменения, данные).
+        :type rows: list[tuple[str, str, int, dict]]
+        """
+        session.execute(insert(OUTBOX), [
+            {"username": _username(username), "uid": uid, "op": op, "base_version": base, "payload": _dump(payload)}
+            for uid, op, base, payload in rows
+        ])
+
+    def _wake(self):
+        if self.sync_worker is not None:
+            self.sync_worker.wake()
+
+    @instrumented
+    def add_task(self, username, task, deadline=None, category="Учебная"):
+        """
+        Добавляет задачу в реплику и ставит её в очередь на отправку.
+
+        :return: Добавленная задача.
+        :rtype: Task
+        """
+        now = datetime.now()
+        with self.SessionLocal() as session:
+            new_task = Task(
+                user_id=self._user_id(session, username),
+                description=task,
+                deadline=deadline,
+                category=category,
+                created_at=now,
+                updated_at=now,
+                uid=new_task_uid()
+            )
+            session.add(new_task)
+            session.flush()
+            self._enqueue(session, username, [(new_task.uid, ADD, 0, {
+                "description": task, "category": category, "deadline": deadline,
+                "completed": False, "completed_at": None, "created_at": now, "updated_at": now,
+            })])
+            session.commit()
+
+        self._wake()
+        return new_task
+
+    @instrumented
+    def add_tasks(self, username, tasks, batch_size=IMPORT_BATCH):
+        """
+        Добавляет в реплику много задач и ставит их в очередь на отправку.
+
+        :return: Количество добавленных задач.
+        :rtype: int
+        """
+        now = datetime.now()
+        count = 0
+        with self.SessionLocal() as session:
+            user_id = self._user_id(session, username)
+
+            batch = []
+            for task in tasks:
+                batch.append({
+                    "description": task["description"],
+                    "category": task["category"],
+                    "deadline": task.get("deadline"),
+                    "completed": bool(task.get("completed")),
+                    "completed_at": task.get("completed_at"),
+                    "created_at": now,
+                    "updated_at": now,
+                    "uid": new_task_uid(),
+                })
+                if len(batch) >= batch_size:
+                    count += self._write_replica_batch(session, username, user_id, batch)
+                    batch = []
+            if batch:
+                count += self._write_replica_batch(session, username, user_id, batch)
+
+            session.commit()
+
+        self._wake()
+        return count
+
+    def _write_replica_batch(self, session, username, user_id, batch):
+        session.execute(insert(Task), [dict(row, user_id=user_id) for row in batch])
+        self._enqueue(session, username, [
+            (row["uid"], ADD, 0, {key: value for key, value in row.items() if key != "uid"}) for row in batch
+        ])
+        return len(batch)
+
+    @instrumented
+    def complete_tasks(self, username, ids, completed_at=None):
+        """
+        Отмечает задачи выполненными в реплике и ставит операции в очередь на отправку.
+
+        :return: Идентификаторы задач, которые были отмечены выполненными.
+        :rtype: list[int]
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        completed_at = completed_at or datetime.now()
+
+        with self.SessionLocal() as session:
+            user_id = self._user_id(session, username)
+            rows = session.execute(
+                _COMPLETE_LOCAL, {"ids": ids, "owner_id": user_id, "done_at": completed_at}
+            ).all()
+            if rows:
+                self._enqueue(session, username, [
+                    (row.uid, COMPLETE, row.version - 1, {"completed_at": completed_at}) for row in rows
+                ])
+            session.commit()
+
+        self._wake()
+        return [row.id for row in rows]
+
+    @instrumented
+    def delete_task(self, username, task):
+        """
+        Отмечает выполненными все текущие задачи с таким описанием.
+        """
+        with self.SessionLocal() as session:
+            ids = session.scalars(select(Task.id).where(
+                Task.user_id == self._user_id(session, username),
+                Task.description == task,
+                Task.completed == False
+            )).all()
+        self.complete_tasks(username, ids)
+
+    # -------------------- АРХИВ ------------------------
+
+    def set_retention(self, username, days):
+        """
+        Задаёт срок хранения выполненных задач в основной базе: архивирует задачи она.
+
+        :raises OfflineError: если основная база недоступна.
+        """
+        try:
+            result = self.remote().set_retention(_username(username), days)
+        except DBAPIError as err:
+            raise OfflineError("Нет связи с сервером, срок хранения не изменён") from err
+        self._archive_changed.add(_username(username))
+        return result
+
+    def archive_completed(self, username=None, batch_size=ARCHIVE_BATCH, now=None):
+        """
+        Ничего не переносит: в реплике история хранится в таблице задач, а
+        архив ведёт основная база. Перенос в файле реплики убрал бы задачи
+        из ``tasks``, и синхронизация загрузила бы их из основной базы заново.
+
+        :return: Количество перенесённых задач - всегда 0.
+        :rtype: int
+        """
+        return 0
+
+    # -------------------- СИНХРОНИЗАЦИЯ ------------------------
+
+    def pending(self, username):
+        """
+        Возвращает количество операций пользователя, ещё не отправленных в основную базу.
+
+        :rtype: int
+        """
+        with self.engine.connect() as conn:
+            return conn.scalar(
+                select(func.count()).select_from(OUTBOX).where(OUTBOX.c.username == _username(username))
+            )
+
+    def sync(self, username):
+        """
+        Отправляет очередь пользователя в основную базу и загружает изменения оттуда.
+
+        Каждая пачка очереди применяется в основной базе одной транзакцией и
+        удаляется из реплики только после её фиксации. Если связь оборвётся
+        между этими шагами, пачка будет отправлена повторно: добавление
+        задачи с уже существующим ``uid`` пропускается, а повторное
+        выполнение разрешается как конфликт в пользу основной базы.
+
+        :param username: Логин пользователя или его контекст.
+        :type username: str | UserSession
+        :return: Итог синхронизации.
+        :rtype: SyncResult
+
+        :raises sqlalchemy.exc.DBAPIError: если основная база недоступна.
+        :raises UserNotFoundError: если пользователя нет в основной базе.
+        """
+        username = _username(username)
+        result = SyncResult()
+        #задачи, которые после конфликта нужно перечитать из основной базы
+        refresh = set()
+
+        with self._sync_lock:
+            remote = self.remote()
+            with remote.SessionLocal() as remote_session:
+                remote_user = remote.get_user(remote_session, username)
+                if remote_user is None:
+                    raise UserNotFoundError(f"Пользователь '{username}' не существует")
+                remote_user_id = remote_user.id
+
+            while True:
+                with self.SessionLocal() as session, remote.SessionLocal() as remote_session:
+                    ops = session.execute(
+                        select(OUTBOX).where(OUTBOX.c.username == username).order_by(OUTBOX.c.id).limit(OUTBOX_BATCH)
+                    ).all()
+                    if not ops:
+                        break
+
+                    for op in ops:
+                        self._push(remote_session, remote_user_id, op, result, refresh)
+                    remote_session.commit()
+
+                    session.execute(delete(OUTBOX).where(OUTBOX.c.id.in_([op.id for op in ops])))
+                    session.commit()
+                    result.pushed += len(ops)
+
+            self._pull(remote, remote_user_id, username, refresh, result)
+
+        return result
+
+    def _push(self, remote_session, user_id, op, result, refresh):
+        """
+        Применяет одну операцию очереди в основной базе.
+        """
+        payload = _load(op.payload)
+        #время изменения в основной базе - время отправки: по нему другие реплики загружают изменения
+        pushed_at = datetime.now()
+
+        if op.op == ADD:
+            exists = remote_session.scalar(select(Task.id).where(Task.uid == op.uid))
+            if exists is None:
+                payload["updated_at"] = pushed_at
+                remote_session.execute(insert(Task).values(user_id=user_id, uid=op.uid, version=1, **payload))
+            return
+
+        completed_at = payload["completed_at"]
+        applied = remote_session.execute(
+            update(Task)
+            .where(Task.uid == op.uid, Task.user_id == user_id, Task.version == op.base_version)
+            .values(completed=True, completed_at=completed_at, updated_at=pushed_at, version=op.base_version + 1)
+        ).rowcount
+        if applied:
+            return
+
+        result.conflicts += 1
+        refresh.add(op.uid)
+        remote_session.execute(
+            update(Task)
+            .where(Task.uid == op.uid, Task.user_id == user_id, Task.completed == False)
+            .values(completed=True, completed_at=completed_at, updated_at=pushed_at, version=Task.version + 1)
+        )
+
+    def _pull(self, remote, remote_user_id, username, refresh, result):
+        """
+        Загружает в реплику задачи, изменившиеся в основной базе.
+
+        У основной базы запрашиваются uid и версии задач, изменившихся после
+        отметки прошлой синхронизации, и целиком читаются только новые и
+        изменившиеся задачи. Задачи с неотправленными операциями не
+        перезаписываются.
+
+        Без отметки (первая синхронизация пользователя) читаются все задачи,
+        а задачи реплики, которых нет в основной базе, удаляются. Задачи архива
+        основной базы (``tasks_archive``) входят в историю пользователя: они не
+        удаляются из реплики, а на новом клиенте и после изменения срока
+        хранения загружаются в её таблицу задач.
+        """
+        archive_changed = username in self._archive_changed
+
+        with self.engine.connect() as conn:
+            pulled_until = conn.scalar(select(SYNC_STATE.c.pulled_until).where(SYNC_STATE.c.username == username))
+        changed = [Task.user_id == remote_user_id]
+        archived_changed = [TASKS_ARCHIVE.c.user_id == remote_user_id, TASKS_ARCHIVE.c.uid.is_not(None)]
+        if pulled_until is not None:
+            changed.append(Task.updated_at > pulled_until - PULL_OVERLAP)
+            archived_changed.append(TASKS_ARCHIVE.c.archived_at > pulled_until - PULL_OVERLAP)
+
+        queries = [select(Task.uid, Task.version, Task.updated_at.label("changed_at")).where(*changed)]
+        if pulled_until is None or archive_changed:
+            queries.append(select(
+                TASKS_ARCHIVE.c.uid, TASKS_ARCHIVE.c.version, TASKS_ARCHIVE.c.archived_at
+            ).where(*archived_changed))
+        with remote.SessionLocal() as remote_session:
+            rows = remote_session.execute(union_all(*queries)).all()
+        versions = {row.uid: row.version for row in rows}
+        marks = [row.changed_at for row in rows if row.changed_at is not None]
+        if pulled_until is not None:
+            marks.append(pulled_until)
+
+        candidates = list(versions.keys() | refresh)
+
+        with self.SessionLocal() as session:
+            user_id = self._user_id(session, username)
+            pending = set(session.scalars(select(OUTBOX.c.uid).where(OUTBOX.c.username == username)))
+            if pulled_until is None:
+                local = {
+                    row.uid: row for row in session.execute(
+                        select(Task.id, Task.uid, Task.version).where(Task.user_id == user_id, Task.uid.is_not(None))
+                    )
+                }
+            else:
+                local = self._local_versions(session, user_id, candidates)
+            #задачи, перенесённые в архив самой реплики до того, как архив стал вестись только на сервере
+            archived = set()
+            for start in range(0, len(candidates), PULL_BATCH):
+                archived.update(session.scalars(select(TASKS_ARCHIVE.c.uid).where(
+                    TASKS_ARCHIVE.c.user_id == user_id, TASKS_ARCHIVE.c.uid.in_(candidates[start:start + PULL_BATCH])
+                )))
+
+            wanted = [
+                uid for uid in candidates
+                if uid not in pending and uid not in archived
+                and (uid in refresh or uid not in local or local[uid].version < versions[uid])
+            ]
+            for start in range(0, len(wanted), PULL_BATCH):
+                uids = wanted[start:start + PULL_BATCH]
+                with remote.SessionLocal() as remote_session:
+                    rows = remote_session.execute(union_all(
+                        select(*_SYNCED).where(Task.uid.in_(uids)),
+                        select(*_ARCHIVED).where(TASKS_ARCHIVE.c.uid.in_(uids)),
+                    )).all()
+                for row in rows:
+                    values = row._asdict()
+                    if row.uid in local:
+                        session.execute(update(Task).where(Task.id == local[row.uid].id).values(**values))
+                    else:
+                        session.execute(insert(Task).values(user_id=user_id, **values))
+                result.pulled += len(rows)
+
+            if pulled_until is None:
+                removed = [row.id for uid, row in local.items() if uid not in versions and uid not in pending]
+                if removed:
+                    session.execute(delete(Task).where(Task.id.in_(removed)))
+                    result.removed = len(removed)
+
+            if marks:
+                session.execute(delete(SYNC_STATE).where(SYNC_STATE.c.username == username))
+                session.execute(insert(SYNC_STATE).values(username=username, pulled_until=max(marks)))
+            session.commit()
+        if archive_changed:
+            self._archive_changed.discard(username)
+
+    def _local_versions(self, session, user_id, uids):
+        """
+        Возвращает id и версии задач реплики с данными uid.
+
+        :rtype: dict[str, sqlalchemy.engine.Row]
+        """
+        local = {}
+        for start in range(0, len(uids), PULL_BATCH):
+            local.update((row.uid, row) for row in session.execute(
+                select(Task.id, Task.uid, Task.version)
+                .where(Task.user_id == user_id, Task.uid.in_(uids[start:start + PULL_BATCH]))
+            ))
+        return local
+
+    def start_sync(self, username):
+        """
+        Запускает фоновую синхронизацию пользователя, останавливая предыдущую.
+
+        :rtype: SyncWorker
+        """
+        self.stop_sync()
+        self.sync_worker = SyncWorker(self, username, self.interval)
+        self.sync_worker.start()
+        return self.sync_worker
+
+    def stop_sync(self, timeout=None):
+        """
+        Останавливает фоновую синхронизацию.
+        """
+        if self.sync_worker is not None:
+            self.sync_worker.stop(timeout)
+            self.sync_worker = None
+
+
+class SyncWorker:
+    """
+    Фоновый поток, синхронизирующий реплику с основной базой.
+
+    Синхронизация выполняется раз в ``interval`` секунд и сразу после
+    каждой записи в реплику (:meth:`wake`). Ошибки связи не прерывают поток:
+    очередь остаётся в реплике до следующей попытки.
+
+    :ivar replica: Реплика.
+    :type replica: ReplicaStorage
+    :ivar username: Логин пользователя.
+    :type username: str
+    :ivar interval: Пауза между синхронизациями, в секундах.
+    :type interval: float
+    :ivar online: Удалась ли последняя синхронизация; None - ещё не было попыток.
+    :type online: bool | None
+    :ivar last_result: Итог последней удачной синхронизации.
+    :type last_result: SyncResult | None
+    :ivar last_error: Ошибка последней неудачной синхронизации.
+    :type last_error: Exception | None
+    """
+    def __init__(self, replica, username, interval=SYNC_INTERVAL):
+        self.replica = replica
+        self.username = username
+        self.interval = interval
+        self.online = None
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Запускает поток синхронизации.
+        """
+        self._thread = threading.Thread(target=self._run, name=f"sync-{self.username}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Останавливает поток синхронизации.
+
+        :param timeout: Сколько секунд ждать завершения потока.
+        :type timeout: float | None
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """
+        Запускает синхронизацию, не дожидаясь окончания паузы.
+        """
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.last_result = self.replica.sync(self.username)
+                self.online = True
+                self.last_error = None
+            except Exception as err:
+                self.online = False
+                self.last_error = err
+            self._wake.wait(self.interval)
@@ -0,0 +1,165 @@
+"""
+Распределение чтений :class:`app.storage.Storage` между репликами базы.
+
+Если у основной базы есть реплики только для чтения (например, потоковая
+репликация PostgreSQL), списки задач, история, поиск и статистика читаются
+с реплик, а запись и авторизация остаются на основной базе. Реплики
+выбираются по кругу. Реплика, которая не ответила или ещё не получила
+текущую версию схемы, пропускается и проверяется снова через
+:data:`HEALTH_INTERVAL` секунд; если исправных реплик нет, чтение идёт в
+основную базу. Чтение, на которое реплика ответила ошибкой, сразу
+повторяется на основной базе, а реплика до следующей проверки пропускается.
+
+Реплика получает изменения с задержкой. Чтобы только что добавленная
+задача не пропадала из списка, после записи пользователя его чтения
+:data:`READ_YOUR_WRITES` секунд выполняются на основной базе.
+
+Адреса реплик задаются переменной окружения ``DATABASE_REPLICA_URLS``
+через запятую, окно после записи - ``DATABASE_READ_YOUR_WRITES`` в секундах
+(по умолчанию 5).
+"""
+import itertools
+import os
+import threading
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from .migrations import schema_is_current
+
+
+#адреса реплик основной базы только для чтения
+REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+#сколько секунд после записи пользователь читает из основной базы
+READ_YOUR_WRITES = float(os.environ.get("DATABASE_READ_YOUR_WRITES", 5))
+#через сколько секунд проверять реплику снова
+HEALTH_INTERVAL = float(os.environ.get("DATABASE_REPLICA_CHECK_INTERVAL", 10))
+
+
+class _Replica:
+    """
+    Реплика и результат её последней проверки.
+    """
+    __slots__ = ("engine", "healthy", "checked_at")
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = False
+        self.checked_at = None
+
+
+class ReadRouter:
+    """
+    Выбирает движок для чтения задач пользователя.
+
+    Безопасен для вызова из нескольких потоков: окна пользователей и
+    состояние реплик защищены блокировкой, а проверка реплики выполняется
+    без неё.
+
+    :ivar primary: Движок основной базы.
+    :type primary: sqlalchemy.engine.Engine
+    :ivar window: Сколько секунд после записи пользователь читает из основной базы.
+    :type window: float
+    :ivar health_interval: Через сколько секунд проверять реплику снова.
+    :type health_interval: float
+    """
+    def __init__(self, primary, replicas, window=None, health_interval=None, clock=time.monotonic):
+        """
+        :param primary: Движок основной базы.
+        :type primary: sqlalchemy.engine.Engine
+        :param replicas: Движки реплик.
+        :type replicas: list[sqlalchemy.engine.Engine]
+        :param window: Окно чтения своих записей в секундах. По умолчанию - DATABASE_READ_YOUR_WRITES.
+        :type window: float | None
+        :param health_interval: Пауза между проверками реплики в секундах.
+        :type health_interval: float | None
+        :param clock: Источник времени в секундах.
+        :type clock: callable
+        """
+        self.primary = primary
+        self.window = READ_YOUR_WRITES if window is None else window
+        self.health_interval = HEALTH_INTERVAL if health_interval is None else health_interval
+        self._replicas = [_Replica(engine) for engine in replicas]
+        self._clock = clock
+        self._turn = itertools.count()
+        self._writes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def replicas(self):
+        """
+        Движки реплик.
+
+        :rtype: list[sqlalchemy.engine.Engine]
+        """
+        return [replica.engine for replica in self._replicas]
+
+    def wrote(self, username):
+        """
+        Запоминает запись пользователя: ближайшие :attr:`window` секунд он читает из основной базы.
+
+        :param username: Логин пользователя.
+        :type username: str
+        """
+        if not self._replicas:
+            return
+        now = self._clock()
+        with self._lock:
+            self._writes[username] = now + self.window
+            #окна, которые уже закрылись, больше не нужны
+            if len(self._writes) > 1000:
+                self._writes = {name: until for name, until in self._writes.items() if until > now}
+
+    def read_engine(self, username):
+        """
+        Возвращает движок для чтения задач пользователя.
+
+        :param username: Логин пользователя.
+        :type username: str
+        :return: Следующая по кругу исправная реплика или основная база - в окне
+            после записи и когда исправных реплик нет.
+        :rtype: sqlalchemy.engine.Engine
+        """
+        if not self._replicas:
+            return self.primary
+
+        now = self._clock()
+        with self._lock:
+            if self._writes.get(username, now) > now:
+                return self.primary
+            start = next(self._turn)
+
+        count = len(self._replicas)
+        for step in range(count):
+            replica = self._replicas[(start + step) % count]
+            if replica.checked_at is None or now - replica.checked_at >= self.health_interval:
+                self._check(replica, now)
+            if replica.healthy:
+                return replica.engine
+        return self.primary
+
+    def failed(self, engine):
+        """
+        Отмечает реплику неисправной после ошибки запроса.
+
+        :param engine: Движок, на котором произошла ошибка.
+        :type engine: sqlalchemy.engine.Engine
+        """
+        now = self._clock()
+        for replica in self._replicas:
+            if replica.engine is engine:
+                with self._lock:
+                    replica.healthy = False
+                    replica.checked_at = now
+
+    def _check(self, replica, now):
+        """
+        Проверяет, что реплика отвечает и её схема совпадает с ожидаемой.
+        """
+        try:
+            healthy = schema_is_current(replica.engine)
+        except DBAPIError:
+            healthy = False
+        with self._lock:
+            replica.healthy = healthy
+            replica.checked_at = now
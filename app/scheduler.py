@@ -0,0 +1,178 @@
+"""
+Планировщик дедлайнов текущих задач.
+
+Ближайшие дедлайны хранятся в куче, и один таймер Qt взводится ровно на
+ближайший из них. Когда срок задачи наступает, планировщик сообщает её id,
+и окно перерисовывает только эту строку. Список не перезагружается, а
+периодического опроса нет.
+
+Если задана переменная окружения ``TASK_MANAGER_REMIND_MINUTES``, за
+столько минут до дедлайна планировщик отправляет напоминание.
+"""
+import heapq
+import itertools
+import math
+import os
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+#за сколько до дедлайна напоминать о задаче; None - не напоминать
+REMIND_BEFORE = timedelta(minutes=int(os.environ.get("TASK_MANAGER_REMIND_MINUTES", 0))) or None
+#самое долгое ожидание таймера, в миллисекундах: после сна компьютера или перевода часов
+#планировщик сверится с часами не позже чем через час
+MAX_INTERVAL_MS = 60 * 60 * 1000
+
+_DUE = 0
+_REMIND = 1
+
+
+class DeadlineScheduler(QObject):
+    """
+    Куча предстоящих дедлайнов с одним перевзводимым таймером.
+
+    Отменённые и перенесённые дедлайны не удаляются из кучи сразу: запись
+    пропускается, если дедлайн задачи с тех пор изменился.
+
+    :ivar remind_before: За сколько до дедлайна отправлять :attr:`remind`.
+    :type remind_before: timedelta | None
+    :ivar clock: Функция, возвращающая текущее время.
+    :type clock: callable
+    """
+    #срок задачи наступил: id задачи
+    due = pyqtSignal(int)
+    #до срока задачи осталось remind_before: id задачи
+    remind = pyqtSignal(int)
+
+    def __init__(self, remind_before=REMIND_BEFORE, clock=datetime.now, parent=None):
+        """
+        :param remind_before: За сколько до дедлайна напоминать о задаче; None - не напоминать.
+        :type remind_before: timedelta | None
+        :param clock: Функция, возвращающая текущее время.
+        :type clock: callable
+        :param parent: Родительский объект Qt.
+        :type parent: QObject | None
+        """
+        QObject.__init__(self, parent)
+        self.remind_before = remind_before
+        self.clock = clock
+
+        self._heap = []
+        self._deadlines = {}
+        self._order = itertools.count()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        #обычный таймер Qt может сработать на несколько процентов раньше срока
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def schedule(self, task_id, deadline):
+        """
+        Ставит или переносит дедлайн задачи.
+
+        Задачи без дедлайна и уже просроченные не планируются.
+
+        :param task_id: Идентификатор задачи.
+        :type task_id: int
+        :param deadline: Дедлайн задачи.
+        :type deadline: datetime | None
+        :return: True, если дедлайн поставлен в очередь.
+        :rtype: bool
+        """
+        now = self.clock()
+        if deadline is None or deadline <= now:
+            self._deadlines.pop(task_id, None)
+            return False
+
+        self._deadlines[task_id] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._order), _DUE, task_id, deadline))
+
+        if self.remind_before is not None and deadline - self.remind_before > now:
+            heapq.heappush(
+                self._heap, (deadline - self.remind_before, next(self._order), _REMIND, task_id, deadline)
+            )
+
+        self._compact()
+        self._arm()
+        return True
+
+    def unschedule(self, task_id):
+        """
+        Снимает дедлайн задачи (например, задача выполнена или убрана из списка).
+
+        :param task_id: Идентификатор задачи.
+        :type task_id: int
+        """
+        if self._deadlines.pop(task_id, None) is not None:
+            self._arm()
+
+    def clear(self):
+        """
+        Снимает все дедлайны.
+        """
+        self._heap = []
+        self._deadlines = {}
+        self._timer.stop()
+
+    def pending(self):
+        """
+        Возвращает количество задач, дедлайн которых ещё не наступил.
+
+        :rtype: int
+        """
+        return len(self._deadlines)
+
+    def next_event(self):
+        """
+        Возвращает время ближайшего события (дедлайна или напоминания).
+
+        :rtype: datetime | None
+        """
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _is_stale(self, entry):
+        return self._deadlines.get(entry[3]) != entry[4]
+
+    def _drop_stale(self):
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        #перенесённые дедлайны копятся в куче, пока не дойдут до её вершины
+        if len(self._heap) > 4 * len(self._deadlines) + 64:
+            self._heap = [entry for entry in self._heap if not self._is_stale(entry)]
+            heapq.heapify(self._heap)
+
+    def _arm(self):
+        """
+        Взводит таймер на ближайшее событие кучи.
+        """
+        when = self.next_event()
+        if when is None:
+            self._timer.stop()
+            return
+
+        delay = math.ceil((when - self.clock()).total_seconds() * 1000)
+        self._timer.start(min(max(delay, 0), MAX_INTERVAL_MS))
+
+    def _on_timeout(self):
+        """
+        Отправляет сигналы по всем наступившим событиям и перевзводит таймер.
+        """
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_stale(entry):
+                continue
+
+            task_id = entry[3]
+            if entry[2] == _DUE:
+                del self._deadlines[task_id]
+                self.due.emit(task_id)
+            else:
+                self.remind.emit(task_id)
+
+        self._arm()
@@ -0,0 +1,180 @@
+"""
+Кэш результатов поиска задач для поиска по мере ввода.
+
+Результат запроса запоминается по ключу (пользователь, текст, диапазон дат).
+Уточнение запроса - более длинная строка поиска ("экз" -> "экза") или более
+узкий диапазон дат - не идёт в базу: ответ фильтруется из уже найденных
+задач. Это возможно, только если прошлый результат полный, то есть не обрезан
+ограничением :data:`app.storage.SEARCH_LIMIT`, и найден по полнотекстовому
+индексу. Строку короче триграммы (:data:`app.storage.TRIGRAM`) SQLite ищет
+через ``LIKE``, который не различает регистр только для латиницы: такой
+результат может не содержать задач с другим регистром кириллицы
+("Ба" не находит "банк"), поэтому уточнения из него не фильтруются.
+
+Любое изменение задач пользователя сбрасывает его записи в кэше
+(:meth:`SearchCache.invalidate`).
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+
+from .storage import SEARCH_LIMIT, TRIGRAM
+
+
+#сколько результатов поиска хранит кэш
+SEARCH_CACHE_SIZE = 32
+
+
+def _bound(value):
+    """
+    Граница диапазона дат так, как её сравнивает база: дата - начало суток.
+    """
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _covers(outer, inner):
+    """
+    Проверяет, что результат запроса ``outer`` содержит все задачи запроса ``inner``.
+    """
+    text, date_from, date_to = outer
+    inner_text, inner_from, inner_to = inner
+    if text is not None and (inner_text is None or text not in inner_text):
+        return False
+    if date_from is not None and (inner_from is None or _bound(inner_from) < _bound(date_from)):
+        return False
+    if date_to is not None and (inner_to is None or _bound(inner_to) > _bound(date_to)):
+        return False
+    return True
+
+
+def _refinable(text, rows, limit):
+    """
+    Проверяет, что из результата запроса можно фильтровать уточнения: он полный
+    и найден с тем же сравнением без учёта регистра, что и :func:`_matches`.
+    """
+    return len(rows) < limit and (text is None or len(text) >= TRIGRAM)
+
+
+def _matches(task, text, date_from, date_to):
+    """
+    Проверяет задачу условиями поиска, как это делает хранилище.
+    """
+    if text is not None and text not in task.description.casefold() and text not in task.category.casefold():
+        return False
+    if date_from is not None and (task.deadline is None or task.deadline < _bound(date_from)):
+        return False
+    if date_to is not None and (task.deadline is None or task.deadline > _bound(date_to)):
+        return False
+    return True
+
+
+class SearchCache:
+    """
+    LRU-кэш результатов :meth:`app.storage.Storage.find_task_rows`.
+
+    :ivar maxsize: Сколько результатов хранится.
+    :type maxsize: int
+    :ivar limit: Ограничение числа найденных задач, с которым выполняется поиск.
+    :type limit: int
+    :ivar generation: Номер состояния кэша, растёт при каждом сбросе.
+    :type generation: int
+    :ivar hits: Сколько запросов найдено в кэше целиком.
+    :type hits: int
+    :ivar refined: Сколько запросов отфильтровано из результата более широкого запроса.
+    :type refined: int
+    :ivar misses: Сколько запросов пришлось выполнить в хранилище.
+    :type misses: int
+    """
+    def __init__(self, maxsize=SEARCH_CACHE_SIZE, limit=SEARCH_LIMIT):
+        self.maxsize = maxsize
+        self.limit = limit
+        self.generation = 0
+        self.hits = 0
+        self.refined = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(user, text, date_from, date_to):
+        """
+        Возвращает ключ запроса: строка поиска без учёта регистра, пустая строка заменяется на None.
+
+        :rtype: tuple
+        """
+        return user, (text.casefold() if text else None), date_from, date_to
+
+    def get(self, user, text, date_from, date_to):
+        """
+        Возвращает результат запроса из кэша.
+
+        Если точного результата нет, ищется полный результат более широкого
+        запроса того же пользователя, найденный по полнотекстовому индексу, и
+        задачи фильтруются из него.
+
+        :param user: Логин пользователя.
+        :type user: str
+        :param text: Строка поиска.
+        :type text: str | None
+        :param date_from: Начальная дата дедлайна.
+        :type date_from: date | None
+        :param date_to: Конечная дата дедлайна.
+        :type date_to: date | None
+        :return: Найденные задачи или None, если запрос нужно выполнить в хранилище.
+        :rtype: list[TaskRow] | None
+        """
+        key = self.key(user, text, date_from, date_to)
+        rows = self._entries.get(key)
+        if rows is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+        query = key[1:]
+        #сначала проверяются последние запросы: обычно это предыдущий шаг ввода
+        for (owner, *outer), outer_rows in reversed(self._entries.items()):
+            if owner != user or not _refinable(outer[0], outer_rows, self.limit):
+                continue
+            if not _covers(tuple(outer), query):
+                continue
+            rows = [task for task in outer_rows if _matches(task, *query)]
+            self._store(key, rows)
+            self.refined += 1
+            return rows
+
+        self.misses += 1
+        return None
+
+    def put(self, user, text, date_from, date_to, rows, generation=None):
+        """
+        Запоминает результат запроса.
+
+        :param rows: Найденные задачи.
+        :type rows: list[TaskRow]
+        :param generation: Значение :attr:`generation` на момент отправки запроса.
+            Если с тех пор кэш сбрасывался, результат мог устареть и не запоминается.
+        :type generation: int | None
+        """
+        if generation is not None and generation != self.generation:
+            return
+        self._store(self.key(user, text, date_from, date_to), list(rows))
+
+    def _store(self, key, rows):
+        self._entries[key] = rows
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user=None):
+        """
+        Сбрасывает результаты пользователя после изменения его задач.
+
+        :param user: Логин пользователя; None - сбросить весь кэш.
+        :type user: str | None
+        """
+        self.generation += 1
+        for key in [key for key in self._entries if user is None or key[0] == user]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,255 @@
+"""
+Локальный снимок списков задач для мгновенного показа главного окна.
+
+При закрытии главного окна загруженные строки текущих задач и истории
+сохраняются в файл пользователя. При следующем входе окно сразу показывает
+строки из снимка, а затем в фоне перечитывает списки из хранилища и
+применяет к ним только отличия (stale-while-revalidate).
+
+Формат файла - двоичный, с номером версии в заголовке::
+
+    заголовок  <4sHqII   "TMSN", версия формата, время сохранения,
+                         число текущих задач, число выполненных
+    запись     <qBqqqII  id, флаги, deadline, completed_at, updated_at,
+                         длина описания и категории в байтах UTF-8
+               описание и категория
+
+Время хранится целым числом микросекунд от 1970-01-01 без часового пояса,
+поэтому восстанавливается без потери точности. Файл другой версии формата
+или повреждённый файл игнорируется. Снимок читается через ``mmap``: записи
+разбираются прямо из отображения файла, без чтения его целиком в память.
+
+Папку снимков задаёт ``TASK_MANAGER_SNAPSHOTS``; значение ``off`` выключает снимки.
+"""
+import hashlib
+import mmap
+import os
+import struct
+from datetime import datetime, timedelta
+
+from .storage import TaskRow
+from .task_model import _naive
+
+
+SNAPSHOT_DIR = os.environ.get(
+    "TASK_MANAGER_SNAPSHOTS", os.path.join(os.path.expanduser("~"), ".task_manager", "snapshots")
+)
+#сколько первых строк каждого списка сохраняется в снимок
+SNAPSHOT_ROWS = 500
+#версия формата файла; файлы других версий игнорируются
+FORMAT_VERSION = 2
+
+MAGIC = b"TMSN"
+_HEADER = struct.Struct("<4sHqII")
+_RECORD = struct.Struct("<qBqqqII")
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+#флаги записи
+_COMPLETED = 1
+_HAS_DEADLINE = 2
+_HAS_COMPLETED_AT = 4
+_HAS_UPDATED_AT = 8
+
+
+class Snapshot:
+    """
+    Строки списков задач, сохранённые при последнем закрытии окна.
+
+    :ivar tasks: Текущие задачи в порядке (deadline, id).
+    :type tasks: list[TaskRow]
+    :ivar completed: Выполненные задачи в порядке (completed_at, id).
+    :type completed: list[TaskRow]
+    :ivar saved_at: Время сохранения снимка.
+    :type saved_at: datetime
+    """
+    def __init__(self, tasks, completed, saved_at):
+        self.tasks = tasks
+        self.completed = completed
+        self.saved_at = saved_at
+
+    def __repr__(self):
+        return f"Snapshot(tasks={len(self.tasks)}, completed={len(self.completed)}, saved_at={self.saved_at!r})"
+
+
+def _micros(value):
+    return (_naive(value) - _EPOCH) // _MICROSECOND
+
+
+def _datetime(micros):
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def encode(tasks, completed, saved_at=None):
+    """
+    Кодирует списки задач в байты снимка.
+
+    :param tasks: Текущие задачи.
+    :type tasks: list[TaskRow]
+    :param completed: Выполненные задачи.
+    :type completed: list[TaskRow]
+    :param saved_at: Время сохранения. По умолчанию - текущее.
+    :type saved_at: datetime | None
+    :rtype: bytes
+    """
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, _micros(saved_at or datetime.now()), len(tasks), len(completed))]
+    for row in list(tasks) + list(completed):
+        description = row.description.encode("utf-8")
+        category = row.category.encode("utf-8")
+        flags = (
+            (_COMPLETED if row.completed else 0)
+            | (_HAS_DEADLINE if row.deadline is not None else 0)
+            | (_HAS_COMPLETED_AT if row.completed_at is not None else 0)
+            | (_HAS_UPDATED_AT if row.updated_at is not None else 0)
+        )
+        parts.append(_RECORD.pack(
+            row.id, flags,
+            0 if row.deadline is None else _micros(row.deadline),
+            0 if row.completed_at is None else _micros(row.completed_at),
+            0 if row.updated_at is None else _micros(row.updated_at),
+            len(description), len(category)
+        ))
+        parts.append(description)
+        parts.append(category)
+    return b"".join(parts)
+
+
+def decode(buffer, now=None):
+    """
+    Разбирает снимок из байтов или отображения файла.
+
+    :param buffer: Содержимое файла снимка.
+    :type buffer: bytes | mmap.mmap
+    :param now: Время, относительно которого вычисляется признак просрочки.
+    :type now: datetime | None
+    :return: Снимок или None, если формат не тот или файл повреждён.
+    :rtype: Snapshot | None
+    """
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, saved_at, open_count, completed_count = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+
+    now = now or datetime.now()
+    rows = []
+    offset = _HEADER.size
+    try:
+        for _ in range(open_count + completed_count):
+            task_id, flags, deadline, completed_at, updated_at, description_size, category_size = (
+                _RECORD.unpack_from(buffer, offset)
+            )
+            offset += _RECORD.size
+            description = bytes(buffer[offset:offset + description_size]).decode("utf-8")
+            offset += description_size
+            category = bytes(buffer[offset:offset + category_size]).decode("utf-8")
+            offset += category_size
+
+            completed = bool(flags & _COMPLETED)
+            deadline = _datetime(deadline) if flags & _HAS_DEADLINE else None
+            rows.append(TaskRow(
+                task_id, description, category, deadline, completed,
+                _datetime(completed_at) if flags & _HAS_COMPLETED_AT else None,
+                _datetime(updated_at) if flags & _HAS_UPDATED_AT else None,
+                bool(not completed and deadline is not None and deadline < now)
+            ))
+    except (struct.error, UnicodeDecodeError):
+        return None
+    if offset != len(buffer):
+        return None
+
+    return Snapshot(rows[:open_count], rows[open_count:], _datetime(saved_at))
+
+
+class SnapshotStore:
+    """
+    Файлы снимков пользователей одной базы данных.
+
+    Имя файла - хэш адреса базы и логина, поэтому снимки разных баз и
+    пользователей не смешиваются, а логин не попадает в имя файла.
+
+    :ivar directory: Папка снимков.
+    :type directory: str
+    :ivar scope: Адрес базы без пароля.
+    :type scope: str
+    """
+    def __init__(self, directory, scope):
+        self.directory = os.fspath(directory)
+        self.scope = scope
+
+    def path(self, username):
+        """
+        Возвращает путь к файлу снимка пользователя.
+
+        :rtype: str
+        """
+        digest = hashlib.sha256(f"{self.scope}\0{username}".encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.snap")
+
+    def load(self, username):
+        """
+        Читает снимок пользователя.
+
+        :param username: Логин пользователя.
+        :type username: str
+        :return: Снимок или None, если его нет или он не читается.
+        :rtype: Snapshot | None
+        """
+        try:
+            with open(self.path(username), "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return None
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return decode(buffer)
+        except OSError:
+            return None
+
+    def save(self, username, tasks, completed):
+        """
+        Сохраняет первые :data:`SNAPSHOT_ROWS` строк списков пользователя.
+
+        Файл записывается во временный и затем заменяет старый, поэтому
+        прерванная запись не портит предыдущий снимок.
+
+        :param username: Логин пользователя.
+        :type username: str
+        :param tasks: Текущие задачи.
+        :type tasks: list[TaskRow]
+        :param completed: Выполненные задачи.
+        :type completed: list[TaskRow]
+        """
+        path = self.path(username)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(encode(tasks[:SNAPSHOT_ROWS], completed[:SNAPSHOT_ROWS]))
+        os.replace(temporary, path)
+
+    def clear(self, username):
+        """
+        Удаляет снимок пользователя.
+        """
+        try:
+            os.remove(self.path(username))
+        except FileNotFoundError:
+            pass
+
+
+def snapshot_store(storage, directory=None):
+    """
+    Возвращает хранилище снимков для базы ``storage``.
+
+    :param storage: Хранилище задач.
+    :type storage: app.storage.StorageBackend
+    :param directory: Папка снимков. По умолчанию - TASK_MANAGER_SNAPSHOTS.
+    :type directory: str | None
+    :return: Хранилище снимков или None, если снимки выключены или
+        у хранилища нет файла или сервера базы (задачи в памяти).
+    :rtype: SnapshotStore | None
+    """
+    directory = directory or SNAPSHOT_DIR
+    engine = getattr(storage, "engine", None)
+    if directory == "off" or engine is None:
+        return None
+    return SnapshotStore(directory, engine.url.render_as_string(hide_password=True))
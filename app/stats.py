@@ -0,0 +1,169 @@
+"""
+Статистика задач пользователя без перебора задач.
+
+Количество текущих и выполненных задач по категориям хранится в сводной
+таблице ``task_stats``, а время выполнения задач - гистограммой по дням
+выполнения в ``task_completion_stats``. Обе таблицы обновляют триггеры базы
+(:mod:`app.migrations`), поэтому они верны при любом способе записи задач:
+через :class:`app.storage.Storage`, импорт или синхронизацию реплики.
+
+Время выполнения (от создания до выполнения задачи) раскладывается по
+корзинам, границы которых растут в √2 раз, начиная с минуты.
+Перцентиль оценивается внутри корзины линейно, поэтому ответ зависит только
+от числа дней в окне, а не от числа задач.
+"""
+from bisect import bisect_right
+from datetime import date
+
+
+#верхние границы корзин времени выполнения, в секундах: от минуты до года с лишним
+COMPLETION_BOUNDS = tuple(round(60 * 2 ** (step / 2)) for step in range(40))
+#перцентили времени выполнения в ответе get_stats
+PERCENTILES = (50, 90)
+
+
+def completion_bucket(seconds):
+    """
+    Возвращает номер корзины для времени выполнения задачи.
+
+    Совпадает с выражением ``CASE``, которое считают триггеры базы.
+
+    :param seconds: Время от создания до выполнения задачи в секундах.
+    :type seconds: float
+    :rtype: int
+    """
+    return bisect_right(COMPLETION_BOUNDS, seconds)
+
+
+def completion_key(created_at, completed_at):
+    """
+    Возвращает ключ (день выполнения, корзина) выполненной задачи для гистограммы.
+
+    :return: Ключ или None, если у задачи нет времени создания или выполнения.
+    :rtype: tuple[date, int] | None
+    """
+    if created_at is None or completed_at is None:
+        return None
+    seconds = (completed_at - created_at).total_seconds()
+    return completed_at.date(), completion_bucket(seconds)
+
+
+def window_start(period, today=None):
+    """
+    Возвращает первый день окна статистики времени выполнения.
+
+    :param period: Длина окна; None - всё время.
+    :type period: timedelta | None
+    :rtype: date | None
+    """
+    if period is None:
+        return None
+    return (today or date.today()) - period
+
+
+def percentile(histogram, fraction):
+    """
+    Оценивает перцентиль по гистограмме корзин.
+
+    :param histogram: Количество задач по номеру корзины.
+    :type histogram: dict[int, int]
+    :param fraction: Доля от 0 до 1.
+    :type fraction: float
+    :return: Время выполнения в секундах или None для пустой гистограммы.
+    :rtype: float | None
+    """
+    total = sum(histogram.values())
+    if total <= 0:
+        return None
+
+    rank = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if count <= 0:
+            continue
+        if seen + count >= rank:
+            lower = COMPLETION_BOUNDS[bucket - 1] if bucket else 0
+            #последняя корзина не ограничена сверху
+            upper = COMPLETION_BOUNDS[bucket] if bucket < len(COMPLETION_BOUNDS) else lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(COMPLETION_BOUNDS[-1])
+
+
+def summarize(categories, overdue, histogram, period):
+    """
+    Собирает ответ :meth:`app.storage.Storage.get_stats`.
+
+    :param categories: Количество текущих и выполненных задач по категориям.
+    :type categories: dict[str, tuple[int, int]]
+    :param overdue: Количество просроченных задач.
+    :type overdue: int
+    :param histogram: Время выполнения задач окна: количество по номеру корзины.
+    :type histogram: dict[int, int]
+    :param period: Длина окна; None - всё время.
+    :type period: timedelta | None
+    :return: Словарь с ключами open, completed, overdue, completion_rate, categories,
+        period_days, period_completed и completion_p50, completion_p90 (секунды или None).
+    :rtype: dict
+    """
+    categories = {
+        name: {"open": open_count, "completed": completed_count}
+        for name, (open_count, completed_count) in sorted(categories.items())
+        if open_count or completed_count
+    }
+    open_total = sum(counts["open"] for counts in categories.values())
+    completed_total = sum(counts["completed"] for counts in categories.values())
+    total = open_total + completed_total
+
+    stats = {
+        "open": open_total,
+        "completed": completed_total,
+        "overdue": overdue,
+        "completion_rate": completed_total / total if total else 0.0,
+        "categories": categories,
+        "period_days": None if period is None else period.days,
+        "period_completed": sum(histogram.values()),
+    }
+    for value in PERCENTILES:
+        stats[f"completion_p{value}"] = percentile(histogram, value / 100)
+    return stats
+
+
+def format_duration(seconds):
+    """
+    Возвращает время выполнения для показа: минуты, часы или дни.
+
+    :type seconds: float | None
+    :rtype: str
+    """
+    if seconds is None:
+        return "-"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} мин"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} ч"
+    return f"{seconds / 86400:.1f} дн"
+
+
+def format_stats(stats):
+    """
+    Возвращает статистику текстом по строкам для панели и консоли.
+
+    :param stats: Ответ :meth:`app.storage.Storage.get_stats`.
+    :type stats: dict
+    :rtype: list[str]
+    """
+    lines = [
+        f"текущих: {stats['open']}, просрочено: {stats['overdue']}, выполнено: {stats['completed']} "
+        f"({stats['completion_rate']:.0%})",
+    ]
+    for name, counts in stats["categories"].items():
+        lines.append(f"  {name}: текущих {counts['open']}, выполнено {counts['completed']}")
+
+    window = "за всё время" if stats["period_days"] is None else f"за {stats['period_days']} дн."
+    percentiles = ", ".join(
+        f"p{value} {format_duration(stats[f'completion_p{value}'])}" for value in PERCENTILES
+    )
+    lines.append(f"выполнено {window}: {stats['period_completed']}, время выполнения: {percentiles}")
+    return lines
@@ -0,0 +1,363 @@
+from bisect import bisect_right
+from datetime import datetime
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from .storage import PAGE_SIZE
+
+
+#роль, в которой модель отдаёт id задачи
+TaskIdRole = Qt.ItemDataRole.UserRole
+
+
+def _naive(value):
+    """
+    Приводит время к локальному без часового пояса, чтобы его можно было сравнивать с наивным.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def deadline_order(nulls_first):
+    """
+    Возвращает ключ сортировки текущих задач, совпадающий с ``ORDER BY deadline, id``.
+
+    :param nulls_first: Задачи без дедлайна идут первыми (SQLite) или последними (PostgreSQL).
+    :type nulls_first: bool
+    :return: Функция, возвращающая ключ задачи.
+    :rtype: callable
+    """
+    def key(task):
+        return ((task.deadline is None) != nulls_first, task.deadline or datetime.min, task.id)
+    return key
+
+
+def completed_order(task):
+    """
+    Ключ сортировки истории, совпадающий с ``ORDER BY completed_at, id``.
+    """
+    return (_naive(task.completed_at) or datetime.min, task.id)
+
+
+def format_task(task, now=None):
+    """
+    Формирует строку текущей задачи для отображения в списке.
+
+    :param task: Задача.
+    :type task: TaskRow | Task
+    :param now: Текущее время, с которым сравнивается дедлайн.
+    :type now: datetime | None
+    :return: Строка вида "[категория] описание (до дд.мм.гггг чч:мм)".
+    :rtype: str
+    """
+    text = f"[{task.category}] {task.description}"
+
+    if task.deadline:
+        text += f" (до {task.deadline:%d.%m.%Y %H:%M})"
+
+        if task.deadline < (now or datetime.now()):
+            text += "   ПРОСРОЧЕНО!"
+
+    return text
+
+
+def format_completed_task(task):
+    """
+    Формирует строку выполненной задачи для истории.
+
+    :param task: Задача.
+    :type task: TaskRow | Task
+    :return: Описание задачи.
+    :rtype: str
+    """
+    return task.description
+
+
+class TaskListModel(QAbstractListModel):
+    """
+    Модель списка задач с ленивой постраничной загрузкой.
+
+    Хранит только уже загруженные страницы. Следующую страницу представление
+    запрашивает через :meth:`canFetchMore`/:meth:`fetchMore`, когда пользователь
+    прокручивает список до конца.
+
+    Страница может загружаться асинхронно: модель передаёт в ``fetch_page``
+    функцию ``deliver``, которую нужно вызвать со списком задач, когда он
+    будет готов, и функцию ``fail``, которую нужно вызвать с исключением, если
+    загрузить страницу не удалось. Пока страница загружается, следующая не
+    запрашивается, а страница, пришедшая после :meth:`reload` или
+    :meth:`set_rows`, отбрасывается. После ошибки модель снова разрешает
+    загрузку, и страница запрашивается при следующей прокрутке.
+
+    :ivar fetch_page: Функция ``fetch_page(after, limit, deliver, fail)``, запрашивающая следующую страницу задач.
+    :type fetch_page: callable
+    :ivar sort_key: Функция, возвращающая ключ keyset-пагинации задачи.
+    :type sort_key: callable
+    :ivar formatter: Функция, формирующая строку задачи для отображения.
+    :type formatter: callable
+    :ivar page_size: Размер страницы.
+    :type page_size: int
+    :ivar order_key: Функция, возвращающая сравнимый ключ порядка задачи для :meth:`insert_task`.
+    :type order_key: callable
+    """
+    def __init__(self, fetch_page, sort_key, formatter, page_size=PAGE_SIZE, parent=None, order_key=None):
+        """
+        Создаёт пустую модель. Первая страница загружается методом :meth:`reload`.
+        """
+        QAbstractListModel.__init__(self, parent)
+        self.fetch_page = fetch_page
+        self.sort_key = sort_key
+        self.formatter = formatter
+        self.page_size = page_size
+        self.order_key = order_key or sort_key
+
+        self._rows = []
+        self._exhausted = True
+        self._loading = False
+        #номер текущего содержимого модели, меняется при каждом сбросе
+        self._generation = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        """
+        Возвращает количество загруженных задач.
+        """
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """
+        Возвращает строку задачи или её id.
+        """
+        if not index.isValid() or not 0 <= index.row() < len(self._rows):
+            return None
+
+        task = self._rows[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.formatter(task)
+        if role == TaskIdRole:
+            return task.id
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        """
+        Проверяет, есть ли в хранилище ещё не загруженные задачи.
+        """
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        """
+        Запрашивает следующую страницу задач.
+        """
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+
+        after = self.sort_key(self._rows[-1]) if self._rows else None
+        generation = self._generation
+        self._loading = True
+        self.fetch_page(
+            after, self.page_size,
+            lambda page: self._append_page(generation, page),
+            lambda err: self._fail_page(generation, err)
+        )
+
+    def _append_page(self, generation, page):
+        """
+        Добавляет загруженную страницу в конец списка, если модель не сбрасывалась после запроса.
+        """
+        if generation != self._generation:
+            return
+
+        self._loading = False
+        self._exhausted = len(page) < self.page_size
+
+        if page:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+
+    def _fail_page(self, generation, err):
+        """
+        Снимает отметку загрузки после ошибки, чтобы страницу можно было запросить снова.
+
+        Саму ошибку показывает тот, кто загружал страницу (например,
+        :class:`app.background.StorageWorker` сигналом ``failed``).
+        """
+        if generation == self._generation:
+            self._loading = False
+
+    def reload(self):
+        """
+        Сбрасывает загруженные задачи и загружает первую страницу заново.
+        """
+        self.beginResetModel()
+        self._generation += 1
+        self._rows = []
+        self._exhausted = False
+        self._loading = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def set_rows(self, rows):
+        """
+        Показывает готовый список задач без постраничной загрузки (например, результаты поиска).
+
+        :param rows: Задачи для отображения.
+        :type rows: list[Task]
+        """
+        self.beginResetModel()
+        self._generation += 1
+        self._rows = list(rows)
+        self._exhausted = True
+        self._loading = False
+        self.endResetModel()
+
+    def revalidate(self, limit=None):
+        """
+        Перечитывает первые строки списка и применяет к модели только отличия.
+
+        Используется после показа устаревших строк (например, из снимка
+        :mod:`app.snapshot`): вместо сброса модели удаляются пропавшие задачи,
+        вставляются новые, а изменившиеся перерисовываются на месте, поэтому
+        выделение и прокрутка сохраняются.
+
+        :param limit: Сколько строк перечитать. По умолчанию - столько, сколько
+            загружено, но не меньше страницы.
+        :type limit: int | None
+        """
+        limit = limit or max(len(self._rows), self.page_size)
+        self._generation += 1
+        generation = self._generation
+        self._loading = True
+        self.fetch_page(
+            None, limit,
+            lambda page: self._merge_page(generation, page, limit),
+            lambda err: self._fail_page(generation, err)
+        )
+
+    def _merge_page(self, generation, page, limit):
+        """
+        Приводит загруженные строки к свежим строкам ``page`` минимальными изменениями.
+        """
+        if generation != self._generation:
+            return
+
+        self._loading = False
+        self._exhausted = len(page) < limit
+        fresh = {task.id: task for task in page}
+
+        #пропавшие задачи и задачи, сменившие место в порядке, удаляются
+        for row in range(len(self._rows) - 1, -1, -1):
+            task = self._rows[row]
+            current = fresh.get(task.id)
+            if current is None or self.order_key(current) != self.order_key(task):
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+
+        #оставшиеся строки идут в том же порядке, что и свежие: новые вставляются между ними
+        for row, task in enumerate(page):
+            if row < len(self._rows) and self._rows[row].id == task.id:
+                if self._rows[row] != task:
+                    self._rows[row] = task
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+                continue
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.insert(row, task)
+            self.endInsertRows()
+
+    def rows(self):
+        """
+        Возвращает загруженные задачи в порядке списка.
+
+        :rtype: list[Task]
+        """
+        return list(self._rows)
+
+    def insert_task(self, task):
+        """
+        Вставляет задачу на её место в порядке сортировки без перезагрузки списка.
+
+        Если задача идёт после последней загруженной, а в хранилище ещё есть
+        незагруженные страницы, она не вставляется - её загрузит :meth:`fetchMore`.
+
+        :param task: Новая задача.
+        :type task: Task
+        :return: True, если задача добавлена в модель.
+        :rtype: bool
+        """
+        key = self.order_key(task)
+        if self._rows and not self._exhausted and key > self.order_key(self._rows[-1]):
+            return False
+
+        row = bisect_right(self._rows, key, key=self.order_key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, task)
+        self.endInsertRows()
+        return True
+
+    def remove_tasks(self, ids):
+        """
+        Удаляет из модели задачи с указанными id.
+
+        :param ids: Идентификаторы задач.
+        :type ids: Iterable[int]
+        :return: Удалённые задачи в порядке списка.
+        :rtype: list[Task]
+        """
+        ids = set(ids)
+        removed = []
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row].id in ids:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                removed.append(self._rows.pop(row))
+                self.endRemoveRows()
+        removed.reverse()
+        return removed
+
+    def find_task(self, task_id):
+        """
+        Возвращает загруженную задачу по id.
+
+        :param task_id: Идентификатор задачи.
+        :type task_id: int
+        :return: Задача или None, если её нет в модели.
+        :rtype: Task | None
+        """
+        for task in self._rows:
+            if task.id == task_id:
+                return task
+        return None
+
+    def refresh_task(self, task_id):
+        """
+        Перерисовывает строку задачи, например когда её срок истёк.
+
+        :param task_id: Идентификатор задачи.
+        :type task_id: int
+        :return: True, если задача есть в модели.
+        :rtype: bool
+        """
+        for row, task in enumerate(self._rows):
+            if task.id == task_id:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+                return True
+        return False
+
+    def task(self, row):
+        """
+        Возвращает задачу по номеру строки.
+
+        :param row: Номер строки.
+        :type row: int
+        :return: Задача.
+        :rtype: Task
+        """
+        return self._rows[row]
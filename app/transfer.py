@@ -0,0 +1,222 @@
+"""
+Потоковый импорт и экспорт задач в форматах CSV и JSONL.
+
+Файл читается и пишется построчно, поэтому импорт и экспорт сотен тысяч
+задач не требуют держать их все в памяти.
+
+Колонки CSV (и ключи объектов JSONL): ``description``, ``category``,
+``deadline``, ``completed``, ``completed_at``. Даты - в формате ISO 8601,
+для текущих задач ``completed`` и ``completed_at`` можно не указывать.
+"""
+import csv
+import json
+from datetime import datetime
+
+from .storage import CATEGORIES
+
+
+FORMATS = ("csv", "jsonl")
+
+FIELDS = ["description", "category", "deadline", "completed", "completed_at"]
+EXPORT_FIELDS = ["id", "description", "category", "deadline", "completed", "created_at", "completed_at"]
+
+_TRUE = {"1", "true", "t", "yes", "y", "да"}
+_FALSE = {"", "0", "false", "f", "no", "n", "нет"}
+
+
+class TaskImportError(Exception):
+    """
+    Ошибка в строке импортируемого файла.
+
+    :ivar line: Номер строки файла, начиная с 1.
+    :type line: int
+    """
+    def __init__(self, line, message):
+        Exception.__init__(self, f"строка {line}: {message}")
+        self.line = line
+
+
+def format_from_path(path):
+    """
+    Определяет формат файла по расширению.
+
+    :param path: Путь к файлу.
+    :type path: str
+    :return: "jsonl" для файлов .jsonl/.ndjson, иначе "csv".
+    :rtype: str
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def _parse_datetime(value, field):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{field}: неверная дата '{value}'") from None
+
+
+def _parse_bool(value):
+    if isinstance(value, bool) or value is None:
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"completed: неверное значение '{value}'")
+
+
+def validate_task(record):
+    """
+    Проверяет и приводит к нужным типам одну импортируемую задачу.
+
+    :param record: Поля задачи из файла.
+    :type record: dict
+    :return: Задача в формате :meth:`Storage.add_tasks`.
+    :rtype: dict
+
+    :raises ValueError: если описание пустое, категория неизвестна или дата некорректна.
+    """
+    description = (record.get("description") or "").strip()
+    if not description:
+        raise ValueError("описание задачи не может быть пустым")
+
+    category = (record.get("category") or "").strip()
+    if category not in CATEGORIES:
+        raise ValueError(f"неизвестная категория '{category}'")
+
+    completed = _parse_bool(record.get("completed"))
+    completed_at = _parse_datetime(record.get("completed_at"), "completed_at")
+    if completed and completed_at is None:
+        completed_at = datetime.now()
+
+    return {
+        "description": description,
+        "category": category,
+        "deadline": _parse_datetime(record.get("deadline"), "deadline"),
+        "completed": completed,
+        "completed_at": completed_at if completed else None,
+    }
+
+
+def _records(fileobj, fmt):
+    """
+    Построчно читает файл и отдаёт пары (номер строки, поля задачи).
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(fileobj)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line, text in enumerate(fileobj, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as err:
+            raise TaskImportError(line, f"неверный JSON: {err.msg}") from None
+        if not isinstance(record, dict):
+            raise TaskImportError(line, "ожидается JSON-объект")
+        yield line, record
+
+
+def read_tasks(fileobj, fmt="csv", errors=None):
+    """
+    Построчно читает и проверяет задачи из файла.
+
+    :param fileobj: Открытый текстовый файл.
+    :type fileobj: TextIO
+    :param fmt: Формат файла: "csv" или "jsonl".
+    :type fmt: str
+    :param errors: Если передан список, ошибочные строки пропускаются и
+        ошибки добавляются в него. Иначе первая ошибка прерывает чтение.
+    :type errors: list[TaskImportError] | None
+    :return: Итератор проверенных задач.
+    :rtype: Iterator[dict]
+
+    :raises TaskImportError: если строка файла некорректна и ``errors`` не передан.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"неизвестный формат '{fmt}'")
+
+    for line, record in _records(fileobj, fmt):
+        try:
+            yield validate_task(record)
+        except ValueError as err:
+            error = TaskImportError(line, str(err))
+            if errors is None:
+                raise error from None
+            errors.append(error)
+
+
+def import_tasks(storage, username, fileobj, fmt="csv", skip_invalid=False):
+    """
+    Импортирует задачи из файла одной транзакцией.
+
+    :param storage: Хранилище данных.
+    :type storage: Storage
+    :param username: Логин пользователя или его контекст.
+    :type username: str | UserSession
+    :param fileobj: Открытый текстовый файл.
+    :type fileobj: TextIO
+    :param fmt: Формат файла: "csv" или "jsonl".
+    :type fmt: str
+    :param skip_invalid: Пропускать ошибочные строки вместо отмены всего импорта.
+    :type skip_invalid: bool
+    :return: Количество импортированных задач и список пропущенных строк.
+    :rtype: tuple[int, list[TaskImportError]]
+
+    :raises TaskImportError: если строка файла некорректна и ``skip_invalid`` выключен.
+    """
+    errors = [] if skip_invalid else None
+    count = storage.add_tasks(username, read_tasks(fileobj, fmt, errors))
+    return count, errors or []
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_tasks(storage, username, fileobj, fmt="csv", completed=None):
+    """
+    Потоково выгружает задачи пользователя в файл.
+
+    :param storage: Хранилище данных.
+    :type storage: Storage
+    :param username: Логин пользователя или его контекст.
+    :type username: str | UserSession
+    :param fileobj: Открытый на запись текстовый файл.
+    :type fileobj: TextIO
+    :param fmt: Формат файла: "csv" или "jsonl".
+    :type fmt: str
+    :param completed: True - только выполненные, False - только текущие, None - все задачи.
+    :type completed: bool | None
+    :return: Количество выгруженных задач.
+    :rtype: int
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"неизвестный формат '{fmt}'")
+
+    if fmt == "csv":
+        writer = csv.writer(fileobj)
+        writer.writerow(EXPORT_FIELDS)
+
+    count = 0
+    for row in storage.iter_tasks(username, completed):
+        values = [_export_value(getattr(row, field)) for field in EXPORT_FIELDS]
+        if fmt == "csv":
+            writer.writerow(["" if v is None else v for v in values])
+        else:
+            fileobj.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False) + "\n")
+        count += 1
+
+    return count
@@ -1,7 +1,12 @@
 from PyQt6.QtWidgets import QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox
 from .ui_main import MainWindow
 from .ui_register import RegisterWindow
-from .storage import Storage, UserNotFoundError,EmptyUsernameError, WrongPasswordError
+from .storage import UserNotFoundError,EmptyUsernameError, WrongPasswordError
+from .background import StorageWorker
+from .backends import open_storage
+from .snapshot import snapshot_store
+from .archive import Archiver
+from .replica import ReplicaStorage
 
 
 
@@ -13,7 +18,9 @@ class LoginWindow(QWidget):
     авторизации открывается основное окно приложения.
 
     :ivar storage: Хранилище данных, используемое для проверки логина и пароля.
-    :type storage: Storage
+    :type storage: StorageBackend
+    :ivar worker: Фоновый исполнитель запросов к хранилищу.
+    :type worker: StorageWorker
     :ivar label: Текстовая инструкция для пользователя.
     :type label: QLabel
     :ivar username_input: Поле ввода логина.
@@ -36,7 +43,10 @@ class LoginWindow(QWidget):
         QWidget.__init__(self)
         self.setWindowTitle("Вход")
         self.resize(300, 200)
-        self.storage = Storage()
+        #хранилище выбирается по DATABASE_URL; с TASK_MANAGER_REPLICA окно работает
+        #с локальной репликой и не ждёт основную базу
+        self.storage = open_storage()
+        self.worker = StorageWorker(self.storage, parent=self)
 
         self.init_ui()
 
@@ -72,13 +82,15 @@ class LoginWindow(QWidget):
         """
         Открывает окно регистрации.
         """
-        self.reg_window = RegisterWindow()
+        self.reg_window = RegisterWindow(self.storage, self.worker)
         self.reg_window.show()
 
     def login(self):
         """ 
         Выполняет авторизацию пользователя по логину и паролю.
-        При успешной авторизации открывает главное окно приложения.
+        Проверка пароля выполняется в фоне, чтобы окно не зависало на время
+        запроса к базе и проверки хэша. При успешной авторизации открывает
+        главное окно приложения.
         
         :raises EmptyUsernameError: если логин или пароль не введены.
         :raises UserNotFoundError: если пользователь с таким логином не найден.
@@ -92,21 +104,47 @@ class LoginWindow(QWidget):
             if not username or not password:
                 raise EmptyUsernameError("Введите логин и пароль")
 
-            self.storage.check_login(username, password)
-
         except EmptyUsernameError as err:
             QMessageBox.warning(self, "Ошибка", str(err))
             return
 
-        except UserNotFoundError as err:
-            QMessageBox.warning(self, "Ошибка входа", str(err))
-            return
+        self.login_button.setEnabled(False)
+        self.worker.submit(
+            "login",
+            self.storage.check_login,
+            username,
+            password,
+            on_result=lambda _: self.open_main(username),
+            on_error=self.login_failed
+        )
+
+    def login_failed(self, err):
+        """
+        Сообщает об ошибке авторизации.
+
+        :param err: Исключение, возникшее при проверке логина и пароля.
+        :type err: Exception
+        """
+        self.login_button.setEnabled(True)
 
-        except WrongPasswordError as err:
+        if isinstance(err, (UserNotFoundError, WrongPasswordError)):
             QMessageBox.warning(self, "Ошибка входа", str(err))
-            return
+        else:
+            QMessageBox.warning(self, "Ошибка", str(err))
 
+    def open_main(self, username):
+        """
+        Открывает главное окно приложения для авторизованного пользователя.
+
+        :param username: Логин пользователя.
+        :type username: str
+        """
+        self.login_button.setEnabled(True)
         self.storage.current_user = username
-        self.main_window = MainWindow(self.storage)
+        #задачи реплики архивирует основная база
+        archiver = None if isinstance(self.storage, ReplicaStorage) else Archiver(self.storage, username)
+        self.main_window = MainWindow(
+            self.storage, self.worker, snapshots=snapshot_store(self.storage), archiver=archiver
+        )
         self.main_window.show()
-        self.close()
\ No newline at end of file
+        self.close()
@@ -1,6 +1,21 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QListWidget, QLineEdit, QLabel, QMessageBox, QHBoxLayout, QComboBox,QDateEdit, QDialog
-from PyQt6.QtCore import QDate
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QListView, QAbstractItemView, QLineEdit, QLabel, QMessageBox, QHBoxLayout, QComboBox,QDateEdit, QDialog
+import struct
+from datetime import datetime
+from PyQt6.QtCore import QDate, QEvent, Qt, QTimer
+from PyQt6.QtGui import QKeySequence, QShortcut
 from app.deadline import DeadlineDialog
+from app.task_model import TaskListModel, TaskIdRole, format_task, format_completed_task, deadline_order, completed_order
+from app.background import ChangeRelay, StorageWorker
+from app.scheduler import DeadlineScheduler
+from app.search import SearchCache
+from app.storage import TaskRow
+from app.instrumentation import profiler
+from app.ui_profiler import ProfilerDialog
+from app.ui_stats import StatsPanel
+
+#пауза после последнего изменения строки поиска или дат перед запросом, в миллисекундах
+SEARCH_DEBOUNCE_MS = 300
+
  
 class MainWindow(QWidget):
     """
@@ -9,29 +24,118 @@ class MainWindow(QWidget):
     Отображает задачи текущего пользователя и предоставляет
     инструменты для работы с ними.
     """
-    def __init__(self, storage):
+    def __init__(self, storage, worker=None, listen=True, snapshots=None, archiver=None):
         """
         Инициализирует интерфейс, загружает задачи пользователя
         и историю выполненных задач.
 
+        Все обращения к хранилищу выполняются в фоне, поэтому окно
+        появляется сразу, а списки заполняются по мере загрузки.
+
+        Загруженные списки служат кэшем задач пользователя: добавление и
+        выполнение задач меняют их на месте, без повторного чтения из базы.
+        Срок каждой загруженной задачи отслеживает :class:`DeadlineScheduler`:
+        когда он наступает, перерисовывается только строка этой задачи.
+
+        Изменения, сделанные другими клиентами, приходят от слушателя
+        (:meth:`Storage.listen_changes`) и применяются к спискам построчно.
+        Когда окно снова становится активным, кэш дополнительно сверяется
+        с базой по версии задач (:meth:`Storage.tasks_version`).
+
+        Поиск выполняется по мере ввода: через :data:`SEARCH_DEBOUNCE_MS` после
+        последнего изменения строки поиска или дат. Результаты запоминаются
+        в :class:`SearchCache` до следующего изменения задач.
+
+        Панель статистики (:class:`StatsPanel`) перезапрашивает
+        :meth:`Storage.get_stats` после каждого изменения задач; ответ
+        берётся из сводных таблиц и не зависит от числа задач.
+
+        Если передано хранилище снимков, окно сразу показывает списки,
+        сохранённые при прошлом закрытии (:mod:`app.snapshot`), а затем в фоне
+        перечитывает их и применяет только отличия.
+
         :param storage: Объект хранилища данных приложения.
         :type storage: Storage
+        :param worker: Фоновый исполнитель запросов к хранилищу.
+        :type worker: StorageWorker | None
+        :param listen: Получать изменения задач от других клиентов.
+        :type listen: bool
+        :param snapshots: Хранилище снимков списков; None - без снимков.
+        :type snapshots: app.snapshot.SnapshotStore | None
+        :param archiver: Фоновый перенос старых выполненных задач в архив; работает, пока открыто окно.
+        :type archiver: app.archive.Archiver | None
         """
         QWidget.__init__(self)
         self.storage = storage
+        self.worker = worker or StorageWorker(storage, parent=self)
+        self.worker.failed.connect(self.show_error)
+        self.snapshots = snapshots
         self.setWindowTitle(f"Task Manager - {storage.current_user}")
         self.resize(500, 500)
+        #версия задач в базе, которой соответствуют списки; None - ещё не известна
+        self.version = None
+        #списки показывают результаты поиска, а не текущие задачи
+        self.searching = False
+        self.search_cache = SearchCache()
         self.init_ui()
-        self.load_tasks()
-        self.load_completed_tasks()
+
+        self.scheduler = DeadlineScheduler(parent=self)
+        self.scheduler.due.connect(self.task_model.refresh_task)
+        self.scheduler.remind.connect(self.show_reminder)
+        self.task_model.rowsInserted.connect(self._schedule_rows)
+        self.task_model.rowsAboutToBeRemoved.connect(self._unschedule_rows)
+        self.task_model.modelReset.connect(self._schedule_all)
+
+        snapshot = snapshots.load(storage.current_user) if snapshots is not None else None
+        if snapshot is None:
+            self.reload_lists()
+        else:
+            self.show_snapshot(snapshot)
+
+        self.changes = ChangeRelay(self)
+        self.changes.changed.connect(self.apply_changes)
+        if listen:
+            self.changes.start(storage, storage.current_user)
+
+        self.archiver = archiver
+        if archiver is not None:
+            archiver.start()
 
     def init_ui(self):
         """
         Инициализирует списки задач, поля ввода, кнопки управления
         и элементы поиска.
         """
-        self.task_list = QListWidget()
-        self.completed_list = QListWidget()  
+        #списки показывают только загруженные страницы, остальные подгружаются при прокрутке
+        self.task_model = TaskListModel(
+            lambda after, limit, deliver, fail: self.worker.submit(
+                "tasks", self.storage.get_task_rows, self.storage.current_user, after, limit,
+                on_result=deliver, on_error=fail
+            ),
+            lambda task: (task.deadline, task.id),
+            format_task,
+            parent=self,
+            order_key=deadline_order(self.storage.nulls_first)
+        )
+        self.completed_model = TaskListModel(
+            lambda after, limit, deliver, fail: self.worker.submit(
+                "completed", self.storage.get_completed_task_rows, self.storage.current_user, after, limit,
+                on_result=deliver, on_error=fail
+            ),
+            lambda task: (task.completed_at, task.id),
+            format_completed_task,
+            parent=self,
+            order_key=completed_order
+        )
+
+        self.task_list = QListView()
+        self.task_list.setUniformItemSizes(True)
+        self.task_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.task_list.setModel(self.task_model)
+
+        self.completed_list = QListView()
+        self.completed_list.setUniformItemSizes(True)
+        self.completed_list.setModel(self.completed_model)
 
         self.task_input = QLineEdit()
         self.task_input.setPlaceholderText("Описание задачи")
@@ -53,12 +157,25 @@ class MainWindow(QWidget):
         self.date_to = QDateEdit()
         self.date_to.setCalendarPopup(True)
 
+        self.stats_panel = StatsPanel(self)
+        self.stats_panel.period_changed.connect(self.refresh_stats)
+
         self.search_button = QPushButton("Найти")
         self.search_button.clicked.connect(self.search_tasks)
 
+        #поиск по мере ввода: запрос уходит, когда пользователь перестал печатать
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_tasks)
+        self.search_input.textChanged.connect(self.search_text_changed)
+        self.date_from.dateChanged.connect(self.search_timer.start)
+        self.date_to.dateChanged.connect(self.search_timer.start)
+
 
         layout = QVBoxLayout()
         layout.addWidget(QLabel(f"Пользователь: {self.storage.current_user}"))
+        layout.addWidget(self.stats_panel)
         layout.addWidget(self.task_input)
         layout.addWidget(self.add_button)
         layout.addWidget(QLabel("Текущие задачи:"))
@@ -78,6 +195,17 @@ class MainWindow(QWidget):
 
         self.setLayout(layout)
 
+        #отладочная панель доступна только при включённом измерении (TASK_MANAGER_PROFILE=1)
+        if profiler.enabled:
+            self.profiler_shortcut = QShortcut(QKeySequence("F12"), self)
+            self.profiler_shortcut.activated.connect(self.show_profiler)
+
+    def show_profiler(self):
+        """
+        Открывает отладочную панель со статистикой запросов к хранилищу.
+        """
+        ProfilerDialog(self).exec()
+
     def add_task(self):
         """
         Добавляет новую задачу пользователю.
@@ -99,80 +227,350 @@ class MainWindow(QWidget):
         deadline = dialog.get_deadline()
         category = dialog.get_category()
 
-        self.storage.add_task(
+        self.worker.submit(
+            None,
+            self.storage.add_task,
             self.storage.current_user,
             text,
             deadline,
-            category
+            category,
+            on_result=self.task_added
         )
 
         self.task_input.clear()
-        self.load_tasks()
 
 
     def delete_task(self):
         """
-        Отмечает выбранную задачу как выполненную.
+        Отмечает выбранные задачи как выполненные.
 
-        Перемещает задачу из списка текущих задач
-        в историю выполненных.
+        Перемещает задачи из списка текущих задач
+        в историю выполненных. Задачи выбираются по id, поэтому задачи
+        с одинаковым описанием не выполняются случайно.
         """
-        current = self.task_list.currentItem()
-        if not current:
+        ids = [index.data(TaskIdRole) for index in self.task_list.selectionModel().selectedIndexes()]
+        if not ids:
             QMessageBox.information(self, "Инфо", "Выберите задачу для выполнения")
             return
 
-        text = current.text()
-        
+        completed_at = datetime.now()
+        self.worker.submit(
+            None,
+            self.storage.complete_tasks,
+            self.storage.current_user,
+            ids,
+            completed_at,
+            on_result=lambda done: self.tasks_completed(done, completed_at)
+        )
 
-        #Заимствованный код.
-        if " (до " in text:
-            text = text.split(" (до ")[0]
+    def task_added(self, task):
+        """
+        Вставляет добавленную задачу в список текущих задач на место по дедлайну.
 
-        
-        if text.startswith("[") and "] " in text:
-            text = text.split("] ", 1)[1]
+        :param task: Задача, которую вернул :meth:`Storage.add_task`.
+        :type task: Task
+        """
+        self.search_cache.invalidate(self.storage.current_user)
+        if self.searching:
+            self.load_tasks()
+            self.refresh_stats()
+            return
+
+        self.task_model.insert_task(TaskRow.from_task(task))
+        self._advance_version(1, 0, task.updated_at)
+        self.refresh_stats()
+
+    def tasks_completed(self, ids, completed_at):
+        """
+        Переносит выполненные задачи из списка текущих задач в историю.
+
+        :param ids: Идентификаторы задач, которые вернул :meth:`Storage.complete_tasks`.
+        :type ids: list[int]
+        :param completed_at: Время выполнения, переданное в хранилище.
+        :type completed_at: datetime
+        """
+        self.search_cache.invalidate(self.storage.current_user)
+        for task in self.task_model.remove_tasks(ids):
+            self.completed_model.insert_task(
+                task._replace(completed=True, completed_at=completed_at, updated_at=completed_at, overdue=False)
+            )
+        self._advance_version(0, len(ids), completed_at)
+        self.refresh_stats()
+
+    def apply_changes(self, changes):
+        """
+        Применяет к спискам изменения задач, пришедшие от слушателя.
+
+        Удалённые задачи убираются из списков, а изменённые и новые
+        перечитываются одним запросом по id. Собственные изменения окна уже
+        применены: задача с тем же временем изменения в кэше пропускается.
+        Выполненные задачи удаляются и тогда, когда уходят в архив, а история
+        показывает и архив, поэтому после удаления строк история сверяется
+        с хранилищем и вернёт перенесённые в архив задачи.
+
+        :param changes: Изменения задач.
+        :type changes: list[app.changes.TaskChange]
+        """
+        self.search_cache.invalidate(self.storage.current_user)
+        self.refresh_stats()
+        if any(change.op == "RELOAD" for change in changes):
+            self.reload_lists()
+            return
+
+        stale = []
+        archived = False
+        for change in changes:
+            if change.op == "DELETE":
+                self.task_model.remove_tasks([change.task_id])
+                archived = archived or bool(self.completed_model.remove_tasks([change.task_id]))
+            elif not self._is_cached(change):
+                stale.append(change.task_id)
+        if archived:
+            self.completed_model.revalidate()
+
+        if stale:
+            self.worker.submit(
+                None,
+                self.storage.get_tasks_by_ids,
+                self.storage.current_user,
+                stale,
+                on_result=self._replace_tasks
+            )
+        else:
+            self.remember_version()
+
+    def _is_cached(self, change):
+        task = self.task_model.find_task(change.task_id) or self.completed_model.find_task(change.task_id)
+        return task is not None and task.updated_at == change.updated_at
+
+    def _replace_tasks(self, tasks):
+        """
+        Заменяет в списках перечитанные задачи.
+        """
+        for task in tasks:
+            self.task_model.remove_tasks([task.id])
+            self.completed_model.remove_tasks([task.id])
+            if task.completed:
+                self.completed_model.insert_task(task)
+            elif not self.searching:
+                self.task_model.insert_task(task)
+        self.remember_version()
+
+    def remember_version(self):
+        """
+        Запоминает текущую версию задач после применения изменений от слушателя.
+        """
+        self.worker.submit(
+            "version",
+            self.storage.tasks_version,
+            self.storage.current_user,
+            on_result=lambda version: setattr(self, "version", version)
+        )
+
+    def _schedule_rows(self, parent, first, last):
+        for row in range(first, last + 1):
+            task = self.task_model.task(row)
+            self.scheduler.schedule(task.id, task.deadline)
+
+    def _unschedule_rows(self, parent, first, last):
+        for row in range(first, last + 1):
+            self.scheduler.unschedule(self.task_model.task(row).id)
+
+    def _schedule_all(self):
+        self.scheduler.clear()
+        if self.task_model.rowCount():
+            self._schedule_rows(None, 0, self.task_model.rowCount() - 1)
 
-        #Заимствованный код.
-        self.storage.delete_task(self.storage.current_user, text)
+    def show_reminder(self, task_id):
+        """
+        Показывает напоминание о приближающемся дедлайне, не блокируя окно.
+
+        :param task_id: Идентификатор задачи.
+        :type task_id: int
+        """
+        task = self.task_model.find_task(task_id)
+        if task is None:
+            return
+
+        box = QMessageBox(QMessageBox.Icon.Information, "Напоминание",
+                          f"Скоро дедлайн: {task.description} ({task.deadline:%d.%m.%Y %H:%M})", parent=self)
+        box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        box.setModal(False)
+        box.show()
+
+    def closeEvent(self, event):
+        """
+        Останавливает слушатель изменений и сохраняет снимок списков при закрытии окна.
+        """
+        #потоки слушателя и архивации фоновые: окно не ждёт текущий опрос или переподключение
+        self.changes.stop(0)
+        if self.archiver is not None:
+            self.archiver.stop(0)
+        self.save_snapshot()
+        QWidget.closeEvent(self, event)
+
+    def show_snapshot(self, snapshot):
+        """
+        Показывает списки из снимка и перечитывает их в фоне.
+
+        :param snapshot: Снимок, сохранённый при прошлом закрытии окна.
+        :type snapshot: app.snapshot.Snapshot
+        """
+        self.version = None
+        self.task_model.set_rows(snapshot.tasks)
+        self.completed_model.set_rows(snapshot.completed)
+        self.task_model.revalidate()
+        self.completed_model.revalidate()
+        self.check_version()
+        self.refresh_stats()
+
+    def save_snapshot(self):
+        """
+        Сохраняет загруженные строки списков в снимок пользователя.
+
+        Во время поиска список текущих задач показывает результаты поиска,
+        поэтому снимок не перезаписывается.
+        """
+        if self.snapshots is None or self.searching:
+            return
+        try:
+            self.snapshots.save(self.storage.current_user, self.task_model.rows(), self.completed_model.rows())
+        except (OSError, ValueError, struct.error):
+            #снимок только ускоряет следующий запуск, ошибка записи не мешает закрыть окно
+            pass
+
+    def _advance_version(self, added, completed, updated_at):
+        """
+        Учитывает в версии кэша собственное изменение, чтобы проверка не вызвала лишнюю перезагрузку.
+        """
+        if self.version is None:
+            return
+        total, done, last = self.version
+        self.version = (total + added, done + completed, max(last or updated_at, updated_at))
+
+    def check_version(self):
+        """
+        Сверяет кэш с базой и перезагружает списки, если задачи изменились в другом месте.
+        """
+        self.worker.submit(
+            "version",
+            self.storage.tasks_version,
+            self.storage.current_user,
+            on_result=self._version_checked
+        )
+
+    def _version_checked(self, version):
+        if self.version is not None and version != self.version:
+            self.reload_lists()
+        self.version = version
+
+    def changeEvent(self, event):
+        """
+        Проверяет актуальность кэша, когда окно снова становится активным.
+        """
+        if event.type() == QEvent.Type.ActivationChange and self.isActiveWindow():
+            self.check_version()
+        QWidget.changeEvent(self, event)
+
+    def reload_lists(self, _=None):
+        """
+        Перезагружает списки текущих и выполненных задач и запоминает версию задач.
+        """
+        self.version = None
+        self.search_cache.invalidate(self.storage.current_user)
         self.load_tasks()
         self.load_completed_tasks()
+        self.check_version()
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        """
+        Загружает статистику задач за выбранное в панели окно.
+
+        Повторные запросы схлопываются: отрисуется только ответ последнего.
+        """
+        self.worker.submit(
+            "stats",
+            self.storage.get_stats,
+            self.storage.current_user,
+            self.stats_panel.period(),
+            on_result=self.stats_panel.show_stats
+        )
+
     def load_tasks(self):
         """
-        Загружает и отображает список текущих задач пользователя.
+        Загружает первую страницу текущих задач пользователя.
+
+        Отменяет незавершённый поиск, чтобы его результат не заменил
+        свежий список задач.
         """
-        self.task_list.clear()
-        tasks = self.storage.get_tasks(self.storage.current_user)
-        for t in tasks:
-            self.task_list.addItem(t)
+        self.search_timer.stop()
+        self.worker.cancel("search")
+        self.searching = False
+        self.task_model.reload()
 
     def load_completed_tasks(self):
         """
-        Загружает и отображает систорию выполненных задач пользователя.
+        Загружает первую страницу истории выполненных задач пользователя.
         """
-        self.completed_list.clear()
-        completed = self.storage.get_completed_tasks(self.storage.current_user)
-        for t in completed:
-            self.completed_list.addItem(t)
+        self.completed_model.reload()
+    def search_text_changed(self, text):
+        """
+        Откладывает поиск до паузы в вводе; пустая строка поиска возвращает список текущих задач.
+        """
+        if text.strip():
+            self.search_timer.start()
+        elif self.searching:
+            self.load_tasks()
+        else:
+            self.search_timer.stop()
+
     def search_tasks(self):
         """
         Выполняет поиск задач по тексту и диапазону дат.
 
         Отображает только те задачи, которые соответствуют
-        введённым критериям поиска.
+        введённым критериям поиска. Повторный или уточнённый запрос
+        берётся из кэша без обращения к хранилищу.
         """
-        text = self.search_input.text().strip()
+        self.search_timer.stop()
+        text = self.search_input.text().strip() or None
+        user = self.storage.current_user
 
         date_from = self.date_from.date().toPyDate()
         date_to = self.date_to.date().toPyDate()
 
-        tasks = self.storage.search_tasks(
-            self.storage.current_user,
-            text if text else None,
+        #новый поиск отменяет предыдущий, результат старого запроса не отрисуется
+        self.searching = True
+        cached = self.search_cache.get(user, text, date_from, date_to)
+        if cached is not None:
+            self.worker.cancel("search")
+            self.task_model.set_rows(cached)
+            return
+
+        generation = self.search_cache.generation
+
+        def found(rows):
+            self.search_cache.put(user, text, date_from, date_to, rows, generation)
+            self.task_model.set_rows(rows)
+
+        self.worker.submit(
+            "search",
+            self.storage.find_task_rows,
+            user,
+            text,
             date_from,
-            date_to
+            date_to,
+            on_result=found
         )
 
-        self.task_list.clear()
-        for t in tasks:
-            self.task_list.addItem(t)
+    def show_error(self, key, err):
+        """
+        Показывает ошибку фонового запроса к хранилищу.
+
+        :param key: Канал запроса.
+        :type key: str | None
+        :param err: Исключение, возникшее при запросе.
+        :type err: Exception
+        """
+        QMessageBox.warning(self, "Ошибка", str(err))
@@ -0,0 +1,72 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QFileDialog
+from PyQt6.QtGui import QFont
+from app.instrumentation import profiler, format_snapshot
+
+
+class ProfilerDialog(QDialog):
+    """
+    Отладочная панель со статистикой запросов к хранилищу.
+
+    Показывает перцентили времени, время в базе и в Python, среднее
+    количество запросов и строк по каждому методу хранилища, а также
+    подозрения на N+1. Снимок можно сохранить в JSON-файл.
+    """
+    def __init__(self, parent=None, instrumentation=None):
+        """
+        Инициализирует панель и показывает текущий снимок статистики.
+
+        :param parent: Родительский виджет.
+        :type parent: QWidget | None
+        :param instrumentation: Сборщик статистики, по умолчанию общий на процесс.
+        :type instrumentation: Instrumentation | None
+        """
+        QDialog.__init__(self, parent)
+        self.instrumentation = instrumentation or profiler
+        self.setWindowTitle("Статистика запросов")
+        self.resize(900, 400)
+
+        self.report = QPlainTextEdit()
+        self.report.setReadOnly(True)
+        self.report.setFont(QFont("monospace"))
+
+        self.refresh_button = QPushButton("Обновить")
+        self.refresh_button.clicked.connect(self.refresh)
+
+        self.reset_button = QPushButton("Сбросить")
+        self.reset_button.clicked.connect(self.reset)
+
+        self.save_button = QPushButton("Сохранить")
+        self.save_button.clicked.connect(self.save)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.refresh_button)
+        buttons.addWidget(self.reset_button)
+        buttons.addWidget(self.save_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.report)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Перерисовывает отчёт по текущему снимку статистики.
+        """
+        self.report.setPlainText(format_snapshot(self.instrumentation.snapshot()))
+
+    def reset(self):
+        """
+        Очищает собранную статистику.
+        """
+        self.instrumentation.reset()
+        self.refresh()
+
+    def save(self):
+        """
+        Сохраняет снимок статистики в выбранный JSON-файл.
+        """
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить статистику", "profile.json", "JSON (*.json)")
+        if path:
+            self.instrumentation.dump(path)
@@ -1,5 +1,8 @@
 from PyQt6.QtWidgets import QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox
-from .storage import Storage, EmptyPasswordError, UserAlreadyExistsError
+from .storage import EmptyUsernameError, EmptyPasswordError, UserAlreadyExistsError
+from .replica import OfflineError
+from .backends import open_storage
+from .background import StorageWorker
 
 
 class RegisterWindow(QWidget):
@@ -8,7 +11,9 @@ class RegisterWindow(QWidget):
     Предоставляет интерфейс для создания аккаунта с логином и паролем.
 
     :ivar storage: Хранилище данных, используемое для регистрации пользователей.
-    :type storage: Storage
+    :type storage: StorageBackend
+    :ivar worker: Фоновый исполнитель запросов к хранилищу.
+    :type worker: StorageWorker
     :ivar label: Текстовая инструкция для пользователя.
     :type label: QLabel
     :ivar username_input: Поле ввода логина.
@@ -18,15 +23,22 @@ class RegisterWindow(QWidget):
     :ivar button: Кнопка для отправки данных регистрации.
     :type button: QPushButton
     """
-    def __init__(self):
+    def __init__(self, storage=None, worker=None):
         """
         Инициализирует окно регистрации и настраивает интерфейс.
         Устанавливает заголовок, размеры окна и создаёт элементы управления.
+
+        :param storage: Хранилище окна входа. Если не передано, создаётся новое
+            на общем движке, без новых соединений и проверки схемы.
+        :type storage: StorageBackend | None
+        :param worker: Фоновый исполнитель окна входа. Если не передан, создаётся свой.
+        :type worker: StorageWorker | None
         """
         QWidget.__init__(self)
         self.setWindowTitle("Регистрация")
         self.resize(250, 200)
-        self.storage = Storage()
+        self.storage = storage or open_storage()
+        self.worker = worker or StorageWorker(self.storage, parent=self)
 
         self.init_ui()
 
@@ -58,32 +70,48 @@ class RegisterWindow(QWidget):
     def register(self):
         """
         Выполняет регистрацию нового пользователя.
-        Проверяет корректность введённых данных, обрабатывает ошибки и уведомляет пользователя о результате.
-
-        :raises EmptyPasswordError: если введён пустой пароль.
-        :raises UserAlreadyExistsError: если пользователь с таким логином уже существует.
+        Хэширование пароля и запрос к базе выполняются в фоне, чтобы окно не
+        зависало; результат обрабатывает :meth:`registered` или :meth:`register_failed`.
         """
         username = self.username_input.text().strip()
         password = self.password_input.text().strip()
 
+        self.button.setEnabled(False)
+        self.worker.submit(
+            "register",
+            self.storage.register_user,
+            username,
+            password,
+            on_result=self.registered,
+            on_error=self.register_failed
+        )
+
+    def registered(self, _=None):
+        """
+        Сообщает об успешной регистрации и закрывает окно.
+        """
+        self.button.setEnabled(True)
+        QMessageBox.information(self, "Успех", "Регистрация прошла успешно!")
+        self.close()
 
+    def register_failed(self, err):
+        """
+        Сообщает об ошибке регистрации.
 
-        try:
-            self.storage.register_user(username, password)
+        :param err: Исключение, возникшее при регистрации.
+        :type err: Exception
+        """
+        self.button.setEnabled(True)
 
-        except EmptyUsernameError as err:
+        if isinstance(err, EmptyUsernameError):
             QMessageBox.warning(self, "Пустой логин", str(err))
-            return
-
-        except EmptyPasswordError as err:
+        elif isinstance(err, EmptyPasswordError):
             QMessageBox.warning(self, "Пустой пароль", str(err))
-            return
-
-        except UserAlreadyExistsError as err:
+        elif isinstance(err, UserAlreadyExistsError):
             QMessageBox.warning(self, "Ошибка регистрации", str(err))
-            return
+        elif isinstance(err, OfflineError):
+            QMessageBox.warning(self, "Нет связи", str(err))
         else:
-            QMessageBox.information(self, "Успех", "Регистрация прошла успешно!")
-            self.close()
+            QMessageBox.warning(self, "Ошибка", str(err))
 
     
\ No newline at end of file
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtCore import pyqtSignal
+from app.stats import format_stats
+
+#окна статистики времени выполнения, которые можно выбрать в панели
+STATS_PERIODS = [
+    ("7 дней", timedelta(days=7)),
+    ("30 дней", timedelta(days=30)),
+    ("Всё время", None),
+]
+
+
+class StatsPanel(QWidget):
+    """
+    Панель статистики задач пользователя в главном окне.
+
+    Показывает количество текущих, просроченных и выполненных задач по
+    категориям и перцентили времени выполнения за выбранное окно. Сама
+    статистику не запрашивает: окно загружает её в фоне
+    (:meth:`app.storage.Storage.get_stats`) и передаёт в :meth:`show_stats`.
+    """
+    #пользователь выбрал другое окно статистики
+    period_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        """
+        :param parent: Родительский виджет.
+        :type parent: QWidget | None
+        """
+        QWidget.__init__(self, parent)
+
+        self.period_box = QComboBox()
+        for title, period in STATS_PERIODS:
+            self.period_box.addItem(title, period)
+        self.period_box.setCurrentIndex(1)
+        self.period_box.currentIndexChanged.connect(self.period_changed)
+
+        self.summary = QLabel("Статистика загружается...")
+        self.summary.setWordWrap(True)
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel("Статистика за:"))
+        header.addWidget(self.period_box)
+        header.addStretch()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(header)
+        layout.addWidget(self.summary)
+        self.setLayout(layout)
+
+    def period(self):
+        """
+        Возвращает выбранное окно статистики.
+
+        :rtype: timedelta | None
+        """
+        return self.period_box.currentData()
+
+    def show_stats(self, stats):
+        """
+        Показывает статистику, которую вернуло хранилище.
+
+        :param stats: Ответ :meth:`app.storage.Storage.get_stats`.
+        :type stats: dict
+        """
+        self.summary.setText("\n".join(format_stats(stats)))
@@ -0,0 +1,206 @@
+"""
+Нагрузочный бенчмарк :class:`app.async_storage.AsyncStorage`.
+
+Сотни симулированных пользователей работают с хранилищем в одном цикле
+событий. Каждый пользователь выполняет ``--requests`` случайных операций
+со своими задачами: чтение списка и истории, добавление, выполнение,
+поиск и статистику. Один и тот же сценарий запускается двумя способами:
+
+- ``sequential`` - пользователи по очереди, в каждый момент выполняется один запрос;
+- ``concurrent`` - все пользователи одновременно (``asyncio.gather``),
+  запросы идут по всем соединениям пула.
+
+Для каждого способа выводятся пропускная способность (операций в секунду),
+перцентили задержки p50/p95/p99 и наибольшее число одновременных запросов.
+
+Пример::
+
+    python -m benchmarks.bench_async --users 300 --requests 20 --pool-size 10
+
+По умолчанию используется временная база SQLite (драйвер aiosqlite). Для
+PostgreSQL (psycopg 3) передайте ``--url <адрес> --reset``.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.async_storage import AsyncStorage
+from app.storage import CATEGORIES, PAGE_SIZE, Storage
+
+from .bench_storage import _reset, percentile
+from .datagen import OBJECTS, PASSWORD, seed
+
+#операции симулированного пользователя и их доли в сценарии
+OPERATIONS = {
+    "list": 0.35,
+    "history": 0.15,
+    "add": 0.15,
+    "complete": 0.1,
+    "search": 0.15,
+    "stats": 0.1,
+}
+
+
+class Load:
+    """
+    Замеры одного запуска сценария.
+
+    :ivar latencies: Время каждой операции в миллисекундах.
+    :type latencies: list[float]
+    :ivar in_flight: Число выполняющихся сейчас операций.
+    :type in_flight: int
+    :ivar peak: Наибольшее число одновременно выполнявшихся операций.
+    :type peak: int
+    """
+    def __init__(self):
+        self.latencies = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def measure(self, call):
+        """
+        Выполняет операцию и записывает её время.
+        """
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return await call
+        finally:
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.in_flight -= 1
+
+
+async def simulate_user(storage, user, requests, rng, load):
+    """
+    Выполняет ``requests`` случайных операций от имени пользователя.
+
+    :param user: Контекст вошедшего пользователя.
+    :type user: app.storage.UserSession
+    """
+    names = list(OPERATIONS)
+    weights = list(OPERATIONS.values())
+    open_ids = []
+
+    for _ in range(requests):
+        operation = rng.choices(names, weights)[0]
+        if operation == "list":
+            rows = await load.measure(storage.get_task_rows(user, limit=PAGE_SIZE))
+            open_ids = [row.id for row in rows]
+        elif operation == "history":
+            await load.measure(storage.get_completed_task_rows(user, limit=PAGE_SIZE))
+        elif operation == "add":
+            row = await load.measure(storage.add_task(user, f"Нагрузка {rng.choice(OBJECTS)}",
+                                                      category=rng.choice(CATEGORIES)))
+            open_ids.append(row.id)
+        elif operation == "complete":
+            if open_ids:
+                await load.measure(storage.complete_tasks(user, [open_ids.pop(rng.randrange(len(open_ids)))]))
+        elif operation == "search":
+            await load.measure(storage.find_task_rows(user, rng.choice(OBJECTS), None, None))
+        elif operation == "stats":
+            await load.measure(storage.get_stats(user))
+
+
+def _report(load, seconds):
+    latencies = sorted(load.latencies)
+    return {
+        "operations": len(latencies),
+        "seconds": round(seconds, 3),
+        "ops_per_s": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "peak_in_flight": load.peak,
+    }
+
+
+async def _run_load(url, usernames, requests, pool_size, seed_value):
+    storage = AsyncStorage(url, pool_size=pool_size, max_overflow=0)
+    try:
+        #вход один раз на пользователя: bcrypt не входит в замеры операций с задачами
+        users = await asyncio.gather(*(storage.check_login(name, PASSWORD) for name in usernames))
+
+        results = {}
+
+        load = Load()
+        started = time.perf_counter()
+        for index, user in enumerate(users):
+            await simulate_user(storage, user, requests, random.Random(seed_value + index), load)
+        results["sequential"] = _report(load, time.perf_counter() - started)
+
+        load = Load()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_user(storage, user, requests, random.Random(seed_value + index), load)
+            for index, user in enumerate(users)
+        ))
+        results["concurrent"] = _report(load, time.perf_counter() - started)
+        return results
+    finally:
+        await storage.close()
+
+
+def run(url, users, tasks_per_user, requests, pool_size=10, reset=False, seed_value=0):
+    """
+    Заполняет базу и запускает сценарий последовательно и одновременно.
+
+    :param url: Адрес базы данных.
+    :type url: str
+    :param users: Количество симулированных пользователей.
+    :type users: int
+    :param tasks_per_user: Задач у каждого пользователя до начала нагрузки.
+    :type tasks_per_user: int
+    :param requests: Операций каждого пользователя.
+    :type requests: int
+    :param pool_size: Размер пула соединений асинхронного хранилища.
+    :type pool_size: int
+    :param reset: Очистить таблицы перед заполнением.
+    :type reset: bool
+    :return: Статистика по способам запуска.
+    :rtype: dict[str, dict]
+    """
+    storage = Storage(url)
+    if reset:
+        _reset(storage)
+    usernames = seed(storage, users, tasks_per_user, seed=seed_value)
+    storage.engine.dispose()
+
+    return asyncio.run(_run_load(url, usernames, requests, pool_size, seed_value))
+
+
+def print_report(results, out=sys.stdout):
+    print(f"{'запуск':<12} {'операций':>9} {'оп/с':>9} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} "
+          f"{'одновременно':>13}", file=out)
+    for name, stats in results.items():
+        print(
+            f"{name:<12} {stats['operations']:>9} {stats['ops_per_s']:>9.1f} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['peak_in_flight']:>13}",
+            file=out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_async")
+    parser.add_argument("--url", default=None, help="адрес базы (по умолчанию - временный файл SQLite)")
+    parser.add_argument("--reset", action="store_true", help="очистить users и tasks перед заполнением")
+    parser.add_argument("--users", type=int, default=300, help="количество симулированных пользователей")
+    parser.add_argument("--tasks", type=int, default=50, help="задач у каждого пользователя")
+    parser.add_argument("--requests", type=int, default=20, help="операций каждого пользователя")
+    parser.add_argument("--pool-size", type=int, default=10, help="соединений в пуле")
+    args = parser.parse_args(argv)
+
+    if args.url and not args.url.startswith("sqlite") and not args.reset:
+        parser.error("для общей базы нужен --reset: бенчмарк очищает таблицы users и tasks")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench_async.db'}"
+        print_report(run(url, args.users, args.tasks, args.requests, args.pool_size, reset=bool(args.url)))
+
+
+if __name__ == "__main__":
+    main()
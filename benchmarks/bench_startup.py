@@ -0,0 +1,138 @@
+"""
+Бенчмарк времени до первой отрисовки главного окна после входа.
+
+Для каждого способа запуска окно создаётся ``--iterations`` раз и измеряется:
+
+- ``first_paint_ms`` - время от создания окна до первой отрисовки списка
+  текущих задач с задачами;
+- ``settled_ms`` - время до завершения всех фоновых запросов, то есть до
+  того, как списки сверены с хранилищем.
+
+Способы запуска:
+
+- ``cold`` - без снимка: списки пусты, пока не придёт первая страница;
+- ``snapshot`` - со снимком :mod:`app.snapshot`: строки снимка видны сразу,
+  а свежие данные применяются в фоне.
+
+Окна создаются без дисплея (``QT_QPA_PLATFORM=offscreen``), поэтому
+«отрисовка» - это отрисовка списка в изображение.
+
+Пример::
+
+    python -m benchmarks.bench_startup --tasks 5000 --iterations 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.snapshot import snapshot_store
+from app.storage import Storage
+
+from .bench_storage import percentile
+from .datagen import PASSWORD, seed
+
+
+def first_paint(window, timeout=30.0):
+    """
+    Обрабатывает события, пока в списке текущих задач не появятся строки, и отрисовывает список.
+
+    :return: False, если строки не появились за ``timeout`` секунд.
+    :rtype: bool
+    """
+    from PyQt6.QtCore import QCoreApplication
+
+    deadline = time.perf_counter() + timeout
+    while not window.task_model.rowCount():
+        if time.perf_counter() > deadline:
+            return False
+        QCoreApplication.processEvents()
+    window.task_list.grab()
+    return True
+
+
+def measure(storage, snapshots, iterations):
+    """
+    Создаёт и закрывает главное окно ``iterations`` раз.
+
+    :return: Перцентили времени до первой отрисовки и до сверки со хранилищем, в миллисекундах.
+    :rtype: dict
+    """
+    from app.ui_main import MainWindow
+
+    paint, settled = [], []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        window = MainWindow(storage, listen=False, snapshots=snapshots)
+        if not first_paint(window):
+            raise RuntimeError("список задач не загрузился")
+        paint.append((time.perf_counter() - started) * 1000)
+        window.worker.wait()
+        settled.append((time.perf_counter() - started) * 1000)
+        window.close()
+        window.deleteLater()
+
+    paint.sort()
+    settled.sort()
+    return {
+        "first_paint_p50_ms": round(percentile(paint, 50), 2),
+        "first_paint_p95_ms": round(percentile(paint, 95), 2),
+        "settled_p50_ms": round(percentile(settled, 50), 2),
+    }
+
+
+def run(url, tasks, iterations, snapshot_dir):
+    """
+    Заполняет базу и измеряет запуск окна без снимка и со снимком.
+
+    :return: Статистика по способам запуска.
+    :rtype: dict[str, dict]
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+
+    storage = Storage(url)
+    username = seed(storage, 1, tasks)[0]
+    storage.check_login(username, PASSWORD)
+    storage.current_user = username
+
+    snapshots = snapshot_store(storage, snapshot_dir)
+    snapshots.clear(username)
+
+    results = {"cold": measure(storage, None, iterations)}
+    #первое окно со снимками сохраняет снимок при закрытии
+    measure(storage, snapshots, 1)
+    results["snapshot"] = measure(storage, snapshots, iterations)
+
+    storage.engine.dispose()
+    app.processEvents()
+    return results
+
+
+def print_report(results, out=sys.stdout):
+    print(f"{'запуск':<10} {'отрисовка p50, мс':>18} {'отрисовка p95, мс':>18} {'сверка p50, мс':>15}", file=out)
+    for name, stats in results.items():
+        print(
+            f"{name:<10} {stats['first_paint_p50_ms']:>18.2f} {stats['first_paint_p95_ms']:>18.2f} "
+            f"{stats['settled_p50_ms']:>15.2f}",
+            file=out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_startup")
+    parser.add_argument("--tasks", type=int, default=5000, help="количество задач пользователя")
+    parser.add_argument("--iterations", type=int, default=20, help="запусков окна каждым способом")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_startup.db'}"
+        print_report(run(url, args.tasks, args.iterations, Path(tmp) / "snapshots"))
+
+
+if __name__ == "__main__":
+    main()
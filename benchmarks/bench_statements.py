@@ -0,0 +1,205 @@
+"""
+Бенчмарк накладных расходов на построение и компиляцию запросов.
+
+Первая страница текущих задач запрашивается несколькими способами на одном соединении:
+
+- ``dbapi`` - тот же SQL с теми же параметрами напрямую через драйвер,
+  без SQLAlchemy: время самой базы и драйвера;
+- ``adhoc_nocache`` - запрос собирается при каждом вызове, кэш компиляции
+  выключен: SQLAlchemy каждый раз компилирует SQL заново;
+- ``adhoc`` - запрос собирается при каждом вызове, SQL берётся из кэша,
+  но дерево запроса и ключ кэша строятся заново (так работали методы до
+  готовых запросов);
+- ``prebuilt`` - готовый запрос :mod:`app.storage` с параметрами.
+
+Для каждого способа выводятся перцентили времени вызова и накладные
+расходы Python - разница среднего времени со способом ``dbapi``. На
+PostgreSQL с драйвером psycopg 3 готовый запрос дополнительно выполняется
+с подготовкой на сервере (``prepared``) и без неё (``unprepared``): разница
+между ними - время разбора и планирования запроса сервером.
+
+Пример::
+
+    python -m benchmarks.bench_statements --tasks 1000 --iterations 2000
+    python -m benchmarks.bench_statements --url postgresql+psycopg://... --reset
+"""
+import argparse
+import gc
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, select
+
+from app.engine import prepare_threshold
+from app.storage import Storage, Task, _open_statement, _row_columns
+
+from .bench_storage import _reset, percentile
+from .datagen import PASSWORD, seed
+
+
+#размер страницы, которую запрашивает бенчмарк
+PAGE = 20
+
+
+def adhoc_page(user_id):
+    """
+    Собирает запрос первой страницы текущих задач заново, как при каждом вызове до готовых запросов.
+
+    :rtype: sqlalchemy.sql.Select
+    """
+    return (
+        select(*_row_columns(datetime.now()))
+        .where(Task.user_id == user_id, Task.completed == False)
+        .order_by(Task.deadline, Task.id)
+        .limit(PAGE)
+    )
+
+
+def prebuilt_page(user_id, nulls_first):
+    """
+    Возвращает готовый запрос первой страницы и его параметры.
+
+    :rtype: tuple[sqlalchemy.sql.Select, dict]
+    """
+    params = {"user_id": user_id, "now": datetime.now(), "limit": PAGE}
+    return _open_statement(True, nulls_first, None, True), params
+
+
+def capture_statement(conn, call):
+    """
+    Выполняет ``call(conn)`` и возвращает SQL и параметры, переданные драйверу.
+
+    :rtype: tuple[str, object]
+    """
+    captured = []
+
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", remember)
+    try:
+        call(conn)
+    finally:
+        event.remove(conn, "before_cursor_execute", remember)
+    return captured[-1]
+
+
+def measure(conn, call, iterations):
+    """
+    Выполняет ``call(conn)`` ``iterations`` раз.
+
+    :return: Перцентили и среднее время вызова в микросекундах.
+    :rtype: dict
+    """
+    #первый вызов заполняет кэши и в замер не входит
+    call(conn)
+
+    #мусор, оставленный предыдущим способом, не должен собираться во время замера
+    gc.collect()
+    gc.disable()
+    timings = []
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call(conn)
+            timings.append((time.perf_counter() - started) * 1e6)
+    finally:
+        gc.enable()
+
+    mean = sum(timings) / iterations
+    timings.sort()
+    return {
+        "p50_us": round(percentile(timings, 50), 1),
+        "p95_us": round(percentile(timings, 95), 1),
+        "mean_us": round(mean, 1),
+    }
+
+
+def run(url, tasks, iterations, reset=False):
+    """
+    Заполняет базу и измеряет все способы выполнения запроса страницы.
+
+    :return: Статистика по именам способов.
+    :rtype: dict[str, dict]
+    """
+    storage = Storage(url)
+    if reset:
+        _reset(storage)
+    username = seed(storage, 1, tasks)[0]
+    user = storage.check_login(username, PASSWORD)
+    user_id = user.user_id
+
+    engine = storage.engine
+    nulls_first = engine.dialect.name == "sqlite"
+
+    def adhoc(conn):
+        conn.execute(adhoc_page(user_id)).all()
+
+    def prebuilt(conn):
+        conn.execute(*prebuilt_page(user_id, nulls_first)).all()
+
+    #запрос перехватывается на отдельном соединении, чтобы слушатель не влиял на замеры
+    with engine.connect() as conn:
+        sql, parameters = capture_statement(conn, prebuilt)
+
+    results = {}
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+
+        def dbapi(conn):
+            cursor.execute(sql, parameters)
+            cursor.fetchall()
+
+        results["dbapi"] = measure(conn, dbapi, iterations)
+        results["prebuilt"] = measure(conn, prebuilt, iterations)
+        results["adhoc"] = measure(conn, adhoc, iterations)
+        results["adhoc_nocache"] = measure(conn.execution_options(compiled_cache=None), adhoc, iterations)
+        cursor.close()
+
+    if engine.url.get_driver_name() == "psycopg":
+        for name, threshold in (("unprepared", "off"), ("prepared", 0)):
+            prepared = create_engine(url, connect_args={"prepare_threshold": prepare_threshold(threshold)})
+            with prepared.connect() as conn:
+                results[name] = measure(conn, prebuilt, iterations)
+            prepared.dispose()
+
+    base = results["dbapi"]["mean_us"]
+    for stats in results.values():
+        stats["overhead_us"] = round(stats["mean_us"] - base, 1)
+
+    engine.dispose()
+    return results
+
+
+def print_report(results, out=sys.stdout):
+    print(f"{'способ':<16} {'p50, мкс':>10} {'p95, мкс':>10} {'среднее, мкс':>13} {'сверх dbapi, мкс':>17}",
+          file=out)
+    for name, stats in results.items():
+        print(
+            f"{name:<16} {stats['p50_us']:>10.1f} {stats['p95_us']:>10.1f} "
+            f"{stats['mean_us']:>13.1f} {stats['overhead_us']:>17.1f}",
+            file=out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_statements")
+    parser.add_argument("--url", default=None, help="адрес базы (по умолчанию - временный файл SQLite)")
+    parser.add_argument("--reset", action="store_true", help="очистить users и tasks перед заполнением")
+    parser.add_argument("--tasks", type=int, default=1000, help="количество задач пользователя")
+    parser.add_argument("--iterations", type=int, default=2000, help="вызовов каждого способа")
+    args = parser.parse_args(argv)
+
+    if args.url and not args.url.startswith("sqlite") and not args.reset:
+        parser.error("для общей базы нужен --reset: бенчмарк очищает таблицы users и tasks")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench_statements.db'}"
+        print_report(run(url, args.tasks, args.iterations, reset=bool(args.url)))
+
+
+if __name__ == "__main__":
+    main()
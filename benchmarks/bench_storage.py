@@ -0,0 +1,359 @@
+"""
+Бенчмарк операций :class:`app.storage.Storage` на синтетических данных.
+
+Для каждого масштаба (количества задач у пользователя) база заполняется
+заново, затем каждая операция вызывается несколько раз. Для операции
+выводятся перцентили времени p50/p95/p99 и количество SQL-запросов на вызов.
+Для операций чтения списков дополнительно измеряется пиковый объём памяти,
+выделяемой за один вызов (объекты ORM против строк :class:`app.storage.TaskRow`).
+
+Примеры::
+
+    python -m benchmarks.bench_storage --scales 100,1000,10000 --out baseline.json
+    python -m benchmarks.bench_storage --scales 100,1000,10000 --compare baseline.json
+
+По умолчанию каждый масштаб запускается на отдельном файле SQLite во
+временной папке. Для PostgreSQL передайте ``--url`` и ``--reset``: таблицы
+``users`` и ``tasks`` будут очищены перед каждым масштабом.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+from app.storage import Storage
+
+from .datagen import OBJECTS, PASSWORD, seed
+
+
+def percentile(values, q):
+    """
+    Возвращает перцентиль по методу ближайшего ранга.
+
+    :param values: Отсортированные значения.
+    :type values: list[float]
+    :param q: Перцентиль от 0 до 100.
+    :type q: float
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class StatementCounter:
+    """
+    Считает SQL-запросы, выполненные через движок.
+    """
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+class Context:
+    """
+    Данные, общие для всех операций одного масштаба.
+
+    :ivar storage: Хранилище с заполненной базой.
+    :type storage: Storage
+    :ivar user: Пользователь, от имени которого выполняются операции с задачами.
+    :type user: str
+    :ivar rng: Генератор случайных чисел.
+    :type rng: random.Random
+    """
+    def __init__(self, storage, user, rng):
+        self.storage = storage
+        self.user = user
+        self.rng = rng
+        self.counter = 0
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}-{self.counter}"
+
+
+def _register_user(ctx):
+    ctx.storage.register_user(ctx.unique("bench"), PASSWORD)
+
+
+def _check_login(ctx):
+    ctx.storage.check_login(ctx.user, PASSWORD)
+
+
+def _add_task(ctx):
+    ctx.storage.add_task(ctx.user, ctx.unique("новая задача"), datetime.now() + timedelta(days=3), "Рабочая")
+
+
+def _get_tasks(ctx):
+    ctx.storage.get_tasks(ctx.user)
+
+
+def _delete_task(ctx):
+    #каждый вызов выполняет свою только что добавленную задачу, поэтому подготовка не входит в замер
+    ctx.storage.delete_task(ctx.user, ctx.pending.pop())
+
+
+def _prepare_delete(ctx, iterations):
+    ctx.pending = [ctx.unique("выполнить") for _ in range(iterations)]
+    for name in ctx.pending:
+        ctx.storage.add_task(ctx.user, name, datetime.now() + timedelta(days=1), "Домашняя")
+
+
+def _get_completed_tasks(ctx):
+    ctx.storage.get_completed_tasks(ctx.user)
+
+
+def _search_tasks(ctx):
+    today = date.today()
+    ctx.storage.search_tasks(ctx.user, ctx.rng.choice(OBJECTS), today - timedelta(days=30), today + timedelta(days=60))
+
+
+def _open_tasks_orm(ctx):
+    ctx.storage.get_tasks_page(ctx.user, None, None)
+
+
+def _open_tasks_rows(ctx):
+    ctx.storage.get_task_rows(ctx.user)
+
+
+def _history_orm(ctx):
+    ctx.storage.get_completed_tasks_page(ctx.user, None, None)
+
+
+def _history_rows(ctx):
+    ctx.storage.get_completed_task_rows(ctx.user)
+
+
+def _find_tasks(ctx):
+    ctx.storage.find_tasks(ctx.user, ctx.rng.choice(OBJECTS), None, None)
+
+
+def _find_task_rows(ctx):
+    ctx.storage.find_task_rows(ctx.user, ctx.rng.choice(OBJECTS), None, None)
+
+
+class Operation:
+    """
+    Измеряемая операция хранилища.
+
+    :ivar name: Имя операции в отчёте.
+    :type name: str
+    :ivar run: Функция ``run(ctx)``, выполняющая один вызов.
+    :type run: callable
+    :ivar prepare: Функция ``prepare(ctx, iterations)``, вызываемая до замеров.
+    :type prepare: callable | None
+    :ivar slow: Операция с bcrypt: выполняется меньшее число раз.
+    :type slow: bool
+    :ivar memory: Измерять пиковый объём памяти за вызов (только для операций чтения).
+    :type memory: bool
+    """
+    def __init__(self, name, run, prepare=None, slow=False, memory=False):
+        self.name = name
+        self.run = run
+        self.prepare = prepare
+        self.slow = slow
+        self.memory = memory
+
+
+OPERATIONS = [
+    Operation("register_user", _register_user, slow=True),
+    Operation("check_login", _check_login, slow=True),
+    Operation("add_task", _add_task),
+    Operation("get_tasks", _get_tasks),
+    Operation("delete_task", _delete_task, prepare=_prepare_delete),
+    Operation("get_completed_tasks", _get_completed_tasks),
+    Operation("search_tasks", _search_tasks),
+    #полные списки: объекты ORM против лёгких строк TaskRow
+    Operation("open_tasks_orm", _open_tasks_orm, memory=True),
+    Operation("open_tasks_rows", _open_tasks_rows, memory=True),
+    Operation("history_orm", _history_orm, memory=True),
+    Operation("history_rows", _history_rows, memory=True),
+    Operation("find_tasks", _find_tasks, memory=True),
+    Operation("find_task_rows", _find_task_rows, memory=True),
+]
+
+
+def measure(ctx, operation, iterations, counter):
+    """
+    Выполняет операцию ``iterations`` раз и возвращает статистику.
+
+    :return: Перцентили времени в миллисекундах и число запросов на вызов.
+    :rtype: dict
+    """
+    if operation.prepare is not None:
+        operation.prepare(ctx, iterations)
+
+    timings = []
+    statements = 0
+    for _ in range(iterations):
+        before = counter.count
+        started = time.perf_counter()
+        operation.run(ctx)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements += counter.count - before
+
+    timings.sort()
+    stats = {
+        "calls": iterations,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "statements": round(statements / iterations, 2),
+    }
+
+    if operation.memory:
+        #отдельный вызов: трассировка памяти замедляет код и исказила бы время
+        tracemalloc.start()
+        operation.run(ctx)
+        stats["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    return stats
+
+
+def _reset(storage):
+    with storage.engine.begin() as conn:
+        if storage.engine.dialect.name == "postgresql":
+            conn.execute(text("TRUNCATE tasks, users RESTART IDENTITY CASCADE"))
+        else:
+            conn.execute(text("DELETE FROM tasks"))
+            conn.execute(text("DELETE FROM users"))
+
+
+def run_scale(url, users, tasks_per_user, completed_ratio, iterations, auth_iterations, reset=False,
+              operations=None):
+    """
+    Заполняет базу и измеряет все операции на одном масштабе.
+
+    :return: Статистика по именам операций.
+    :rtype: dict[str, dict]
+    """
+    storage = Storage(url)
+    if reset:
+        _reset(storage)
+
+    usernames = seed(storage, users, tasks_per_user, completed_ratio)
+    ctx = Context(storage, usernames[0], random.Random(1))
+    counter = StatementCounter(storage.engine)
+
+    #операции с задачами выполняются от имени вошедшего пользователя, как в приложении
+    storage.check_login(ctx.user, PASSWORD)
+
+    results = {}
+    for operation in operations or OPERATIONS:
+        count = auth_iterations if operation.slow else iterations
+        results[operation.name] = measure(ctx, operation, count, counter)
+
+    storage.engine.dispose()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Сравнивает результаты с сохранённым baseline.
+
+    Регрессия - рост p95 больше чем на ``tolerance`` или рост числа запросов на вызов.
+
+    :return: Описания регрессий.
+    :rtype: list[str]
+    """
+    regressions = []
+    for scale, operations in results.items():
+        for name, stats in operations.items():
+            base = baseline.get("results", {}).get(scale, {}).get(name)
+            if base is None:
+                continue
+            if stats["statements"] > base["statements"]:
+                regressions.append(
+                    f"{scale} {name}: запросов на вызов {base['statements']} -> {stats['statements']}"
+                )
+            if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{scale} {name}: p95 {base['p95_ms']:.2f} -> {stats['p95_ms']:.2f} мс"
+                )
+    return regressions
+
+
+def print_report(results, out=sys.stdout):
+    print(
+        f"{'масштаб':>10} {'операция':<24} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'запросов':>9} "
+        f"{'память, КБ':>11}",
+        file=out
+    )
+    for scale, operations in results.items():
+        for name, stats in operations.items():
+            print(
+                f"{scale:>10} {name:<24} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p99_ms']:>9.2f} {stats['statements']:>9} {stats.get('peak_kb', '-'):>11}",
+                file=out
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_storage")
+    parser.add_argument("--url", default=None, help="адрес базы (по умолчанию - временный файл SQLite на масштаб)")
+    parser.add_argument("--reset", action="store_true", help="очищать users и tasks перед каждым масштабом")
+    parser.add_argument("--users", type=int, default=10, help="количество пользователей")
+    parser.add_argument("--scales", default="100,1000,10000", help="количество задач у пользователя через запятую")
+    parser.add_argument("--completed-ratio", type=float, default=0.3, help="доля выполненных задач")
+    parser.add_argument("--iterations", type=int, default=50, help="вызовов каждой операции")
+    parser.add_argument("--auth-iterations", type=int, default=5, help="вызовов register_user и check_login")
+    parser.add_argument("--out", default=None, help="сохранить результаты в JSON")
+    parser.add_argument("--compare", default=None, help="сравнить с сохранённым JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 при сравнении")
+    args = parser.parse_args(argv)
+
+    if args.url and not args.url.startswith("sqlite") and not args.reset:
+        parser.error("для общей базы нужен --reset: бенчмарк очищает таблицы users и tasks")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            url = args.url or f"sqlite:///{Path(tmp) / f'bench_{scale}.db'}"
+            results[str(scale)] = run_scale(
+                url, args.users, scale, args.completed_ratio,
+                args.iterations, args.auth_iterations, reset=bool(args.url)
+            )
+
+    print_report(results)
+
+    if args.out:
+        report = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "url": args.url or "sqlite",
+                "users": args.users,
+                "completed_ratio": args.completed_ratio,
+                "iterations": args.iterations,
+            },
+            "results": results,
+        }
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
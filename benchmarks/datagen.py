@@ -0,0 +1,124 @@
+"""
+Генератор синтетических пользователей и задач для бенчмарков.
+
+Распределения приближены к реальному использованию приложения:
+
+- категории: учебные задачи встречаются чаще хобби;
+- дедлайны: около 10% текущих задач уже просрочены, остальные в основном
+  приходятся на ближайшие две недели с длинным хвостом до полугода;
+- выполненные задачи закрыты в течение нескольких дней после создания.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.passwords import PasswordHasher
+from app.storage import CATEGORIES, Task, User
+
+
+CATEGORY_WEIGHTS = [0.4, 0.3, 0.2, 0.1]
+
+VERBS = ["Сдать", "Подготовить", "Купить", "Позвонить", "Написать", "Проверить", "Прочитать", "Оплатить",
+         "Починить", "Повторить", "Отправить", "Забрать"]
+OBJECTS = ["отчёт", "курсовую", "молоко", "лабораторную", "презентацию", "счёт", "доклад", "конспект",
+           "посылку", "велосипед", "экзамен", "договор", "книгу", "рецепт"]
+DETAILS = ["", "", "до обеда", "для Ивана", "по матанализу", "за квартал", "в библиотеке", "срочно",
+           "по проекту", "в магазине"]
+
+#пароль всех сгенерированных пользователей
+PASSWORD = "bench"
+
+
+def description(rng):
+    """
+    Возвращает правдоподобное описание задачи.
+    """
+    return " ".join(part for part in (rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(DETAILS)) if part)
+
+
+def deadline(rng, now):
+    """
+    Возвращает дедлайн задачи: около 10% в прошлом, остальные с экспоненциальным хвостом в будущее.
+    """
+    if rng.random() < 0.1:
+        return now - timedelta(hours=rng.uniform(1, 24 * 30))
+    return now + timedelta(hours=min(rng.expovariate(1 / (24 * 7)), 24 * 180))
+
+
+def generate_tasks(rng, user_id, count, completed_ratio, now):
+    """
+    Генерирует задачи одного пользователя в формате для ``insert(Task)``.
+
+    :param rng: Генератор случайных чисел.
+    :type rng: random.Random
+    :param user_id: Идентификатор пользователя.
+    :type user_id: int
+    :param count: Количество задач.
+    :type count: int
+    :param completed_ratio: Доля выполненных задач.
+    :type completed_ratio: float
+    :param now: Текущее время.
+    :type now: datetime
+    :return: Словари с полями задач.
+    :rtype: list[dict]
+    """
+    tasks = []
+    for _ in range(count):
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        completed = rng.random() < completed_ratio
+        completed_at = created_at + timedelta(hours=rng.expovariate(1 / 48)) if completed else None
+        tasks.append({
+            "user_id": user_id,
+            "description": description(rng),
+            "category": rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0],
+            "deadline": deadline(rng, now),
+            "completed": completed,
+            "created_at": created_at,
+            "completed_at": min(completed_at, now) if completed else None,
+        })
+    return tasks
+
+
+def seed(storage, users, tasks_per_user, completed_ratio=0.3, seed=0, batch_size=5000):
+    """
+    Заполняет базу пользователями и задачами.
+
+    Все пользователи получают один и тот же хэш пароля :data:`PASSWORD`,
+    поэтому bcrypt вычисляется один раз, а вход работает с настроенной стоимостью хэша
+    (:data:`app.passwords.BCRYPT_ROUNDS`) и не пересчитывает хэш.
+
+    :param storage: Хранилище с пустой базой.
+    :type storage: Storage
+    :param users: Количество пользователей.
+    :type users: int
+    :param tasks_per_user: Количество задач у каждого пользователя.
+    :type tasks_per_user: int
+    :param completed_ratio: Доля выполненных задач.
+    :type completed_ratio: float
+    :param seed: Зерно генератора, чтобы данные повторялись между запусками.
+    :type seed: int
+    :param batch_size: Сколько задач вставлять одним запросом.
+    :type batch_size: int
+    :return: Логины созданных пользователей.
+    :rtype: list[str]
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    password_hash = PasswordHasher(max_workers=0).hash(PASSWORD)
+    usernames = [f"user{i:05d}" for i in range(users)]
+
+    with storage.engine.begin() as conn:
+        conn.execute(insert(User), [{"username": name, "password_hash": password_hash} for name in usernames])
+        ids = dict(conn.execute(select(User.username, User.id).where(User.username.in_(usernames))).all())
+
+        batch = []
+        for name in usernames:
+            batch.extend(generate_tasks(rng, ids[name], tasks_per_user, completed_ratio, now))
+            if len(batch) >= batch_size:
+                conn.execute(insert(Task), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Task), batch)
+
+    return usernames
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+#окна Qt в тестах создаются без дисплея
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+#минимальная стоимость bcrypt и хэширование без пула процессов: тестам не нужна стойкость паролей
+os.environ.setdefault("TASK_MANAGER_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("TASK_MANAGER_HASH_WORKERS", "0")
+
+from app.storage import Storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """
+    Хранилище на временном файле SQLite с зарегистрированным пользователем "никита".
+    """
+    storage = Storage(f"sqlite:///{tmp_path / 'tasks.db'}")
+    storage.register_user("никита", "123")
+    return storage
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """
+    Единственный на все тесты экземпляр QApplication.
+    """
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,105 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import app.storage as storage_module
+from app.archive import Archiver
+from app.cli import main
+from app.storage import TASKS_ARCHIVE, Task
+
+
+def add_history(storage, count, completed_at):
+    ids = [storage.add_task("никита", f"Задача {i}").id for i in range(count)]
+    storage.complete_tasks("никита", ids, completed_at)
+    return ids
+
+
+def archived_ids(storage):
+    with storage.SessionLocal() as session:
+        return set(session.scalars(select(TASKS_ARCHIVE.c.id)))
+
+
+def test_archive_moves_old_tasks_in_batches(storage):
+    old = add_history(storage, 5, datetime(2020, 1, 1))
+    recent = add_history(storage, 2, datetime.now())
+    open_task = storage.add_task("никита", "Текущая")
+    history = storage.get_completed_task_rows("никита")
+    stats = storage.get_stats("никита")
+
+    assert storage.archive_completed("никита", batch_size=2) == 5
+    assert archived_ids(storage) == set(old)
+    with storage.SessionLocal() as session:
+        assert session.scalar(select(Task.id).where(Task.id.in_(old))) is None
+    assert storage.archive_completed("никита") == 0
+
+    #история читает обе таблицы одним списком, статистика не меняется
+    assert storage.get_completed_task_rows("никита") == history
+    page = storage.get_completed_task_rows("никита", None, 3)
+    rest = storage.get_completed_task_rows("никита", (page[-1].completed_at, page[-1].id), 10)
+    assert page + rest == history
+    assert [task.id for task in storage.get_completed_tasks_page("никита", limit=10)] == old + recent
+    assert storage.get_stats("никита") == stats
+    assert len(list(storage.iter_tasks("никита"))) == 8
+    assert [row.id for row in storage.iter_tasks("никита", completed=False)] == [open_task.id]
+
+
+def test_retention_per_user(storage):
+    add_history(storage, 2, datetime.now() - timedelta(days=40))
+    storage.add_task("никита", "Текущая")
+
+    storage.set_retention("никита", 0)
+    assert storage.archive_completed() == 0
+    storage.set_retention("никита", 30)
+    assert storage.archive_completed() == 2
+
+
+def test_global_retention(storage, monkeypatch):
+    monkeypatch.setattr(storage_module, "RETENTION_DAYS", 60)
+    ids = add_history(storage, 2, datetime.now() - timedelta(days=40))
+
+    assert Archiver(storage).run_once() == 0
+    monkeypatch.setattr(storage_module, "RETENTION_DAYS", 30)
+    archiver = Archiver(storage, "никита")
+    assert archiver.run_once() == 1
+    #задача с наибольшим id остаётся в таблице, чтобы её id не достался новой задаче
+    assert archived_ids(storage) == {ids[0]}
+    assert storage.add_task("никита", "Новая").id > ids[-1]
+    assert archiver.run_once() == 1
+    assert archiver.archived == 2
+
+
+def test_cli_archive_and_retention(storage):
+    add_history(storage, 3, datetime.now() - timedelta(days=10))
+    url = str(storage.engine.url)
+
+    out = io.StringIO()
+    assert main(["--url", url, "--user", "никита", "--json", "retention", "7"], out) == 0
+    assert json.loads(out.getvalue()) == {"retention_days": 7}
+
+    out = io.StringIO()
+    assert main(["--url", url, "--json", "archive", "--all-users"], out) == 0
+    assert json.loads(out.getvalue()) == {"archived": 2}
+    assert len(storage.get_completed_tasks("никита")) == 3
+
+
+def test_memory_storage_applies_retention(monkeypatch):
+    from app.memory import MemoryStorage
+
+    monkeypatch.setattr(storage_module, "RETENTION_DAYS", 60)
+    memory = MemoryStorage()
+    memory.register_user("никита", "123")
+    add_history(memory, 2, datetime.now() - timedelta(days=40))
+    add_history(memory, 1, datetime.now() - timedelta(days=90))
+    memory.add_task("никита", "Текущая")
+    history = memory.get_completed_task_rows("никита")
+
+    assert memory.archive_completed() == 1
+    memory.set_retention("никита", 0)
+    assert memory.archive_completed("никита") == 0
+    memory.set_retention("никита", 30)
+    assert memory.archive_completed("никита") == 2
+    assert memory.archive_completed("никита") == 0
+    #задачи в памяти остаются в истории
+    assert memory.get_completed_task_rows("никита") == history
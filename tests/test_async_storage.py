@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.async_storage import AsyncStorage, async_url, sync_url
+from app.storage import UserAlreadyExistsError, UserNotFoundError, WrongPasswordError
+
+
+def run(url, scenario):
+    """
+    Выполняет сценарий с новым асинхронным хранилищем в отдельном цикле событий.
+    """
+    async def main():
+        storage = AsyncStorage(url)
+        try:
+            return await scenario(storage)
+        finally:
+            await storage.close()
+
+    return asyncio.run(main())
+
+
+def test_async_urls():
+    assert str(async_url("sqlite:///tasks.db")) == "sqlite+aiosqlite:///tasks.db"
+    assert str(sync_url("sqlite+aiosqlite:///tasks.db")) == "sqlite:///tasks.db"
+    assert async_url("postgresql+psycopg2://u:p@host/db").drivername == "postgresql+psycopg"
+    with pytest.raises(ValueError):
+        async_url("mysql://u:p@host/db")
+
+
+def test_async_operations_match_storage(storage):
+    url = str(storage.engine.url)
+    soon = datetime.now() + timedelta(days=1)
+
+    async def scenario(async_storage):
+        with pytest.raises(WrongPasswordError):
+            await async_storage.check_login("никита", "неверный")
+        user = await async_storage.check_login("никита", "123")
+
+        report = await async_storage.add_task(user, "Сдать отчёт", soon, "Рабочая")
+        await async_storage.add_task("никита", "Купить молоко", None, "Домашняя")
+        assert await async_storage.complete_tasks(user, [report.id]) == [report.id]
+
+        return (
+            await async_storage.get_task_rows(user),
+            await async_storage.get_completed_task_rows(user),
+            await async_storage.find_task_rows(user, "молоко", None, None),
+            await async_storage.get_stats(user),
+        )
+
+    open_rows, history, found, stats = run(url, scenario)
+
+    #записи асинхронного хранилища видны обычному
+    assert [row.description for row in storage.get_task_rows("никита")] == ["Купить молоко"]
+    assert storage.get_completed_task_rows("никита") == history
+    assert [row.description for row in open_rows] == ["Купить молоко"]
+    assert [row.description for row in found] == ["Купить молоко"]
+    assert stats == storage.get_stats("никита")
+
+
+def test_async_register(storage):
+    async def scenario(async_storage):
+        assert await async_storage.register_user(" оля ", "pass")
+        with pytest.raises(UserAlreadyExistsError):
+            await async_storage.register_user("оля", "pass")
+        with pytest.raises(UserNotFoundError):
+            await async_storage.get_task_rows("нет такого")
+        return await async_storage.check_login("оля", "pass")
+
+    user = run(str(storage.engine.url), scenario)
+
+    assert storage.check_login("оля", "pass").user_id == user.user_id
+
+
+def test_concurrent_users_on_one_loop(storage):
+    storage.register_users([(f"user{i}", "pass") for i in range(50)])
+
+    async def client(async_storage, name):
+        user = await async_storage.check_login(name, "pass")
+        await asyncio.gather(*(async_storage.add_task(user, f"{name} {i}") for i in range(3)))
+        rows = await async_storage.get_task_rows(user)
+        await async_storage.complete_tasks(user, [rows[0].id])
+        return len(await async_storage.get_task_rows(user))
+
+    async def scenario(async_storage):
+        return await asyncio.gather(*(client(async_storage, f"user{i}") for i in range(50)))
+
+    assert run(str(storage.engine.url), scenario) == [2] * 50
+    assert storage.count_tasks("user7") == {"open": 2, "completed": 1, "overdue": 0}
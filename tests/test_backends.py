@@ -0,0 +1,227 @@
+"""
+Общие тесты всех реализаций хранилища.
+
+PostgreSQL проверяется, только если задана переменная TEST_DATABASE_URL.
+"""
+import os
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.backends import MEMORY_URL, open_storage
+from app.memory import MemoryStorage
+from app.storage import (
+    SQLiteStorage,
+    Storage,
+    StorageBackend,
+    TaskRow,
+    UserAlreadyExistsError,
+    UserNotFoundError,
+    UserSession,
+    WrongPasswordError,
+)
+
+
+@pytest.fixture(params=["sqlite", "memory", "postgresql"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteStorage(tmp_path / "tasks.db")
+    if request.param == "memory":
+        return MemoryStorage()
+
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL не задан")
+    return Storage(url)
+
+
+@pytest.fixture
+def user(backend):
+    """
+    Новый пользователь, вошедший в хранилище: на общей базе логины не повторяются.
+    """
+    username = f"user-{uuid.uuid4().hex[:8]}"
+    backend.register_user(username, "123")
+    return backend.check_login(username, "123")
+
+
+def test_backends_share_interface(backend):
+    assert isinstance(backend, StorageBackend)
+
+
+def test_auth_errors(backend, user):
+    with pytest.raises(UserAlreadyExistsError):
+        backend.register_user(user.username, "456")
+    with pytest.raises(WrongPasswordError):
+        backend.check_login(user.username, "456")
+    with pytest.raises(UserNotFoundError):
+        backend.check_login("ghost-" + user.username, "123")
+    with pytest.raises(UserNotFoundError):
+        backend.get_task_rows("ghost-" + user.username)
+
+
+def test_open_tasks_keyset_pages(backend, user):
+    base = datetime(2030, 1, 1)
+    for day in (3, 1, 2):
+        backend.add_task(user, f"Задача {day}", base + timedelta(days=day))
+    backend.add_task(user, "Без дедлайна")
+
+    rows = backend.get_task_rows(user)
+    dated = ["Задача 1", "Задача 2", "Задача 3"]
+    expected = ["Без дедлайна"] + dated if backend.nulls_first else dated + ["Без дедлайна"]
+    assert [row.description for row in rows] == expected
+    assert all(isinstance(row, TaskRow) for row in rows)
+
+    #страницы по два, продолжение после ключа (deadline, id) последней задачи
+    first = backend.get_tasks_page(user, limit=2)
+    second = backend.get_tasks_page(user, after=(first[-1].deadline, first[-1].id), limit=2)
+    assert [task.description for task in first + second] == expected
+    last = backend.get_task_rows(user, after=(second[-1].deadline, second[-1].id), limit=2)
+    assert last == []
+
+
+def test_complete_tasks_moves_to_history(backend, user):
+    first = backend.add_task(user, "Первая")
+    second = backend.add_task(user, "Вторая")
+    done_at = datetime(2030, 1, 1, 12, 0)
+
+    assert sorted(backend.complete_tasks(user, [first.id, second.id, 10 ** 9], done_at)) == [first.id, second.id]
+    #уже выполненная задача повторно не отмечается
+    assert backend.complete_tasks(user, [first.id]) == []
+    assert backend.get_task_rows(user) == []
+
+    history = backend.get_completed_task_rows(user)
+    assert [row.id for row in history] == [first.id, second.id]
+    assert all(row.completed for row in history)
+    page = backend.get_completed_tasks_page(user, after=(history[0].completed_at, history[0].id))
+    assert [task.id for task in page] == [second.id]
+
+    backend.add_task(user, "Третья")
+    backend.delete_task(user, "Третья")
+    #выполнена сейчас, то есть раньше 2030 года
+    assert backend.get_completed_tasks(user) == ["Третья", "Первая", "Вторая"]
+
+
+def test_counts_version_and_lookup(backend, user):
+    past = backend.add_task(user, "Просрочена", datetime(2000, 1, 1))
+    backend.add_task(user, "Впереди", datetime(2100, 1, 1))
+    done = backend.add_task(user, "Готова")
+    before = backend.tasks_version(user)
+
+    backend.complete_tasks(user, [done.id])
+
+    assert backend.count_tasks(user) == {"open": 2, "completed": 1, "overdue": 1}
+    count, completed, _ = backend.tasks_version(user)
+    assert (count, completed) == (3, 1)
+    assert backend.tasks_version(user) != before
+
+    [row] = backend.get_tasks_by_ids(user, [past.id, 10 ** 9])
+    assert (row.description, row.overdue) == ("Просрочена", True)
+    assert backend.get_tasks(user)[0].endswith("ПРОСРОЧЕНО!")
+
+
+def test_stats(backend, user):
+    backend.add_task(user, "Просрочена", datetime(2000, 1, 1), "Рабочая")
+    backend.add_task(user, "Впереди", datetime(2100, 1, 1), "Хобби")
+    done = [backend.add_task(user, f"Готова {i}", None, "Хобби").id for i in range(2)]
+    backend.complete_tasks(user, done, datetime.now() + timedelta(hours=2))
+    backend.add_tasks(user, [{"description": "Давно", "category": "Рабочая",
+                              "completed": True, "completed_at": datetime(2000, 1, 1)}])
+
+    stats = backend.get_stats(user, timedelta(days=30))
+    assert (stats["open"], stats["completed"], stats["overdue"]) == (2, 3, 1)
+    assert stats["categories"] == {"Рабочая": {"open": 1, "completed": 1}, "Хобби": {"open": 1, "completed": 2}}
+    assert stats["completion_rate"] == 0.6
+    #задача, выполненная в 2000 году, не попадает в окно
+    assert stats["period_completed"] == 2
+    assert 3600 < stats["completion_p50"] < 4 * 3600
+    assert backend.get_stats(user)["period_completed"] == 3
+    assert backend.count_tasks(user) == {"open": 2, "completed": 3, "overdue": 1}
+
+
+def test_search_filters_and_limit(backend, user):
+    backend.add_task(user, "Купить молоко", datetime(2030, 1, 10), "Домашняя")
+    backend.add_task(user, "Молоко и хлеб", datetime(2030, 2, 10), "Домашняя")
+    backend.add_task(user, "Сдать отчёт", datetime(2030, 1, 20), "Рабочая")
+    done = backend.add_task(user, "Вернуть молоко", datetime(2030, 1, 5))
+    backend.complete_tasks(user, [done.id])
+
+    found = backend.find_task_rows(user, "молоко", None, None)
+    assert {row.description for row in found} == {"Купить молоко", "Молоко и хлеб"}
+    assert len(backend.find_task_rows(user, "молоко", None, None, limit=1)) == 1
+
+    in_january = backend.search_tasks(user, None, date(2030, 1, 1), date(2030, 1, 31))
+    assert in_january == ["[Домашняя] Купить молоко (до 10.01.2030 00:00)",
+                          "[Рабочая] Сдать отчёт (до 20.01.2030 00:00)"]
+    assert [task.description for task in backend.find_tasks(user, "Рабоч", None, None)] == ["Сдать отчёт"]
+    assert backend.find_task_rows(user, "экзамен", None, None) == []
+
+
+def test_bulk_add_and_export(backend, user):
+    tasks = [
+        {"description": f"Задача {i}", "category": "Учебная", "deadline": None,
+         "completed": i % 2 == 1, "completed_at": datetime(2030, 1, 1) if i % 2 else None}
+        for i in range(5)
+    ]
+
+    assert backend.add_tasks(user, iter(tasks), batch_size=2) == 5
+
+    exported = list(backend.iter_tasks(user))
+    assert [row.description for row in exported] == [task["description"] for task in tasks]
+    assert [row.id for row in exported] == sorted(row.id for row in exported)
+    assert len(list(backend.iter_tasks(user, completed=True))) == 2
+    assert backend.count_tasks(user)["open"] == 3
+
+
+def test_users_are_isolated(backend, user):
+    other = f"other-{uuid.uuid4().hex[:8]}"
+    backend.register_user(other, "123")
+    task = backend.add_task(other, "Чужая")
+
+    assert backend.get_task_rows(user) == []
+    assert backend.complete_tasks(user, [task.id]) == []
+    assert backend.get_tasks_by_ids(user, [task.id]) == []
+    assert backend.get_tasks(UserSession(user.user_id, user.username)) == []
+
+
+def test_memory_listener_receives_changes():
+    storage = MemoryStorage()
+    storage.register_user("никита", "123")
+    received = []
+    listener = storage.listen_changes("никита", received.extend)
+
+    task = storage.add_task("никита", "Задача")
+    storage.complete_tasks("никита", [task.id])
+    listener.stop()
+    storage.add_task("никита", "После остановки")
+
+    assert [(change.task_id, change.op) for change in received] == [(task.id, "INSERT"), (task.id, "UPDATE")]
+
+
+def test_open_storage_picks_backend(tmp_path):
+    assert isinstance(open_storage(MEMORY_URL), MemoryStorage)
+
+    embedded = open_storage(f"sqlite:///{tmp_path / 'data' / 'tasks.db'}")
+    assert isinstance(embedded, SQLiteStorage)
+    assert (tmp_path / "data" / "tasks.db").exists()
+    with embedded.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+
+    assert type(open_storage("sqlite://")) is Storage
+
+
+def test_register_users(backend):
+    prefix = f"bulk-{uuid.uuid4().hex[:8]}"
+    users = [(f"{prefix}-{number} ", f"пароль{number}") for number in range(3)]
+
+    assert backend.register_users(users) == 3
+    assert backend.check_login(f"{prefix}-2", "пароль2").username == f"{prefix}-2"
+    with pytest.raises(UserAlreadyExistsError):
+        backend.register_users([(f"{prefix}-new", "1"), (f"{prefix}-0", "1")])
+    with pytest.raises(UserAlreadyExistsError):
+        backend.register_users([(f"{prefix}-twice", "1"), (f"{prefix}-twice", "2")])
+    #при ошибке список не регистрируется частично
+    with pytest.raises(UserNotFoundError):
+        backend.check_login(f"{prefix}-new", "1")
@@ -0,0 +1,47 @@
+import threading
+
+from app.background import StorageWorker
+
+
+def test_newer_job_drops_older_result(qapp):
+    worker = StorageWorker(storage=None, max_threads=1)
+    release = threading.Event()
+    results = []
+
+    worker.submit("search", lambda: release.wait(5) and "первый", on_result=results.append)
+    worker.submit("search", lambda: "второй", on_result=results.append)
+    worker.submit("search", lambda: "третий", on_result=results.append)
+    release.set()
+    worker.wait()
+
+    assert results == ["третий"]
+
+
+def test_mutations_are_never_cancelled(qapp):
+    worker = StorageWorker(storage=None, max_threads=1)
+    results = []
+
+    for i in range(3):
+        worker.submit(None, lambda i=i: i, on_result=results.append)
+    worker.wait()
+
+    assert results == [0, 1, 2]
+
+
+def test_error_is_delivered_to_interface_thread(qapp):
+    worker = StorageWorker(storage=None)
+    errors = []
+    threads = []
+
+    def fail():
+        raise ValueError("нет связи с базой")
+
+    def on_error(err):
+        errors.append(str(err))
+        threads.append(threading.current_thread())
+
+    worker.submit("tasks", fail, on_error=on_error)
+    worker.wait()
+
+    assert errors == ["нет связи с базой"]
+    assert threads == [threading.main_thread()]
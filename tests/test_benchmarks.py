@@ -0,0 +1,62 @@
+from benchmarks.bench_statements import run
+from benchmarks.bench_storage import compare, percentile, run_scale
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+
+def test_run_scale_reports_every_operation(tmp_path):
+    results = run_scale(f"sqlite:///{tmp_path / 'bench.db'}", users=3, tasks_per_user=50,
+                        completed_ratio=0.3, iterations=3, auth_iterations=1)
+
+    assert set(results) == {"register_user", "check_login", "add_task", "get_tasks", "delete_task",
+                            "get_completed_tasks", "search_tasks", "open_tasks_orm", "open_tasks_rows",
+                            "history_orm", "history_rows", "find_tasks", "find_task_rows"}
+    #после входа операции с задачами не ищут пользователя по логину
+    for name in ("add_task", "get_tasks", "delete_task", "get_completed_tasks", "search_tasks"):
+        assert results[name]["statements"] == 1
+    #строки TaskRow занимают меньше памяти, чем объекты ORM
+    assert results["open_tasks_rows"]["peak_kb"] < results["open_tasks_orm"]["peak_kb"]
+
+
+def test_compare_flags_regressions():
+    stats = {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "statements": 1}
+    baseline = {"results": {"100": {"get_tasks": stats}}}
+
+    assert compare({"100": {"get_tasks": dict(stats, p95_ms=2.3)}}, baseline, 0.2) == []
+    assert len(compare({"100": {"get_tasks": dict(stats, p95_ms=3.0, statements=2)}}, baseline, 0.2)) == 2
+
+
+def test_prebuilt_statements_cut_python_overhead(tmp_path):
+    results = run(f"sqlite:///{tmp_path / 'bench.db'}", tasks=50, iterations=50)
+
+    assert set(results) == {"dbapi", "prebuilt", "adhoc", "adhoc_nocache"}
+    assert results["prebuilt"]["overhead_us"] < results["adhoc_nocache"]["overhead_us"]
+
+
+def test_snapshot_paints_before_first_query(qapp, tmp_path):
+    from benchmarks.bench_startup import run as run_startup
+
+    results = run_startup(f"sqlite:///{tmp_path / 'bench.db'}", tasks=300, iterations=5,
+                          snapshot_dir=tmp_path / "snapshots")
+
+    assert set(results) == {"cold", "snapshot"}
+    assert results["snapshot"]["first_paint_p50_ms"] < results["cold"]["first_paint_p50_ms"]
+
+
+def test_async_load_runs_users_concurrently(tmp_path):
+    from benchmarks.bench_async import run as run_async
+
+    results = run_async(f"sqlite:///{tmp_path / 'bench.db'}", users=100, tasks_per_user=10, requests=5,
+                        pool_size=5)
+
+    assert set(results) == {"sequential", "concurrent"}
+    assert results["sequential"]["operations"] > 0 and results["concurrent"]["operations"] > 0
+    assert results["sequential"]["peak_in_flight"] == 1
+    #все пользователи ждут ответа одновременно в одном цикле событий
+    assert results["concurrent"]["peak_in_flight"] == 100
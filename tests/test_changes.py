@@ -0,0 +1,120 @@
+import queue
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.changes import NotifyListener, TaskChange
+
+
+def test_polling_listener_reports_own_user_changes(storage):
+    storage.register_user("гость", "123")
+    received = queue.Queue()
+    listener = storage.listen_changes("никита", received.put, interval=0.02)
+    try:
+        task = storage.add_task("никита", "Своя", None, "Учебная")
+        storage.add_task("гость", "Чужая", None, "Учебная")
+        storage.complete_tasks("никита", [task.id])
+
+        changes = []
+        while len(changes) < 2:
+            changes.extend(received.get(timeout=5))
+    finally:
+        listener.stop()
+
+    assert [(c.task_id, c.op) for c in changes] == [(task.id, "INSERT"), (task.id, "UPDATE")]
+    assert changes[0].updated_at == task.updated_at
+
+
+def test_polling_listener_starts_without_queries_on_caller_thread(storage):
+    user = storage.check_login("никита", "123")
+    threads = []
+
+    def record(*_):
+        threads.append(threading.current_thread())
+
+    received = queue.Queue()
+    event.listen(storage.engine, "before_cursor_execute", record)
+    listener = storage.listen_changes(user, received.put, interval=0.02)
+    try:
+        #журнал читается и чистится в потоке слушателя, окно при запуске не ждёт базу
+        assert threading.current_thread() not in threads
+        task = storage.add_task(user, "Сразу после запуска", None, "Учебная")
+        assert [change.task_id for change in received.get(timeout=5)] == [task.id]
+    finally:
+        listener.stop(timeout=5)
+        event.remove(storage.engine, "before_cursor_execute", record)
+
+
+def test_notify_listener_does_not_retry_programming_errors():
+    class DriverError(Exception):
+        pass
+
+    class Connection:
+        driver_connection = type("Driver", (), {"cursor": lambda self: Cursor()})()
+        detach = close = lambda self: None
+
+    class Cursor:
+        execute = close = lambda self, *args: None
+
+    engine = type("Engine", (), {})()
+    engine.dialect = type("Dialect", (), {"loaded_dbapi": type("dbapi", (), {"Error": DriverError})})()
+    engine.raw_connection = Connection
+    attempts = []
+
+    def listen(dbapi):
+        attempts.append(dbapi)
+        if len(attempts) == 1:
+            raise DriverError("server closed the connection")
+        raise TypeError("notifies() got an unexpected keyword argument 'timeout'")
+
+    listener = NotifyListener(engine, 1)
+    listener._listen = listen
+    listener._stop.wait = lambda timeout=None: False
+    #обрыв связи ведёт к переподключению, ошибка программы не скрывается повторными попытками
+    with pytest.raises(TypeError):
+        listener._run()
+    assert len(attempts) == 2
+
+
+def test_notification_payload_parsed():
+    change = TaskChange.from_json(
+        '{"user_id": 1, "task_id": 7, "op": "UPDATE", "updated_at": "2030-01-01T10:00:00.5"}'
+    )
+    assert (change.user_id, change.task_id, change.op) == (1, 7, "UPDATE")
+    assert change.updated_at == datetime(2030, 1, 1, 10, 0, 0, 500000)
+
+
+def test_main_window_applies_row_deltas(qapp, storage):
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    own = storage.add_task("никита", "своя", datetime.now() + timedelta(days=2))
+    window = MainWindow(storage, listen=False)
+    window.worker.wait()
+
+    fetched = []
+    window.worker.finished.connect(lambda key, result: fetched.append(result))
+
+    #своя задача уже в кэше, перечитывать её не нужно
+    window.apply_changes([TaskChange(1, own.id, "INSERT", own.updated_at)])
+    window.worker.wait()
+    assert not any(isinstance(result, list) for result in fetched)
+
+    other = storage.add_task("никита", "с другого компьютера", datetime.now() + timedelta(days=1))
+    window.apply_changes([TaskChange(1, other.id, "INSERT", other.updated_at)])
+    window.worker.wait()
+    window.worker.wait()
+    assert window.task_model.task(0).id == other.id
+
+    storage.complete_tasks("никита", [other.id])
+    window.apply_changes([TaskChange(1, other.id, "UPDATE")])
+    window.worker.wait()
+    window.worker.wait()
+    assert window.task_model.rowCount() == 1
+    assert window.completed_model.task(0).id == other.id
+
+    window.apply_changes([TaskChange(1, other.id, "DELETE")])
+    assert window.completed_model.rowCount() == 0
+    assert window.version == storage.tasks_version("никита")
@@ -0,0 +1,67 @@
+import io
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app.cli import main
+
+ROOT = Path(__file__).resolve().parents[1]
+#бюджет холодного старта: интерпретатор + разбор аргументов, без Qt и SQLAlchemy
+COLD_START_BUDGET = 1.0
+
+
+def run(storage, *argv):
+    out = io.StringIO()
+    code = main(["--url", str(storage.engine.url), "--user", "никита", "--json", *argv], out)
+    return code, out.getvalue()
+
+
+def test_cli_does_not_import_qt_or_storage():
+    code = "import sys, app.cli; print(sorted(m for m in ('PyQt6', 'sqlalchemy', 'bcrypt') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_cold_start_time():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.cli", "--help"], cwd=ROOT, capture_output=True, check=True)
+    elapsed = time.perf_counter() - started
+
+    print(f"холодный старт python -m app.cli --help: {elapsed * 1000:.0f} мс")
+    assert elapsed < COLD_START_BUDGET
+
+
+def test_cli_add_list_complete_search_stats(storage):
+    assert run(storage, "add", "Сдать отчёт", "--category", "Рабочая", "--deadline", "2030-05-01T10:00")[0] == 0
+    assert run(storage, "add", "Купить молоко", "--category", "Домашняя")[0] == 0
+
+    tasks = json.loads(run(storage, "list")[1])
+    assert [t["description"] for t in tasks] == ["Купить молоко", "Сдать отчёт"]
+
+    found = json.loads(run(storage, "search", "отчёт")[1])
+    assert [t["id"] for t in found] == [tasks[1]["id"]]
+
+    assert json.loads(run(storage, "complete", str(tasks[0]["id"]))[1]) == {"completed": [tasks[0]["id"]]}
+    assert [t["description"] for t in json.loads(run(storage, "list", "--completed")[1])] == ["Купить молоко"]
+
+    assert json.loads(run(storage, "stats")[1]) == {"open": 1, "completed": 1, "overdue": 0}
+
+
+def test_cli_import_export(storage, tmp_path):
+    source = tmp_path / "tasks.jsonl"
+    source.write_text('{"description": "Тренировка", "category": "Хобби"}\n', encoding="utf-8")
+
+    assert json.loads(run(storage, "import", str(source))[1]) == {"imported": 1, "skipped": 0}
+
+    target = tmp_path / "export.csv"
+    assert run(storage, "export", str(target))[0] == 0
+    assert "Тренировка,Хобби" in target.read_text(encoding="utf-8")
+
+
+def test_cli_unknown_user(storage, capsys):
+    out = io.StringIO()
+    assert main(["--url", str(storage.engine.url), "--user", "гость", "stats"], out) == 1
+    assert "гость" in capsys.readouterr().err
@@ -0,0 +1,39 @@
+from sqlalchemy import event
+
+from app.engine import get_engine, prepare_threshold
+from app.storage import Storage
+
+
+def test_storages_share_engine_and_skip_schema_check(tmp_path):
+    url = f"sqlite:///{tmp_path / 'tasks.db'}"
+    first = Storage(url)
+    statements = []
+    connections = []
+
+    event.listen(first.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    event.listen(first.engine, "connect", lambda *args: connections.append(1))
+
+    second = Storage(url)
+
+    assert second.engine is first.engine is get_engine(url)
+    assert statements == []
+    assert connections == []
+
+
+def test_register_window_reuses_login_storage(qapp, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.storage.DATABASE_URL", f"sqlite:///{tmp_path / 'tasks.db'}")
+    from app.ui_login import LoginWindow
+
+    window = LoginWindow()
+    window.open_register()
+
+    assert window.reg_window.storage is window.storage
+
+
+def test_prepare_threshold_parsing():
+    assert prepare_threshold("5") == 5
+    assert prepare_threshold(0) == 0
+    #PgBouncer в режиме transaction: подготовленные запросы выключены
+    assert prepare_threshold("off") is None
+    assert prepare_threshold(None) is None
@@ -0,0 +1,100 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.instrumentation import Instrumentation, format_snapshot, profiler
+
+
+@pytest.fixture
+def enabled_profiler():
+    profiler.reset()
+    profiler.enable()
+    yield profiler
+    profiler.disable()
+    profiler.reset()
+
+
+def test_disabled_profiler_records_nothing(storage):
+    storage.add_task("никита", "Задача", None, "Учебная")
+    storage.get_tasks("никита")
+
+    assert profiler.snapshot()["methods"] == {}
+
+
+def test_storage_methods_are_measured(storage, enabled_profiler):
+    deadline = datetime.now() + timedelta(days=1)
+    for i in range(3):
+        storage.add_task("никита", f"Задача {i}", deadline, "Учебная")
+    storage.get_tasks("никита")
+    #вложенный find_tasks учитывается в search_tasks
+    storage.search_tasks("никита", "Задача", None, None)
+
+    methods = enabled_profiler.snapshot()["methods"]
+    assert set(methods) == {"add_task", "get_tasks", "search_tasks"}
+
+    add = methods["add_task"]
+    assert add["calls"] == 3
+    assert add["statements_mean"] >= 1
+    assert add["p50_ms"] <= add["p95_ms"] <= add["p99_ms"]
+    assert sum(add["histogram"].values()) == 3
+
+    assert methods["get_tasks"]["rows_mean"] == 3
+    assert methods["search_tasks"]["rows_mean"] == 3
+
+
+def test_repeated_statement_flagged_as_n_plus_one(storage):
+    instrumentation = Instrumentation(n_plus_one=3)
+
+    @instrumentation.wrap
+    def load_each(ids):
+        with storage.engine.connect() as conn:
+            return [conn.execute(text("SELECT description FROM tasks WHERE id = :id"), {"id": i}).all() for i in ids]
+
+    instrumentation.enable()
+    try:
+        load_each([1, 2])
+        load_each([1, 2, 3, 4])
+    finally:
+        instrumentation.disable()
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot["methods"]["load_each"]["calls"] == 2
+    assert snapshot["n_plus_one"] == [
+        {"method": "load_each", "statement": "SELECT description FROM tasks WHERE id = ?", "count": 4}
+    ]
+    assert "Возможный N+1" in format_snapshot(snapshot)
+
+
+def test_snapshot_dumped_to_json(storage, enabled_profiler, tmp_path):
+    storage.count_tasks("никита")
+
+    path = tmp_path / "profile.json"
+    enabled_profiler.dump(str(path))
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["enabled"] is True
+    assert data["methods"]["count_tasks"]["calls"] == 1
+
+
+def test_profiler_dialog_shows_report(qapp, storage, enabled_profiler):
+    from app.ui_profiler import ProfilerDialog
+
+    storage.count_tasks("никита")
+    dialog = ProfilerDialog()
+    assert "count_tasks" in dialog.report.toPlainText()
+
+    dialog.reset()
+    assert "count_tasks" not in dialog.report.toPlainText()
+
+
+def test_failed_statement_does_not_leave_start_time(storage, enabled_profiler):
+    measured = enabled_profiler.wrap(lambda conn: conn.execute(text("SELECT * FROM no_such_table")))
+
+    with storage.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                measured(conn)
+        assert conn.info.get("instrumentation_started") == []
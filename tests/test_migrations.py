@@ -0,0 +1,129 @@
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrations import SCHEMA_VERSION, check_plans, current_version, migrate
+from app.storage import Base, Storage
+#миграции проверяются на файле SQLite во временной папке
+
+
+def test_migrate_sets_version_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+
+    assert migrate(engine, Base.metadata) == SCHEMA_VERSION
+    #повторный запуск ничего не ломает
+    assert migrate(engine, Base.metadata) == SCHEMA_VERSION
+
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("tasks")}
+    assert {"ix_tasks_open_user_deadline", "ix_tasks_done_user_completed_at"} <= indexes
+
+
+def test_migrate_existing_database_without_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (username, password_hash) VALUES ('old', 'x')"))
+
+    migrate(engine, Base.metadata)
+
+    with engine.connect() as conn:
+        assert current_version(conn) == SCHEMA_VERSION
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 1
+
+
+def test_storage_queries_do_not_scan_tasks(tmp_path):
+    storage = Storage(f"sqlite:///{tmp_path / 'tasks.db'}")
+    storage.register_user("никита", "123")
+    storage.add_task("никита", "Купить молоко", datetime.now() + timedelta(days=1))
+
+    out = io.StringIO()
+    assert check_plans(storage, "никита", out) == 0
+    assert "ix_tasks_open_user_deadline" in out.getvalue()
+    assert "ix_tasks_done_user_completed_at" in out.getvalue()
+    #проверка планов не меняет данные
+    assert len(storage.get_tasks("никита")) == 1
+    assert storage.get_completed_tasks("никита") == []
+
+
+def test_updated_at_added_to_existing_tasks(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    migrate(engine, Base.metadata, target=3)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (username, password_hash) VALUES ('old', 'x')"))
+        conn.execute(text(
+            "INSERT INTO tasks (user_id, description, category, created_at) "
+            "VALUES (1, 'старая', 'Учебная', '2024-01-01 10:00:00')"
+        ))
+
+    migrate(engine, Base.metadata)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT updated_at FROM tasks")).scalar() == "2024-01-01 10:00:00"
+    assert "ix_tasks_user_version" in {ix["name"] for ix in inspect(engine).get_indexes("tasks")}
+
+
+def test_sync_columns_added_to_existing_tasks(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    migrate(engine, Base.metadata, target=5)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (username, password_hash) VALUES ('old', 'x')"))
+        for description in ("первая", "вторая"):
+            conn.execute(text(
+                "INSERT INTO tasks (user_id, description, category) VALUES (1, :description, 'Учебная')"
+            ), {"description": description})
+
+    migrate(engine, Base.metadata)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT uid, version FROM tasks")).all()
+    assert len({uid for uid, _ in rows}) == 2
+    assert all(uid and len(uid) == 32 for uid, _ in rows)
+    assert [version for _, version in rows] == [1, 1]
+    assert "ux_tasks_uid" in {ix["name"] for ix in inspect(engine).get_indexes("tasks")}
+
+
+def test_upgrade_database_created_before_migrations(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    #схема, которую создавала первая версия приложения через create_all, без schema_version
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR(150) NOT NULL, "
+            "password_hash VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (username))"
+        ))
+        conn.execute(text(
+            "CREATE TABLE tasks (id INTEGER NOT NULL, user_id INTEGER, description VARCHAR NOT NULL, "
+            "completed BOOLEAN, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, completed_at DATETIME, "
+            "deadline DATETIME, category VARCHAR(50) NOT NULL, PRIMARY KEY (id), "
+            "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE)"
+        ))
+        conn.execute(text("INSERT INTO users (username, password_hash) VALUES ('old', 'x')"))
+        conn.execute(text(
+            "INSERT INTO tasks (user_id, description, completed, category, created_at) "
+            "VALUES (1, 'Купить молоко', 0, 'Домашняя', '2024-01-01 10:00:00')"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (user_id, description, completed, category, created_at, completed_at) "
+            "VALUES (1, 'Сдать отчёт', 1, 'Рабочая', '2024-01-01 10:00:00', '2024-01-02 10:00:00')"
+        ))
+
+    assert migrate(engine, Base.metadata) == SCHEMA_VERSION
+
+    tables = inspect(engine).get_table_names()
+    assert {"tasks_archive", "task_stats", "task_completion_stats", "schema_version"} <= set(tables)
+    tasks = {column["name"] for column in inspect(engine).get_columns("tasks")}
+    assert {"updated_at", "uid", "version"} <= tasks
+    assert "retention_days" in {column["name"] for column in inspect(engine).get_columns("users")}
+    #новая база проходит те же миграции и получает ту же схему
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrate(fresh, Base.metadata)
+    for table in ("users", "tasks", "tasks_archive"):
+        assert ({column["name"] for column in inspect(engine).get_columns(table)}
+                == {column["name"] for column in inspect(fresh).get_columns(table)})
+
+    storage = Storage(f"sqlite:///{tmp_path / 'tasks.db'}")
+    assert storage.count_tasks("old") == {"open": 1, "completed": 1, "overdue": 0}
+    assert [row.description for row in storage.find_task_rows("old", "молоко", None, None)] == ["Купить молоко"]
+    assert storage.get_completed_tasks("old") == ["Сдать отчёт"]
+    storage.add_task("old", "Новая")
+    assert storage.count_tasks("old")["open"] == 2
@@ -0,0 +1,52 @@
+import pytest
+
+from app.memory import MemoryStorage
+from app.passwords import PasswordHasher, hash_rounds
+from app.storage import SQLiteStorage
+
+
+def test_hasher_pool():
+    hasher = PasswordHasher(rounds=4, max_workers=2)
+    try:
+        hashes = hasher.hash_many(["первый", "второй", "третий"])
+        assert [hash_rounds(password_hash) for password_hash in hashes] == [4, 4, 4]
+        assert hasher.check("второй", hashes[1])
+        assert not hasher.check("второй", hashes[0])
+        assert hasher.check("пароль", hasher.hash("пароль"))
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher(rounds=5, max_workers=0)
+    assert hasher.needs_rehash(PasswordHasher(rounds=4, max_workers=0).hash("123"))
+    assert not hasher.needs_rehash(hasher.hash("123"))
+    assert hash_rounds("не хэш") is None
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path, hasher: SQLiteStorage(tmp_path / "tasks.db", hasher=hasher),
+    lambda tmp_path, hasher: MemoryStorage(hasher=hasher),
+])
+def test_login_rehashes_with_new_cost(tmp_path, make):
+    storage = make(tmp_path, PasswordHasher(rounds=4, max_workers=0))
+    storage.register_user("никита", "123")
+
+    #стоимость подняли: старый хэш принимается и пересчитывается при входе
+    storage.hasher = PasswordHasher(rounds=5, max_workers=0)
+    calls = []
+    hash_password = storage.hasher.hash
+    storage.hasher.hash = lambda password: calls.append(password) or hash_password(password)
+
+    storage.check_login("никита", "123")
+    storage.check_login("никита", "123")
+    assert calls == ["123"]
+
+
+def test_hash_many_without_processes():
+    hasher = PasswordHasher(rounds=4, max_workers=0)
+    hashes = hasher.hash_many(["первый", "второй", "третий"])
+
+    assert hasher._executor is None
+    assert [hasher.check(password, password_hash)
+            for password, password_hash in zip(["первый", "второй", "третий"], hashes)] == [True] * 3
@@ -0,0 +1,176 @@
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.replica import OfflineError, ReplicaStorage
+from app.storage import Storage
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """
+    Основная база: отдельный файл SQLite с пользователем "никита".
+    """
+    remote = Storage(f"sqlite:///{tmp_path / 'remote.db'}")
+    remote.register_user("никита", "123")
+    return remote
+
+
+@pytest.fixture
+def replica(tmp_path, remote):
+    replica = ReplicaStorage(tmp_path / "replica.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=None)
+    replica.check_login("никита", "123")
+    return replica
+
+
+def test_writes_are_queued_and_pushed(replica, remote):
+    task = replica.add_task("никита", "Купить молоко", datetime(2030, 1, 1), "Домашняя")
+    other = replica.add_task("никита", "Сдать отчёт")
+    replica.complete_tasks("никита", [other.id], datetime(2030, 1, 2))
+
+    #реплика отвечает сразу, основная база ещё ничего не знает
+    assert [row.description for row in replica.get_task_rows("никита")] == ["Купить молоко"]
+    assert replica.pending("никита") == 3
+    assert remote.get_task_rows("никита") == []
+
+    result = replica.sync("никита")
+
+    assert (result.pushed, result.conflicts) == (3, 0)
+    assert replica.pending("никита") == 0
+    [pushed] = remote.get_task_rows("никита")
+    assert (pushed.description, pushed.category, pushed.deadline) == ("Купить молоко", "Домашняя", task.deadline)
+    assert remote.get_completed_tasks("никита") == ["Сдать отчёт"]
+    #повторная синхронизация ничего не отправляет и не загружает
+    again = replica.sync("никита")
+    assert (again.pushed, again.pulled, again.removed) == (0, 0, 0)
+
+
+def test_remote_changes_are_pulled(replica, remote):
+    replica.add_task("никита", "Своя задача")
+    replica.sync("никита")
+
+    remote.add_task("никита", "С другого компьютера")
+    own = next(row for row in remote.get_task_rows("никита") if row.description == "Своя задача")
+    remote.complete_tasks("никита", [own.id])
+
+    result = replica.sync("никита")
+
+    assert result.pulled == 2
+    assert replica.get_tasks("никита") == ["[Учебная] С другого компьютера"]
+    assert replica.get_completed_tasks("никита") == ["Своя задача"]
+
+
+def test_completion_conflict_keeps_remote_state(replica, remote):
+    task = replica.add_task("никита", "Общая задача")
+    replica.sync("никита")
+    remote_id = remote.get_task_rows("никита")[0].id
+
+    #задачу выполнили и на другом клиенте, и в реплике без связи
+    remote.complete_tasks("никита", [remote_id], datetime(2030, 1, 1, 9, 0))
+    replica.complete_tasks("никита", [task.id], datetime(2030, 1, 1, 18, 0))
+
+    result = replica.sync("никита")
+
+    assert result.conflicts == 1
+    [local] = replica.get_completed_task_rows("никита")
+    [server] = remote.get_completed_task_rows("никита")
+    assert local.completed_at.replace(tzinfo=None) == server.completed_at.replace(tzinfo=None) == datetime(2030, 1, 1, 9, 0)
+    assert len(remote.get_completed_tasks("никита")) == 1
+
+
+def test_works_offline_and_catches_up(tmp_path, remote):
+    url = f"sqlite:///{tmp_path / 'remote.db'}"
+    ReplicaStorage(tmp_path / "replica.db", url, interval=None).check_login("никита", "123")
+
+    #основная база недоступна: папки с файлом базы не существует
+    offline = ReplicaStorage(tmp_path / "replica.db", f"sqlite:///{tmp_path / 'missing' / 'remote.db'}", interval=None)
+    offline.check_login("никита", "123")
+    offline.add_task("никита", "Без сети")
+    with pytest.raises(DBAPIError):
+        offline.sync("никита")
+    with pytest.raises(OfflineError):
+        offline.register_user("гость", "123")
+    assert offline.get_tasks("никита") == ["[Учебная] Без сети"]
+
+    online = ReplicaStorage(tmp_path / "replica.db", url, interval=None)
+    assert online.sync("никита").pushed == 1
+    assert remote.get_tasks("никита") == ["[Учебная] Без сети"]
+
+
+def test_background_sync_flushes_after_write(tmp_path, remote):
+    replica = ReplicaStorage(tmp_path / "replica.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=60)
+    replica.check_login("никита", "123")
+    try:
+        replica.add_task("никита", "В фоне")
+
+        deadline = time.monotonic() + 5
+        #первая синхронизация при входе могла пройти до записи: ждём, пока очередь опустеет
+        while (replica.pending("никита") or not replica.sync_worker.online) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert remote.get_tasks("никита") == ["[Учебная] В фоне"]
+        assert replica.sync_worker.online
+    finally:
+        replica.stop_sync(timeout=5)
+
+
+def test_local_reads_ignore_server_replicas(tmp_path, remote, monkeypatch):
+    #DATABASE_REPLICA_URLS указывает на реплику основной базы
+    monkeypatch.setattr("app.storage.REPLICA_URLS", [f"sqlite:///{tmp_path / 'remote.db'}"])
+    replica = ReplicaStorage(tmp_path / "replica.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=None)
+    replica.check_login("никита", "123")
+    remote.add_task("никита", "Только на сервере")
+
+    assert replica.router.replicas == []
+    assert replica.get_task_rows("никита") == []
+    #основная база по-прежнему читается с реплик
+    assert replica.remote().router.replicas
+
+
+def test_server_archive_keeps_replica_history(tmp_path, replica, remote):
+    old = [remote.add_task("никита", f"Старая {i}").id for i in range(3)]
+    remote.complete_tasks("никита", old, datetime(2020, 1, 1))
+    remote.add_task("никита", "Текущая")
+    replica.sync("никита")
+
+    #реплика сама не архивирует, архив ведёт основная база
+    assert replica.archive_completed("никита") == 0
+    replica.set_retention("никита", 30)
+    assert remote.archive_completed("никита") == 3
+
+    result = replica.sync("никита")
+
+    assert (result.pulled, result.removed) == (0, 0)
+    assert sorted(replica.get_completed_tasks("никита")) == ["Старая 0", "Старая 1", "Старая 2"]
+    #новый клиент загружает историю вместе с архивом
+    fresh = ReplicaStorage(tmp_path / "fresh.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=None)
+    fresh.check_login("никита", "123")
+    assert fresh.sync("никита").pulled == 4
+    assert sorted(fresh.get_completed_tasks("никита")) == ["Старая 0", "Старая 1", "Старая 2"]
+
+
+def test_pull_reads_only_changes_after_last_sync(tmp_path, replica, remote):
+    old = remote.add_task("никита", "Старая")
+    replica.sync("никита")
+
+    #задача изменилась задолго до прошлой синхронизации: инкрементальная загрузка её не запрашивает
+    with remote.engine.begin() as conn:
+        conn.execute(text("UPDATE tasks SET description = 'Старая (правка)', version = version + 1, "
+                          "updated_at = '2000-01-01 00:00:00.000000' WHERE id = :id"), {"id": old.id})
+    remote.add_task("никита", "Новая")
+
+    result = replica.sync("никита")
+
+    assert result.pulled == 1
+    assert sorted(replica.get_tasks("никита")) == ["[Учебная] Новая", "[Учебная] Старая"]
+    #отметка хранится в файле реплики: новое подключение тоже не перечитывает всё
+    reopened = ReplicaStorage(tmp_path / "replica.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=None)
+    reopened.check_login("никита", "123")
+    assert reopened.sync("никита").pulled == 0
+    #новая реплика загружает все задачи
+    fresh = ReplicaStorage(tmp_path / "fresh.db", f"sqlite:///{tmp_path / 'remote.db'}", interval=None)
+    fresh.check_login("никита", "123")
+    assert fresh.sync("никита").pulled == 2
+    assert sorted(fresh.get_tasks("никита")) == ["[Учебная] Новая", "[Учебная] Старая (правка)"]
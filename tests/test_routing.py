@@ -0,0 +1,108 @@
+import sqlite3
+from datetime import datetime
+
+from app.engine import get_engine
+from app.routing import ReadRouter
+from app.storage import Storage
+
+
+def replicate(primary, replica):
+    """
+    Копирует файл основной базы в реплику, как это сделала бы репликация.
+    """
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+
+def test_router_round_robin_and_health(tmp_path):
+    now = [0.0]
+    primary = Storage(f"sqlite:///{tmp_path / 'primary.db'}").engine
+    first = Storage(f"sqlite:///{tmp_path / 'first.db'}").engine
+    second = Storage(f"sqlite:///{tmp_path / 'second.db'}").engine
+    #база без миграций и база, которую нельзя открыть, не считаются исправными
+    stale = get_engine(f"sqlite:///{tmp_path / 'stale.db'}")
+    broken = get_engine(f"sqlite:///{tmp_path / 'missing' / 'broken.db'}")
+
+    router = ReadRouter(primary, [first, stale, second, broken], window=5, health_interval=10,
+                        clock=lambda: now[0])
+    assert [router.read_engine("никита") for _ in range(4)] == [first, second, second, first]
+
+    router.wrote("никита")
+    assert router.read_engine("никита") is primary
+    assert router.read_engine("оля") in (first, second)
+    now[0] = 6
+    assert router.read_engine("никита") in (first, second)
+
+    router.failed(first)
+    router.failed(second)
+    assert router.read_engine("никита") is primary
+    #после паузы реплики проверяются снова
+    now[0] = 20
+    assert router.read_engine("никита") in (first, second)
+
+
+def test_router_without_replicas_reads_primary(storage):
+    router = ReadRouter(storage.engine, [])
+    router.wrote("никита")
+    assert router.read_engine("никита") is storage.engine
+
+
+def test_storage_reads_replica_and_own_writes_from_primary(storage, tmp_path):
+    storage.register_user("оля", "pass")
+    primary_path = tmp_path / "tasks.db"
+    replica_path = tmp_path / "replica.db"
+    replicate(primary_path, replica_path)
+
+    routed = Storage(f"sqlite:///{primary_path}", replicas=[f"sqlite:///{replica_path}"], read_your_writes=60)
+    assert routed.router.replicas == [get_engine(f"sqlite:///{replica_path}")]
+
+    #только что добавленная задача видна сразу, хотя реплика её ещё не получила
+    routed.add_task("никита", "Сдать отчёт")
+    assert [row.description for row in routed.get_task_rows("никита")] == ["Сдать отчёт"]
+
+    #чужая запись доходит до читателя только через реплику
+    storage.add_task("оля", "Купить молоко")
+    assert routed.get_task_rows("оля") == []
+    assert routed.count_tasks("оля")["open"] == 0
+    #проверка изменений всегда идёт в основную базу
+    assert routed.tasks_version("оля")[0] == 1
+
+    replicate(primary_path, replica_path)
+    assert [row.description for row in routed.find_task_rows("оля", "молоко", None, None)] == ["Купить молоко"]
+
+
+def test_archive_and_retention_read_own_writes(storage, tmp_path):
+    storage.register_user("оля", "pass")
+    old = storage.add_task("оля", "Старая").id
+    storage.complete_tasks("оля", [old], datetime(2020, 1, 1))
+    storage.add_task("оля", "Текущая")
+    replicate(tmp_path / "tasks.db", tmp_path / "replica.db")
+
+    routed = Storage(f"sqlite:///{tmp_path / 'tasks.db'}", replicas=[f"sqlite:///{tmp_path / 'replica.db'}"],
+                     read_your_writes=60)
+    replica = get_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    assert routed.router.read_engine("оля") is replica
+
+    assert routed.archive_completed() == 1
+    assert routed.router.read_engine("оля") is routed.engine
+    assert routed.router.read_engine("никита") is replica
+
+    routed.set_retention("никита", 30)
+    assert routed.router.read_engine("никита") is routed.engine
+
+
+def test_failed_replica_read_retries_on_primary(storage, tmp_path):
+    storage.add_task("никита", "Сдать отчёт")
+    replicate(tmp_path / "tasks.db", tmp_path / "replica.db")
+    #реплика проходит проверку схемы, но запрос к задачам на ней падает
+    with sqlite3.connect(tmp_path / "replica.db") as conn:
+        conn.execute("ALTER TABLE tasks RENAME TO tasks_broken")
+
+    routed = Storage(f"sqlite:///{tmp_path / 'tasks.db'}", replicas=[f"sqlite:///{tmp_path / 'replica.db'}"])
+    replica = get_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    assert routed.router.read_engine("никита") is replica
+
+    assert [row.description for row in routed.get_task_rows("никита")] == ["Сдать отчёт"]
+    #реплика отмечена неисправной, следующие чтения сразу идут в основную базу
+    assert routed.router.read_engine("никита") is routed.engine
+    assert routed.count_tasks("никита")["open"] == 1
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from app.scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2030, 1, 1, 12, 0)
+
+    def __call__(self):
+        return self.now
+
+
+def test_scheduler_fires_due_and_reminders_in_order(qapp):
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(remind_before=timedelta(minutes=10), clock=clock)
+    events = []
+    scheduler.due.connect(lambda task_id: events.append(("due", task_id)))
+    scheduler.remind.connect(lambda task_id: events.append(("remind", task_id)))
+
+    start = clock.now
+    assert scheduler.schedule(1, start + timedelta(minutes=30))
+    assert scheduler.schedule(2, start + timedelta(minutes=5))
+    #просроченные и задачи без дедлайна не планируются
+    assert not scheduler.schedule(3, start - timedelta(minutes=1))
+    assert not scheduler.schedule(4, None)
+    assert scheduler.pending() == 2
+    #таймер взведён на ближайшее событие - дедлайн задачи 2
+    assert scheduler.next_event() == start + timedelta(minutes=5)
+    assert scheduler._timer.remainingTime() > 0
+
+    clock.now = start + timedelta(minutes=25)
+    scheduler._on_timeout()
+    assert events == [("due", 2), ("remind", 1)]
+    assert scheduler.next_event() == start + timedelta(minutes=30)
+
+    clock.now = start + timedelta(minutes=31)
+    scheduler._on_timeout()
+    assert events[-1] == ("due", 1)
+    assert scheduler.pending() == 0
+    assert not scheduler._timer.isActive()
+
+
+def test_unscheduled_and_moved_deadlines_are_skipped(qapp):
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(remind_before=None, clock=clock)
+    due = []
+    scheduler.due.connect(due.append)
+
+    start = clock.now
+    scheduler.schedule(1, start + timedelta(minutes=1))
+    scheduler.schedule(2, start + timedelta(minutes=2))
+    scheduler.unschedule(1)
+    #перенос дедлайна задачи 2 на более поздний срок
+    scheduler.schedule(2, start + timedelta(hours=3))
+
+    clock.now = start + timedelta(minutes=10)
+    scheduler._on_timeout()
+    assert due == []
+    assert scheduler.next_event() == start + timedelta(hours=3)
+
+
+def test_main_window_marks_only_expired_row(qapp, storage):
+    from PyQt6.QtTest import QTest
+
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    storage.add_task("никита", "скоро", datetime.now() + timedelta(milliseconds=300))
+    storage.add_task("никита", "потом", datetime.now() + timedelta(days=1))
+    window = MainWindow(storage, listen=False)
+    window.worker.wait()
+    assert window.scheduler.pending() == 2
+
+    changed = []
+    resets = []
+    window.task_model.dataChanged.connect(lambda first, last, roles: changed.append(first.row()))
+    window.task_model.modelReset.connect(lambda: resets.append(1))
+
+    QTest.qWait(600)
+    assert changed == [0]
+    assert resets == []
+    assert window.task_model.data(window.task_model.index(0)).endswith("ПРОСРОЧЕНО!")
+    assert window.scheduler.pending() == 1
@@ -0,0 +1,106 @@
+from datetime import date, datetime
+
+from app.search import SearchCache
+from app.storage import TaskRow
+
+
+def row(task_id, description, deadline=None, category="Учебная"):
+    return TaskRow(task_id, description, category, deadline, False, None, None, False)
+
+
+ROWS = [
+    row(1, "Сдать экзамен", datetime(2030, 1, 10)),
+    row(2, "Экзаменационный билет", datetime(2030, 2, 10)),
+    row(3, "Купить молоко", datetime(2030, 1, 15), "Домашняя"),
+]
+
+
+def test_cache_hits_and_refines_superset():
+    cache = SearchCache(limit=10)
+    assert cache.get("никита", "экз", None, None) is None
+    cache.put("никита", "экз", None, None, ROWS[:2])
+
+    assert cache.get("никита", "ЭКЗ", None, None) == ROWS[:2]
+    #более длинная строка и более узкий диапазон фильтруются из найденного
+    assert cache.get("никита", "экзамен", date(2030, 1, 1), date(2030, 1, 31)) == ROWS[:1]
+    assert cache.get("никита", "экзаменац", None, None) == ROWS[1:2]
+    assert (cache.hits, cache.refined, cache.misses) == (1, 2, 1)
+
+    #запрос шире найденного и запросы других пользователей идут в хранилище
+    assert cache.get("никита", "эк", None, None) is None
+    assert cache.get("гость", "экзамен", None, None) is None
+
+
+def test_truncated_result_is_not_refined():
+    cache = SearchCache(limit=2)
+    cache.put("никита", None, date(2030, 1, 1), date(2030, 12, 31), ROWS[:2])
+
+    assert cache.get("никита", "экзамен", date(2030, 1, 1), date(2030, 12, 31)) is None
+
+
+def test_short_query_result_is_not_refined():
+    cache = SearchCache(limit=10)
+    #строку короче триграммы SQLite ищет через LIKE, который не сравнивает кириллицу без учёта регистра
+    cache.put("никита", "Эк", None, None, ROWS[1:2])
+
+    assert cache.get("никита", "Эк", None, None) == ROWS[1:2]
+    assert cache.get("никита", "экз", None, None) is None
+
+
+def test_invalidate_drops_results_and_late_answers():
+    cache = SearchCache(maxsize=2, limit=10)
+    cache.put("никита", "а", None, None, ROWS)
+    cache.put("гость", "а", None, None, ROWS)
+    generation = cache.generation
+
+    cache.invalidate("никита")
+    #ответ на запрос, отправленный до изменения задач, не запоминается
+    cache.put("никита", "б", None, None, ROWS, generation)
+
+    assert cache.get("никита", "а", None, None) is None
+    assert cache.get("гость", "а", None, None) == ROWS
+    cache.put("никита", "в", None, None, [])
+    cache.put("никита", "г", None, None, [])
+    assert len(cache) == 2
+
+
+def test_main_window_searches_as_you_type(qapp, storage, monkeypatch):
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    storage.add_task("никита", "Сдать экзамен", datetime(2030, 1, 10))
+    storage.add_task("никита", "Экзаменационный билет", datetime(2030, 1, 20))
+    window = MainWindow(storage, listen=False)
+    window.worker.wait()
+    window.date_from.setDate(date(2030, 1, 1))
+    window.date_to.setDate(date(2030, 12, 31))
+
+    queries = []
+    find = storage.find_task_rows
+    monkeypatch.setattr(storage, "find_task_rows", lambda *args: queries.append(args[1]) or find(*args))
+
+    window.search_input.setText("экз")
+    assert window.search_timer.isActive()
+    window.search_timer.timeout.emit()
+    window.worker.wait()
+    assert window.task_model.rowCount() == 2
+
+    #уточнение фильтруется из прошлого результата без запроса к хранилищу
+    window.search_input.setText("экзамена")
+    window.search_timer.timeout.emit()
+    assert [task.description for task in window.task_model.rows()] == ["Экзаменационный билет"]
+    assert queries == ["экз"]
+
+    #новая задача сбрасывает кэш, следующий поиск идёт в хранилище
+    window.task_added(storage.add_task("никита", "Экзамен по физике", datetime(2030, 3, 1)))
+    window.search_input.setText("экзамен")
+    window.search_timer.timeout.emit()
+    window.worker.wait()
+    assert queries == ["экз", "экзамен"]
+    assert window.task_model.rowCount() == 3
+
+    #пустая строка поиска возвращает список текущих задач
+    window.search_input.setText("")
+    window.worker.wait()
+    assert not window.searching
+    assert window.task_model.rowCount() == 3
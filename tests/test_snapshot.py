@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+from app.snapshot import FORMAT_VERSION, SnapshotStore, decode, encode, snapshot_store
+from app.storage import TaskRow
+from app.task_model import TaskListModel, deadline_order, format_task
+
+
+def row(task_id, description="задача", deadline=None, completed=False, completed_at=None):
+    return TaskRow(task_id, description, "Учебная", deadline, completed, completed_at,
+                   datetime(2030, 1, 1, 12, 0, 0, 123456), False)
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = SnapshotStore(tmp_path, "sqlite:///tasks.db")
+    tasks = [row(1, "Без срока"), row(2, "Купить молоко ☕", datetime(2030, 1, 2, 9, 30))]
+    completed = [row(3, "Сдать отчёт", completed=True,
+                     completed_at=datetime(2030, 1, 1, 8, 0, tzinfo=timezone.utc).astimezone())]
+
+    store.save("никита", tasks, completed)
+    snapshot = store.load("никита")
+
+    assert snapshot.tasks == tasks
+    assert snapshot.completed[0].completed_at == completed[0].completed_at.astimezone().replace(tzinfo=None)
+    assert snapshot.completed[0]._replace(completed_at=None) == completed[0]._replace(completed_at=None)
+    #снимки других пользователей и баз не пересекаются
+    assert store.load("гость") is None
+    assert SnapshotStore(tmp_path, "sqlite:///other.db").load("никита") is None
+
+
+def test_snapshot_keeps_descriptions_longer_than_64kb(tmp_path):
+    store = SnapshotStore(tmp_path, "sqlite:///tasks.db")
+    tasks = [row(1, "я" * 70000), row(2, "короткая")]
+
+    store.save("никита", tasks, [])
+
+    assert store.load("никита").tasks == tasks
+
+
+def test_snapshot_rejects_other_versions_and_damage(tmp_path):
+    data = encode([row(1, deadline=datetime(2000, 1, 1))], [])
+    assert decode(data).tasks[0].overdue
+
+    assert decode(data[:4] + (FORMAT_VERSION + 1).to_bytes(2, "little") + data[6:]) is None
+    assert decode(data[:-1]) is None
+    assert decode(data + b"\0") is None
+
+    store = SnapshotStore(tmp_path, "scope")
+    open(store.path("никита"), "wb").close()
+    assert store.load("никита") is None
+
+
+def test_snapshot_store_disabled():
+    from app.memory import MemoryStorage
+
+    assert snapshot_store(MemoryStorage()) is None
+
+
+def test_revalidate_applies_only_differences(qapp):
+    start = datetime(2030, 1, 1)
+    fresh = [row(i, f"задача {i}", start + timedelta(days=i)) for i in range(5)]
+    model = TaskListModel(lambda after, limit, deliver, fail: deliver(fresh[:limit]),
+                          lambda t: (t.deadline, t.id), format_task, page_size=4,
+                          order_key=deadline_order(True))
+
+    #снимок устарел: задачи 10 уже нет, задачу 3 переименовали, задачи 0 и 1 новые
+    stale = [fresh[1]._replace(id=10), fresh[2], fresh[3]._replace(description="старое")]
+    model.set_rows(stale)
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("remove", first)))
+    model.dataChanged.connect(lambda first, last, roles: events.append(("change", first.row())))
+
+    model.revalidate()
+
+    assert [task.id for task in model.rows()] == [0, 1, 2, 3]
+    assert model.task(3).description == "задача 3"
+    assert events == [("remove", 0), ("insert", 0), ("insert", 1), ("change", 3)]
+    assert model.canFetchMore()
+
+
+def test_main_window_starts_from_snapshot(qapp, storage, tmp_path):
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    store = snapshot_store(storage, tmp_path / "snapshots")
+    storage.add_task("никита", "старая", datetime.now() + timedelta(days=1))
+
+    first = MainWindow(storage, listen=False, snapshots=store)
+    first.worker.wait()
+    first.close()
+
+    storage.add_task("никита", "новая", datetime.now() + timedelta(days=2))
+    window = MainWindow(storage, listen=False, snapshots=store)
+    #строки снимка видны до ответа хранилища
+    assert [task.description for task in window.task_model.rows()] == ["старая"]
+
+    window.worker.wait()
+    assert [task.description for task in window.task_model.rows()] == ["старая", "новая"]
+    assert window.version == storage.tasks_version("никита")
+
+
+def test_main_window_closes_when_snapshot_cannot_be_encoded(qapp, storage, tmp_path, monkeypatch):
+    import struct
+
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    store = snapshot_store(storage, tmp_path / "snapshots")
+    window = MainWindow(storage, listen=False, snapshots=store)
+    window.worker.wait()
+
+    def fail(*_):
+        raise struct.error("argument out of range")
+
+    monkeypatch.setattr(store, "save", fail)
+    #ошибка снимка не мешает закрыть окно
+    assert window.close()
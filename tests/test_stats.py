@@ -0,0 +1,75 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from app.cli import main
+from app.migrations import migrate
+from app.stats import COMPLETION_BOUNDS, completion_bucket, format_stats, percentile
+from app.storage import Base
+
+
+def test_buckets_and_percentiles():
+    assert completion_bucket(30) == 0
+    assert completion_bucket(60) == 1
+    assert completion_bucket(10 ** 9) == len(COMPLETION_BOUNDS)
+
+    assert percentile({}, 0.5) is None
+    #внутри корзины перцентиль оценивается линейно
+    assert percentile({0: 4}, 0.5) == 30
+    assert percentile({0: 1, 1: 1}, 0.9) == 60 + (COMPLETION_BOUNDS[1] - 60) * 0.8
+
+
+def test_migration_counts_existing_tasks(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    migrate(engine, Base.metadata, target=6)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (username, password_hash) VALUES ('old', 'x')"))
+        conn.execute(text(
+            "INSERT INTO tasks (user_id, description, category, completed, created_at, completed_at) VALUES "
+            "(1, 'первая', 'Учебная', 0, '2024-01-01 10:00:00', NULL), "
+            "(1, 'вторая', 'Учебная', 1, '2024-01-01 10:00:00', '2024-01-01 10:30:00')"
+        ))
+
+    migrate(engine, Base.metadata)
+
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT open_count, completed_count FROM task_stats")).one() == (1, 1)
+        #триггеры поддерживают счётчики при удалении и изменении задач
+        conn.execute(text("UPDATE tasks SET category = 'Хобби' WHERE description = 'первая'"))
+        conn.execute(text("DELETE FROM tasks WHERE description = 'вторая'"))
+        rows = conn.execute(text(
+            "SELECT category, open_count, completed_count FROM task_stats ORDER BY category"
+        )).all()
+        assert rows == [("Учебная", 0, 0), ("Хобби", 1, 0)]
+        assert conn.execute(text("SELECT sum(completed_count) FROM task_completion_stats")).scalar() == 0
+
+
+def test_cli_full_stats(storage):
+    storage.add_task("никита", "Сдать отчёт", None, "Рабочая")
+    url = str(storage.engine.url)
+
+    out = io.StringIO()
+    assert main(["--url", url, "--user", "никита", "--json", "stats", "--full", "--days", "7"], out) == 0
+    stats = json.loads(out.getvalue())
+    assert stats["categories"] == {"Рабочая": {"open": 1, "completed": 0}}
+    assert stats["period_days"] == 7
+
+    out = io.StringIO()
+    assert main(["--url", url, "--user", "никита", "stats", "--full"], out) == 0
+    assert out.getvalue().splitlines() == format_stats(storage.get_stats("никита", timedelta(days=30)))
+
+
+def test_main_window_shows_stats(qapp, storage):
+    from app.ui_main import MainWindow
+
+    storage.current_user = "никита"
+    task = storage.add_task("никита", "Сдать экзамен", datetime(2000, 1, 10))
+    window = MainWindow(storage, listen=False)
+    window.worker.wait()
+    assert "просрочено: 1" in window.stats_panel.summary.text()
+
+    window.tasks_completed(storage.complete_tasks("никита", [task.id]), datetime.now())
+    window.worker.wait()
+    assert "выполнено: 1" in window.stats_panel.summary.text()
@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+
+def test_search_tasks_ranked_and_limited(storage):
+    deadline = datetime.now() + timedelta(days=1)
+    storage.add_task("никита", "Экзамен по матанализу", deadline, "Учебная")
+    storage.add_task("никита", "Экзамен экзамен экзамен", deadline + timedelta(days=1), "Учебная")
+    storage.add_task("никита", "Купить молоко", deadline, "Домашняя")
+
+    result = storage.search_tasks("никита", "ЭКЗАМЕН", None, None)
+    assert result[0].startswith("[Учебная] Экзамен экзамен экзамен")
+    assert len(result) == 2
+
+    assert len(storage.search_tasks("никита", "экзамен", None, None, limit=1)) == 1
+
+
+def test_search_tasks_short_text_and_special_chars(storage):
+    storage.add_task("никита", "Сдать ДЗ", None, "Учебная")
+    storage.add_task("никита", "Скидка 50% на книги", None, "Хобби")
+    storage.add_task("никита", "Скидка 500 на книги", None, "Хобби")
+
+    assert storage.search_tasks("никита", "ДЗ", None, None) == ["[Учебная] Сдать ДЗ"]
+    assert storage.search_tasks("никита", "0%", None, None) == ["[Хобби] Скидка 50% на книги"]
+
+
+def test_search_tasks_only_own_open_tasks(storage):
+    storage.register_user("гость", "123")
+    storage.add_task("гость", "Чужая задача", None, "Учебная")
+    storage.add_task("никита", "Своя задача", None, "Учебная")
+    storage.add_task("никита", "Готовая задача", None, "Учебная")
+    storage.delete_task("никита", "Готовая задача")
+
+    assert storage.search_tasks("никита", "задача", None, None) == ["[Учебная] Своя задача"]
+
+
+def test_tasks_pages_follow_deadline_order(storage):
+    start = datetime(2030, 1, 1)
+    for i in range(7):
+        #две задачи на каждый дедлайн, чтобы проверить сортировку по id внутри одного дедлайна
+        storage.add_task("никита", f"задача {i}", start + timedelta(days=i // 2))
+    storage.add_task("никита", "без дедлайна", None)
+
+    loaded = []
+    after = None
+    while True:
+        page = storage.get_tasks_page("никита", after, limit=3)
+        loaded.extend(page)
+        if len(page) < 3:
+            break
+        after = (page[-1].deadline, page[-1].id)
+
+    descriptions = [t.description for t in loaded]
+    assert sorted(descriptions) == sorted([f"задача {i}" for i in range(7)] + ["без дедлайна"])
+    dated = [t for t in loaded if t.deadline]
+    assert dated == sorted(dated, key=lambda t: (t.deadline, t.id))
+
+
+def test_completed_tasks_pages(storage):
+    for i in range(5):
+        storage.add_task("никита", f"задача {i}", None)
+        storage.delete_task("никита", f"задача {i}")
+
+    first = storage.get_completed_tasks_page("никита", limit=3)
+    second = storage.get_completed_tasks_page("никита", (first[-1].completed_at, first[-1].id), limit=3)
+
+    assert [t.description for t in first + second] == [f"задача {i}" for i in range(5)]
+
+
+def count_statements(storage, fn, *args):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(storage.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn(*args)
+    finally:
+        event.remove(storage.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_task_operations_run_one_statement_after_login(storage):
+    user_session = storage.check_login("никита", "123")
+    deadline = datetime.now() + timedelta(days=1)
+
+    calls = [
+        (storage.add_task, "никита", "задача", deadline),
+        (storage.get_tasks, "никита"),
+        (storage.get_tasks_page, "никита"),
+        (storage.search_tasks, "никита", "задача", None, None),
+        (storage.delete_task, "никита", "задача"),
+        (storage.get_completed_tasks, "никита"),
+        (storage.get_completed_tasks_page, user_session),
+    ]
+    for fn, *args in calls:
+        statements = count_statements(storage, fn, *args)
+        #лишний запрос к users означал бы поиск пользователя по логину
+        assert len(statements) == 1, (fn.__name__, statements)
+
+
+def test_other_user_is_resolved_by_username(storage):
+    storage.register_user("гость", "123")
+    storage.check_login("никита", "123")
+
+    storage.add_task("гость", "чужая задача")
+
+    assert storage.get_tasks("никита") == []
+    assert len(storage.get_tasks("гость")) == 1
+
+
+def test_complete_tasks_by_id(storage):
+    storage.register_user("гость", "123")
+    storage.add_task("гость", "чужая задача")
+    for _ in range(3):
+        storage.add_task("никита", "одинаковая задача")
+    storage.check_login("никита", "123")
+
+    ids = [t.id for t in storage.get_tasks_page("никита")]
+    foreign = storage.get_tasks_page("гость")[0].id
+
+    statements = count_statements(storage, storage.complete_tasks, "никита", ids[:2] + [foreign])
+    assert len(statements) == 1
+
+    assert storage.get_tasks_page("никита")[0].id == ids[2]
+    assert storage.get_completed_tasks("никита") == ["одинаковая задача"] * 2
+    assert len(storage.get_tasks("гость")) == 1
+    #повторное выполнение ничего не меняет
+    assert storage.complete_tasks("никита", ids[:2]) == []
+
+
+def test_tasks_version_changes_on_writes(storage):
+    empty = storage.tasks_version("никита")
+    assert empty == (0, 0, None)
+
+    task = storage.add_task("никита", "Задача", None, "Учебная")
+    assert task.id is not None
+    added = storage.tasks_version("никита")
+    assert added == (1, 0, task.updated_at)
+
+    completed_at = datetime(2031, 1, 1)
+    assert storage.complete_tasks("никита", [task.id], completed_at) == [task.id]
+    assert storage.tasks_version("никита") == (1, 1, completed_at)
+    assert storage.get_completed_tasks_page("никита")[0].completed_at.replace(tzinfo=None) == completed_at
+
+
+def test_task_rows_match_orm_pages(storage):
+    from app.storage import TaskRow
+
+    now = datetime.now()
+    storage.add_task("никита", "Просрочена", now - timedelta(days=1), "Рабочая")
+    for i in range(4):
+        storage.add_task("никита", f"Задача {i}", now + timedelta(days=i + 1), "Учебная")
+    done = storage.add_task("никита", "Готово", now + timedelta(days=9), "Хобби")
+    storage.complete_tasks("никита", [done.id])
+
+    rows = storage.get_task_rows("никита")
+    assert all(type(row) is TaskRow for row in rows)
+    assert [row.id for row in rows] == [task.id for task in storage.get_tasks_page("никита", None, None)]
+    assert [row.overdue for row in rows] == [True, False, False, False, False]
+
+    #постраничная загрузка по тому же ключу (deadline, id)
+    page = storage.get_task_rows("никита", (rows[1].deadline, rows[1].id), 2)
+    assert page == rows[2:4]
+
+    history = storage.get_completed_task_rows("никита")
+    assert [(row.id, row.completed, row.overdue) for row in history] == [(done.id, True, False)]
+
+    found = storage.find_task_rows("никита", "Задача", None, None)
+    assert {row.description for row in found} == {f"Задача {i}" for i in range(4)}
+    assert storage.search_tasks("никита", "Просрочена", None, None) == [
+        f"[Рабочая] Просрочена (до {rows[0].deadline:%d.%m.%Y %H:%M})"
+    ]
+
+
+def test_hot_queries_reuse_compiled_statements(storage):
+    user_session = storage.check_login("никита", "123")
+    first = storage.add_task("никита", "Первая", datetime(2030, 1, 1))
+    storage.add_task("никита", "Вторая", datetime(2030, 1, 2))
+    compiled = []
+    event.listen(storage.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, parameters, context, executemany: compiled.append(context.compiled))
+
+    storage.get_task_rows(user_session, None, 10)
+    storage.get_task_rows(user_session, None, 5)
+    storage.get_task_rows(user_session, (first.deadline, first.id), 10)
+    storage.get_task_rows(user_session, (first.deadline, first.id), 10)
+
+    #новые значения параметров не требуют новой компиляции запроса
+    assert compiled[0] is compiled[1]
+    assert compiled[2] is compiled[3]
+    assert compiled[0] is not compiled[2]
+    assert [row.description for row in storage.get_task_rows(user_session, (first.deadline, first.id), 10)] == ["Вторая"]
@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta
+
+from app.task_model import TaskIdRole, TaskListModel, deadline_order, format_task
+from app.storage import Task
+
+
+def make_tasks(n):
+    start = datetime(2030, 1, 1)
+    return [Task(id=i, description=f"задача {i}", category="Учебная", deadline=start + timedelta(hours=i))
+            for i in range(n)]
+
+
+def test_model_fetches_pages_lazily(qapp):
+    tasks = make_tasks(25)
+    calls = []
+
+    def fetch_page(after, limit, deliver, fail):
+        calls.append(after)
+        start = 0 if after is None else after[1] + 1
+        deliver(tasks[start:start + limit])
+
+    model = TaskListModel(fetch_page, lambda t: (t.deadline, t.id), format_task, page_size=10)
+    model.reload()
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 25
+    assert not model.canFetchMore()
+    assert calls == [None, (tasks[9].deadline, 9), (tasks[19].deadline, 19)]
+
+    index = model.index(24)
+    assert model.data(index, TaskIdRole) == 24
+    assert model.data(index) == "[Учебная] задача 24 (до 02.01.2030 00:00)"
+
+
+def test_format_task_overdue():
+    task = Task(description="Сдать ДЗ", category="Учебная", deadline=datetime(2020, 5, 1, 9, 30))
+    assert format_task(task) == "[Учебная] Сдать ДЗ (до 01.05.2020 09:30)   ПРОСРОЧЕНО!"
+
+
+def test_main_window_loads_first_page(qapp, storage):
+    from app.ui_main import MainWindow
+
+    for i in range(3):
+        storage.add_task("никита", f"задача {i}", datetime.now() + timedelta(days=i))
+    #задача с тем же описанием не должна выполниться вместе с выбранной
+    storage.add_task("никита", "задача 0", datetime.now() + timedelta(days=5))
+    storage.current_user = "никита"
+
+    window = MainWindow(storage)
+    window.worker.wait()
+    assert window.task_model.rowCount() == 4
+
+    window.task_list.setCurrentIndex(window.task_model.index(0))
+    window.delete_task()
+    #первое ожидание доставляет результат выполнения задачи, второе - перезагрузку списков
+    window.worker.wait()
+    window.worker.wait()
+    assert window.task_model.rowCount() == 3
+    assert window.completed_model.rowCount() == 1
+    assert window.completed_model.data(window.completed_model.index(0)) == "задача 0"
+
+
+def test_model_drops_page_requested_before_reset(qapp):
+    pending = []
+    model = TaskListModel(lambda after, limit, deliver, fail: pending.append(deliver),
+                          lambda t: (t.deadline, t.id), format_task, page_size=10)
+    model.reload()
+    model.set_rows(make_tasks(2))
+
+    pending[0](make_tasks(10))
+    assert model.rowCount() == 2
+
+
+def test_insert_task_keeps_order_and_skips_unloaded(qapp):
+    tasks = make_tasks(30)
+    model = TaskListModel(lambda after, limit, deliver, fail: deliver(tasks[:limit]),
+                          lambda t: (t.deadline, t.id), format_task, page_size=10,
+                          order_key=deadline_order(True))
+    model.reload()
+
+    between = Task(id=100, description="между", category="Учебная", deadline=tasks[3].deadline + timedelta(minutes=1))
+    assert model.insert_task(between)
+    assert model.task(4) is between
+
+    #задача без дедлайна на SQLite идёт первой
+    assert model.insert_task(Task(id=101, description="без срока", category="Учебная"))
+    assert model.task(0).id == 101
+
+    #задачи после последней загруженной подгрузит fetchMore
+    later = Task(id=102, description="позже", category="Учебная", deadline=tasks[-1].deadline)
+    assert not model.insert_task(later)
+    assert model.rowCount() == 12
+
+    assert [t.id for t in model.remove_tasks([100, 0, 555])] == [0, 100]
+    assert model.rowCount() == 10
+
+
+def test_main_window_updates_lists_without_reload(qapp, storage):
+    from app.ui_main import MainWindow
+
+    storage.add_task("никита", "поздняя", datetime.now() + timedelta(days=5))
+    storage.current_user = "никита"
+    #изменение из другого клиента здесь обнаруживается только проверкой версии
+    window = MainWindow(storage, listen=False)
+    window.worker.wait()
+    version = window.version
+    assert version[0] == 1
+
+    reloads = []
+    window.task_model.modelReset.connect(lambda: reloads.append(1))
+    window.task_added(storage.add_task("никита", "ранняя", datetime.now() + timedelta(days=1)))
+    assert window.task_model.data(window.task_model.index(0)).startswith("[Учебная] ранняя")
+
+    window.tasks_completed(storage.complete_tasks("никита", [window.task_model.task(1).id], datetime(2030, 1, 1)),
+                           datetime(2030, 1, 1))
+    assert window.task_model.rowCount() == 1
+    assert window.completed_model.data(window.completed_model.index(0)) == "поздняя"
+
+    #собственные изменения учтены в версии, проверка не перезагружает списки
+    window.check_version()
+    window.worker.wait()
+    assert reloads == []
+    assert window.version == storage.tasks_version("никита")
+
+    #изменение из другого клиента обнаруживается по версии
+    storage.add_task("никита", "чужая", None)
+    window.check_version()
+    window.worker.wait()
+    window.worker.wait()
+    assert reloads
+    assert window.task_model.rowCount() == 2
+
+
+def test_model_fetches_again_after_failed_page(qapp):
+    tasks = make_tasks(15)
+    errors = [RuntimeError("нет связи")]
+
+    def fetch_page(after, limit, deliver, fail):
+        if after is not None and errors:
+            fail(errors.pop())
+            return
+        start = 0 if after is None else after[1] + 1
+        deliver(tasks[start:start + limit])
+
+    model = TaskListModel(fetch_page, lambda t: (t.deadline, t.id), format_task, page_size=10)
+    model.reload()
+    model.fetchMore()
+    #ошибка не останавливает подгрузку: страница запрашивается снова
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 15
+    assert not model.canFetchMore()
@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+
+from app.transfer import TaskImportError, export_tasks, import_tasks
+
+
+CSV = """description,category,deadline,completed,completed_at
+Сдать курсовую,Учебная,2030-05-01T10:00:00,,
+Купить молоко,Домашняя,,да,2024-01-02T08:00:00
+"""
+
+
+def test_import_csv(storage):
+    count, errors = import_tasks(storage, "никита", io.StringIO(CSV), "csv")
+
+    assert (count, errors) == (2, [])
+    assert storage.get_tasks("никита") == ["[Учебная] Сдать курсовую (до 01.05.2030 10:00)"]
+    assert storage.get_completed_tasks("никита") == ["Купить молоко"]
+
+
+def test_import_invalid_row_rolls_back(storage):
+    data = CSV + "Без категории,Неизвестная,,,\n"
+
+    with pytest.raises(TaskImportError) as err:
+        import_tasks(storage, "никита", io.StringIO(data), "csv")
+
+    assert err.value.line == 4
+    assert storage.get_tasks("никита") == []
+
+
+def test_import_skip_invalid(storage):
+    lines = [
+        json.dumps({"description": "Тренировка", "category": "Хобби"}, ensure_ascii=False),
+        json.dumps({"description": "", "category": "Хобби"}),
+        json.dumps({"description": "Отчёт", "category": "Рабочая", "deadline": "вчера"}, ensure_ascii=False),
+    ]
+
+    count, errors = import_tasks(storage, "никита", io.StringIO("\n".join(lines)), "jsonl", skip_invalid=True)
+
+    assert count == 1
+    assert [e.line for e in errors] == [2, 3]
+
+
+def test_import_in_batches_and_export_round_trip(storage):
+    data = "".join(
+        json.dumps({"description": f"задача {i}", "category": "Рабочая", "deadline": "2030-01-01T00:00:00"},
+                   ensure_ascii=False) + "\n"
+        for i in range(2500)
+    )
+    count, _ = import_tasks(storage, "никита", io.StringIO(data), "jsonl")
+    assert count == 2500
+
+    out = io.StringIO()
+    assert export_tasks(storage, "никита", out, "csv") == 2500
+
+    storage.register_user("гость", "123")
+    out.seek(0)
+    assert import_tasks(storage, "гость", out, "csv") == (2500, [])
+    assert len(storage.get_tasks("гость")) == 2500
@@ -1,48 +1,32 @@
 import pytest
-from unittest.mock import Mock, MagicMock
+from app.memory import MemoryStorage
 from app.storage import (
     Storage,
     EmptyUsernameError,
     EmptyPasswordError,
-    UserAlreadyExistsError,
     UserNotFoundError,
-    User,
-    Task
+    UserSession
 )
-#во всех тестах Storage создается через new, чтобы не вызывать инит и не подключаться к самому БД
+
+
 def test_register_user_empty_username():
-    storage = Storage.__new__(Storage)
+    storage = MemoryStorage()
 
     with pytest.raises(EmptyUsernameError):
         storage.register_user("   ", "123")
 
 
 def test_register_user_empty_password():
-    storage = Storage.__new__(Storage)
+    storage = MemoryStorage()
 
     with pytest.raises(EmptyPasswordError):
         storage.register_user("isf", "")
 
-def test_search_tasks_text_found():
-    storage = Storage.__new__(Storage)
-    
-
-    session = MagicMock()
-    storage.SessionLocal = MagicMock()
-    storage.SessionLocal.return_value.__enter__.return_value = session
-    #мокаем сессию и возвращаем SessionLocal в мок
-        
-
-    user = User(id=1, username="никита")
-    storage.get_user = MagicMock(return_value=user)
-
-    task = Task(description="Купить молоко", completed=False, deadline=None, category="пользовательская")
-
-    query_mock = MagicMock()
-
-    session.query.return_value = query_mock
-    query_mock.filter.return_value = query_mock  
-    query_mock.all.return_value = [task]
+def test_search_tasks_text_found(tmp_path):
+    #поиск идёт через полнотекстовый индекс, поэтому проверяется на настоящей базе SQLite
+    storage = Storage(f"sqlite:///{tmp_path / 'tasks.db'}")
+    storage.register_user("никита", "123")
+    storage.add_task("никита", "Купить молоко", None, "пользовательская")
 
     result = storage.search_tasks(
         username="никита",
@@ -53,16 +37,10 @@ def test_search_tasks_text_found():
 
     assert result == ["[пользовательская] Купить молоко"]
 
-def test_search_tasks_text_not_found():
-    storage = Storage.__new__(Storage)
-
-    session = MagicMock()
-    storage.SessionLocal = MagicMock()
-    storage.SessionLocal.return_value.__enter__.return_value = session
-
-    user = User(id=1, username="никита")
-    storage.get_user = MagicMock(return_value=user)
-
+def test_search_tasks_text_not_found(tmp_path):
+    storage = Storage(f"sqlite:///{tmp_path / 'tasks.db'}")
+    storage.register_user("никита", "123")
+    storage.add_task("никита", "Купить молоко", None, "пользовательская")
 
     result = storage.search_tasks(
         username="никита",
@@ -75,52 +53,49 @@ def test_search_tasks_text_not_found():
 
 
 def test_check_login_success():
-    storage = Storage.__new__(Storage)
-
-    password = "123"
-    fake_hash = storage_hash = "$2b$12$AM9zDeq0FYB.txs4eXJzWu6rWP/ANg2iSMTnM.anYV9GvBkJSQXOS" 
-
-    user = User(username="test", password_hash=fake_hash)
-
-    session = MagicMock()
-    storage.SessionLocal = MagicMock()
-    storage.SessionLocal.return_value.__enter__.return_value = session
-
-
-    import bcrypt
-    bcrypt.checkpw = MagicMock(return_value=True)
-
-    assert storage.check_login("123", password) is True
+    storage = MemoryStorage()
+    storage.register_user("123", "123")
 
+    user_session = storage.check_login("123", "123")
+    assert isinstance(user_session, UserSession)
+    assert user_session.username == "123"
+    assert storage.user_session is user_session
 
 
 def test_add_task_user_not_found():
-    storage = Storage.__new__(Storage)
-
-    session = MagicMock()
-    storage.SessionLocal = MagicMock()
-    storage.SessionLocal.return_value.__enter__.return_value = session
-
-    storage.get_user = MagicMock(return_value=None)
+    storage = MemoryStorage()
 
     with pytest.raises(UserNotFoundError):
         storage.add_task("ghost", "test task")
 
 
-def test_delete_task():
-    storage = Storage.__new__(Storage)
+def test_delete_task(storage):
+    storage.add_task("никита", "Задача")
+
+    storage.delete_task("никита", "Задача")
 
-    user = User(id=1, username="nikita")
-    task = Task(description="Задача", completed=False)
+    assert storage.get_tasks("никита") == []
+    assert storage.get_completed_tasks("никита") == ["Задача"]
 
-    session = MagicMock()
-    storage.SessionLocal = MagicMock()
-    storage.SessionLocal.return_value.__enter__.return_value = session
 
-    storage.get_user = MagicMock(return_value=user)
+def test_register_window_registers_in_background(storage, qapp, monkeypatch):
+    from app import ui_register
 
-    session.query.return_value.filter.return_value.all.return_value = [task]
+    messages = []
+    monkeypatch.setattr(ui_register.QMessageBox, "information", lambda _, title, text: messages.append(title))
+    monkeypatch.setattr(ui_register.QMessageBox, "warning", lambda _, title, text: messages.append(title))
 
-    storage.delete_task("nikita", "Задача")
+    window = ui_register.RegisterWindow(storage)
+    window.username_input.setText("оля")
+    window.password_input.setText("pass")
+    window.register()
+    #окно не ждёт хэширования пароля, а блокирует кнопку до ответа
+    assert not window.button.isEnabled()
+    window.worker.wait()
+    assert messages == ["Успех"]
+    assert storage.check_login("оля", "pass").username == "оля"
 
-    assert task.completed is True
+    window.register()
+    window.worker.wait()
+    assert messages == ["Успех", "Ошибка регистрации"]
+    assert window.button.isEnabled()